@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+PickleballAI Analysis Engine
+Streams decoded frames in NumPy batches through a CPU model on a process pool and yields per-frame results
+"""
+
+import multiprocessing
+import os
+import subprocess
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # the engine is unavailable; analysis requests stay queued for a node that has numpy
+    np = None
+
+try:
+    import onnxruntime as ort
+except ImportError:  # only the built-in heuristic model
+    ort = None
+
+# "heuristic" or a path to an .onnx model taking NCHW float32 frames in [0, 1]
+ANALYSIS_MODEL = os.environ.get("PICKLEBALL_ANALYSIS_MODEL", "heuristic")
+ANALYSIS_WORKERS = int(os.environ.get("PICKLEBALL_ANALYSIS_WORKERS", os.cpu_count() or 1))
+# Frames sampled per second of video, and the size they are decoded at
+ANALYSIS_FPS = float(os.environ.get("PICKLEBALL_ANALYSIS_FPS", 5))
+FRAME_WIDTH = 320
+FRAME_HEIGHT = 180
+BATCH_SIZE = 32
+# Batches handed to the pool ahead of the one being collected, per worker; bounds memory on long matches
+BATCHES_IN_FLIGHT_PER_WORKER = 2
+# Pickleball yellow at analysis resolution; fewer matching pixels means no ball in the frame
+MIN_BALL_PIXELS = 2
+
+def available() -> bool:
+    return np is not None
+
+def decode_frames(ffmpeg: str, source: str, fps: float = ANALYSIS_FPS,
+                  width: int = FRAME_WIDTH, height: int = FRAME_HEIGHT) -> Iterator[bytes]:
+    """Raw RGB frames piped out of ffmpeg one at a time; the video is never held in memory"""
+    command = [ffmpeg, "-hide_banner", "-loglevel", "error", "-i", source,
+               "-vf", f"fps={fps},scale={width}:{height}", "-f", "rawvideo", "-pix_fmt", "rgb24", "-"]
+    frame_size = width * height * 3
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        while True:
+            frame = process.stdout.read(frame_size)
+            if len(frame) < frame_size:
+                break
+            yield frame
+        if process.wait() != 0:
+            error = process.stderr.read().decode("utf-8", errors="replace").strip()[-500:]
+            raise RuntimeError(error or f"ffmpeg exited with {process.returncode}")
+    finally:
+        # The consumer may stop early; do not leave ffmpeg writing into a full pipe
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        process.stderr.close()
+
+def iter_batches(frames: Iterable[bytes], batch_size: int = BATCH_SIZE, width: int = FRAME_WIDTH,
+                 height: int = FRAME_HEIGHT) -> Iterator[Tuple[int, "np.ndarray"]]:
+    """(index of the first frame, uint8 array of shape (n, height, width, 3)) per batch"""
+    start, buffer = 0, []
+    for frame in frames:
+        buffer.append(frame)
+        if len(buffer) == batch_size:
+            yield start, np.frombuffer(b"".join(buffer), dtype=np.uint8).reshape(-1, height, width, 3)
+            start, buffer = start + len(buffer), []
+    if buffer:
+        yield start, np.frombuffer(b"".join(buffer), dtype=np.uint8).reshape(-1, height, width, 3)
+
+class HeuristicModel:
+    """Tiny built-in model: the ball as the centroid of pickleball-yellow pixels, movement as frame-to-frame change"""
+    name = "heuristic"
+
+    def predict(self, frames: "np.ndarray", previous: Optional["np.ndarray"] = None) -> List[Dict]:
+        """previous is the frame before the batch, so movement is continuous across batches"""
+        height, width = frames.shape[1:3]
+        rgb = frames.astype(np.int16)
+        mask = (rgb[..., 0] > 180) & (rgb[..., 1] > 180) & (rgb[..., 2] < 120)
+        pixels = mask.sum(axis=(1, 2))
+        safe = np.maximum(pixels, 1)
+        ball_y = (mask.sum(axis=2) * np.arange(height)).sum(axis=1) / safe / height
+        ball_x = (mask.sum(axis=1) * np.arange(width)).sum(axis=1) / safe / width
+
+        gray = frames.mean(axis=3, dtype=np.float32)
+        before = previous.mean(axis=2, dtype=np.float32)[None] if previous is not None else gray[:1]
+        motion = np.abs(np.diff(np.concatenate([before, gray]), axis=0)).mean(axis=(1, 2)) / 255
+
+        return [{
+            "ball": ({"x": round(float(ball_x[i]), 4), "y": round(float(ball_y[i]), 4), "pixels": int(pixels[i])}
+                     if pixels[i] >= MIN_BALL_PIXELS else None),
+            "motion": round(float(motion[i]), 4)
+        } for i in range(len(frames))]
+
+class OnnxModel:
+    """An ONNX model on the CPU runtime; each frame keeps its first output row as "outputs" """
+
+    def __init__(self, model_path: str):
+        if ort is None:
+            raise RuntimeError("onnxruntime is not installed")
+        options = ort.SessionOptions()
+        # Parallelism comes from the process pool; one thread per worker avoids oversubscribing cores
+        options.intra_op_num_threads = 1
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.name = os.path.basename(model_path)
+
+    def predict(self, frames: "np.ndarray", previous: Optional["np.ndarray"] = None) -> List[Dict]:
+        batch = frames.astype(np.float32).transpose(0, 3, 1, 2) / 255.0
+        outputs = self.session.run(None, {self.input_name: batch})[0]
+        return [{"outputs": np.round(row.reshape(-1), 4).tolist()} for row in outputs]
+
+def load_model(model_spec: str):
+    if model_spec == "heuristic":
+        return HeuristicModel()
+    if model_spec.endswith(".onnx"):
+        return OnnxModel(model_spec)
+    raise ValueError(f"Unknown analysis model: {model_spec}")
+
+# Each pool process loads the model once
+_worker_model = None
+# Pools are started from media pipeline threads; a forked child could inherit a lock another thread held
+POOL_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+
+def _init_worker(model_spec: str):
+    global _worker_model
+    _worker_model = load_model(model_spec)
+
+def _predict_batch(start: int, frames: "np.ndarray", previous: Optional["np.ndarray"]) -> Tuple[int, List[Dict]]:
+    return start, _worker_model.predict(frames, previous)
+
+class AnalysisEngine:
+    def __init__(self, ffmpeg: Optional[str] = None, model_spec: str = ANALYSIS_MODEL,
+                 workers: int = ANALYSIS_WORKERS, fps: float = ANALYSIS_FPS, batch_size: int = BATCH_SIZE):
+        """ffmpeg decodes the frames; model_spec is loaded in every worker process"""
+        self.ffmpeg = ffmpeg
+        self.model_spec = model_spec
+        self.model_name = "heuristic" if model_spec == "heuristic" else os.path.basename(model_spec)
+        self.workers = workers
+        self.fps = fps
+        self.batch_size = batch_size
+
+    def analyze(self, source: str, frames: Optional[Iterable[bytes]] = None) -> Iterator[Dict]:
+        """Per-frame results in frame order; frames default to decoding source with ffmpeg"""
+        if frames is None:
+            frames = decode_frames(self.ffmpeg, source, self.fps)
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=POOL_CONTEXT, initializer=_init_worker,
+                                 initargs=(self.model_spec,)) as pool:
+            previous = None
+            for start, batch in iter_batches(frames, self.batch_size):
+                pending.append(pool.submit(_predict_batch, start, batch, previous))
+                previous = batch[-1]
+                if len(pending) >= self.workers * BATCHES_IN_FLIGHT_PER_WORKER:
+                    yield from self._frame_results(pending.popleft().result())
+            while pending:
+                yield from self._frame_results(pending.popleft().result())
+
+    def _frame_results(self, batch_result: Tuple[int, List[Dict]]) -> Iterator[Dict]:
+        start, results = batch_result
+        for offset, result in enumerate(results):
+            yield {"frame": start + offset, "time": round((start + offset) / self.fps, 3), **result}
+
+class AnalysisSummary:
+    """Running totals over per-frame results, small enough to store as the video's analysis_data"""
+
+    def __init__(self, top_moments: int = 5):
+        self.frames = 0
+        self.ball_frames = 0
+        self.motion_total = 0.0
+        self.top_moments = top_moments
+        self._moments: List[Tuple[float, float]] = []
+
+    def add(self, result: Dict):
+        self.frames += 1
+        if result.get("ball"):
+            self.ball_frames += 1
+        if "motion" in result:
+            self.motion_total += result["motion"]
+            self._moments.append((result["motion"], result["time"]))
+            if len(self._moments) > self.top_moments * 20:
+                self._moments = sorted(self._moments, reverse=True)[:self.top_moments]
+
+    def to_dict(self) -> Dict:
+        moments = sorted(self._moments, reverse=True)[:self.top_moments]
+        return {
+            "frames": self.frames,
+            "ball_visible_ratio": round(self.ball_frames / self.frames, 3) if self.frames else 0,
+            "mean_motion": round(self.motion_total / self.frames, 4) if self.frames else 0,
+            # Busiest moments first: candidates for annotation
+            "peak_motion_times": [time for _, time in moments]
+        }
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+PickleballAI API Response
+Compact JSON encoding (orjson when installed), negotiated gzip/brotli compression and ?fields= projection
+"""
+
+import gzip
+from typing import Dict, List, Optional
+
+from flask.json.provider import DefaultJSONProvider
+
+from metrics_system import metrics
+
+try:
+    import orjson
+except ImportError:  # stdlib json via Flask's default provider
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Bodies smaller than this are not worth the CPU or the extra headers
+COMPRESSION_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSIBLE_MIMETYPES = {
+    "application/json", "text/html", "text/plain", "text/css", "text/csv",
+    "application/javascript", "text/javascript"
+}
+
+metrics.describe("pickleball_http_response_bytes_total", "Response body bytes before and after compression")
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that always emits compact JSON and uses orjson when it is available"""
+    compact = True
+
+    def dumps(self, obj, **kwargs) -> str:
+        if orjson is not None and not kwargs.get("indent"):
+            option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+            if kwargs.get("sort_keys", self.sort_keys):
+                option |= orjson.OPT_SORT_KEYS
+            try:
+                return orjson.dumps(obj, default=kwargs.get("default", self.default),
+                                    option=option).decode("utf-8")
+            except (orjson.JSONEncodeError, TypeError):
+                pass  # e.g. integers beyond 64 bits; let the stdlib encoder handle it
+        if not kwargs.get("indent"):
+            kwargs.setdefault("separators", (",", ":"))
+        return super().dumps(obj, **kwargs)
+
+def negotiate_encoding(accept_encoding) -> Optional[str]:
+    """Pick brotli or gzip from a parsed Accept-Encoding header, preferring brotli"""
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best = max(candidates, key=lambda encoding: accept_encoding[encoding], default=None)
+    return best if best and accept_encoding[best] > 0 else None
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+def select_fields(records: List[Dict]) -> List[Dict]:
+    """Apply ?fields=a,b,c to a list of records; without the parameter records pass through"""
+    from flask import request
+
+    fields = [field.strip() for field in request.args.get("fields", "").split(",") if field.strip()]
+    if not fields:
+        return records
+    return [{field: record[field] for field in fields if field in record} for record in records]
+
+def init_app(app, min_bytes: int = COMPRESSION_MIN_BYTES):
+    """Install the JSON provider and compress eligible responses for clients that accept it"""
+    from flask import request
+
+    app.json_provider_class = FastJSONProvider
+    app.json = FastJSONProvider(app)
+
+    @app.after_request
+    def _compress_response(response):
+        if (response.direct_passthrough or response.is_streamed
+                or response.status_code < 200 or response.status_code in (204, 304)
+                or "Content-Encoding" in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = negotiate_encoding(request.accept_encodings)
+        body = response.get_data()
+        if encoding is None or len(body) < min_bytes:
+            return response
+
+        compressed = compress_body(body, encoding)
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+
+        # Each representation needs its own strong validator
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(f"{etag}-{encoding}")
+
+        metrics.inc("pickleball_http_response_bytes_total", len(body), stage="uncompressed")
+        metrics.inc("pickleball_http_response_bytes_total", len(compressed), stage="sent")
+        return response
+
+    return app
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+PickleballAI Data Layer Benchmark
+Generates synthetic datasets at realistic scale and times the key data-layer operations
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import signal
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(REPO_DIR, "benchmarks", "data_layer_baseline.json")
+
+SCALES = {
+    "1k": 1_000,
+    "10k": 10_000,
+    "100k": 100_000,
+    "1m": 1_000_000
+}
+
+SPECIALIZATIONS = ["serve", "dinking", "third shot drop", "footwork", "strategy", "volleys"]
+REQUEST_STATUSES = ["pending", "accepted", "completed", "declined"]
+ANNOTATION_TYPES = ["technique", "positioning", "strategy", "footwork"]
+
+class OperationTimeout(Exception):
+    pass
+
+def _write_collection(file_path: str, key: str, records):
+    """Stream a collection to disk one record at a time to keep memory flat"""
+    with open(file_path, 'w') as f:
+        f.write('{"%s": [' % key)
+        for i, record in enumerate(records):
+            if i:
+                f.write(",\n")
+            f.write(json.dumps(record))
+        f.write("]}")
+
+def generate_dataset(data_dir: str, num_videos: int, seed: int = 42,
+                     annotations_per_video: int = 2) -> Dict:
+    """Generate coaches, users, videos, permissions, requests and transactions"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    today = now.strftime("%Y-%m-%d")
+
+    num_coaches = max(20, num_videos // 1000)
+    num_students = max(50, num_videos // 20)
+    coaches = [f"coach{i}@example.com" for i in range(num_coaches)]
+    students = [f"student{i}@example.com" for i in range(num_students)]
+
+    os.makedirs(data_dir, exist_ok=True)
+
+    _write_collection(os.path.join(data_dir, "coaches.json"), "coaches", (
+        {
+            "id": f"coach_{i + 1}",
+            "email": email,
+            "name": f"Coach {i}",
+            "password": "password123",
+            "specialization": rng.choice(SPECIALIZATIONS),
+            "hourly_rate": rng.choice([40, 50, 60, 75, 90]),
+            "status": "blocked" if rng.random() < 0.05 else "active",
+            "created_at": (now - timedelta(days=rng.randint(1, 700))).isoformat(),
+            "total_earnings": 0.0,
+            "total_sessions": 0
+        }
+        for i, email in enumerate(coaches)
+    ))
+
+    _write_collection(os.path.join(data_dir, "users.json"), "users", (
+        {
+            "id": f"user_{i + 1}",
+            "email": email,
+            "name": f"Student {i}",
+            "password": "password123",
+            "role": "student",
+            "status": "active",
+            "created_at": (now - timedelta(days=rng.randint(1, 700))).isoformat(),
+            "total_spent": 0.0,
+            "total_sessions": 0
+        }
+        for i, email in enumerate(students)
+    ))
+
+    # Every video belongs to a student; about half were sent to a coach
+    owners = [rng.choice(students) for _ in range(num_videos)]
+    assigned = [rng.choice(coaches) if rng.random() < 0.5 else None for _ in range(num_videos)]
+
+    def videos():
+        for i in range(num_videos):
+            uploaded_at = (now - timedelta(minutes=num_videos - i)).isoformat()
+            video = {
+                "id": f"video_{i:07d}",
+                "filename": f"match_{i}.mp4",
+                "original_filename": f"match_{i}.mp4",
+                "student_email": owners[i],
+                "uploaded_at": uploaded_at,
+                "status": "uploaded",
+                "size_bytes": rng.randint(20, 900) * 1024 * 1024,
+                "duration_seconds": rng.randint(60, 3600),
+                "thumbnail_path": None,
+                "analysis_status": "pending",
+                "local_path": f"demo_path/match_{i}.mp4"
+            }
+            if assigned[i]:
+                count = rng.randint(0, annotations_per_video * 2)
+                if count:
+                    video["annotations"] = [
+                        {
+                            "timestamp": rng.randint(0, video["duration_seconds"]),
+                            "type": rng.choice(ANNOTATION_TYPES),
+                            "text": "Keep the paddle up",
+                            "added_at": uploaded_at,
+                            "added_by": assigned[i],
+                            "annotation_id": f"ann_{n + 1}"
+                        }
+                        for n in range(count)
+                    ]
+            yield video
+
+    def permissions():
+        for i in range(num_videos):
+            video_id = f"video_{i:07d}"
+            yield {
+                "video_id": video_id,
+                "user_email": owners[i],
+                "permissions": ["read", "write", "delete"],
+                "granted_at": now.isoformat(),
+                "granted_by": "system"
+            }
+            if assigned[i]:
+                yield {
+                    "video_id": video_id,
+                    "user_email": assigned[i],
+                    "permissions": ["read", "edit"],
+                    "granted_at": now.isoformat(),
+                    "granted_by": "system"
+                }
+
+    def requests():
+        for i in range(num_videos):
+            if assigned[i]:
+                created_at = now - timedelta(minutes=num_videos - i)
+                status = rng.choice(REQUEST_STATUSES)
+                yield {
+                    "id": f"req_{i + 1}",
+                    "student_email": owners[i],
+                    "student_name": owners[i].split("@")[0],
+                    "coach_email": assigned[i],
+                    "coach_name": assigned[i].split("@")[0],
+                    "video_filename": f"match_{i}.mp4",
+                    "video_id": f"video_{i:07d}",
+                    "message": "",
+                    "status": status,
+                    "created_at": created_at.isoformat(),
+                    "notified_at": created_at.isoformat(),
+                    "responded_at": None if status == "pending" else
+                        (created_at + timedelta(hours=rng.randint(1, 72))).isoformat(),
+                    "estimated_cost": 30.0,
+                    "priority": "normal"
+                }
+
+    def transactions():
+        for i in range(max(1, num_videos // 10)):
+            day = today if rng.random() < 0.1 else (now - timedelta(days=rng.randint(1, 365))).strftime("%Y-%m-%d")
+            yield {
+                "date": day,
+                "time": "12:00",
+                "description": f"Annotation session {i}",
+                "amount": float(rng.choice([25, 30, 37.5, 45]))
+            }
+
+    _write_collection(os.path.join(data_dir, "videos.json"), "videos", videos())
+    _write_collection(os.path.join(data_dir, "video_permissions.json"), "permissions", permissions())
+    _write_collection(os.path.join(data_dir, "annotation_requests.json"), "requests", requests())
+    _write_collection(os.path.join(data_dir, "transactions.json"), "transactions", transactions())
+    _write_collection(os.path.join(data_dir, "storage.json"), "buckets", iter(()))
+
+    # A coach and student in the middle of the data set, with a shared video
+    middle = num_videos // 2
+    while assigned[middle] is None:
+        middle += 1
+
+    return {
+        "num_videos": num_videos,
+        "num_coaches": num_coaches,
+        "num_students": num_students,
+        "num_permissions": num_videos + sum(1 for c in assigned if c),
+        "num_requests": sum(1 for c in assigned if c),
+        "coach_email": assigned[middle],
+        "student_email": owners[middle],
+        "video_id": f"video_{middle:07d}"
+    }
+
+def build_operations(context: Dict) -> List:
+    """Create the timed operations; systems are imported after chdir into the data set"""
+    from video_permission_system import VideoPermissionSystem
+    from coach_notification_system import CoachNotificationSystem
+    from coach_dashboard import CoachDashboard
+    from web_root_console import WebRootConsole
+
+    video_permissions = VideoPermissionSystem()
+    notification_system = CoachNotificationSystem()
+    dashboard = CoachDashboard()
+    root_console = WebRootConsole()
+
+    # Email delivery is not part of the data layer
+    notification_system._send_email = lambda **kwargs: True
+    logging.getLogger().setLevel(logging.WARNING)
+
+    coach = context["coach_email"]
+    student = context["student_email"]
+    video_id = context["video_id"]
+
+    return [
+        ("upload_video", lambda: video_permissions.upload_video(student, "bench_upload.mp4")),
+        ("check_permissions", lambda: video_permissions.check_permissions(video_id, coach, "read")),
+        ("get_user_videos", lambda: video_permissions.get_user_videos(coach)),
+        ("add_video_annotations", lambda: video_permissions.add_video_annotations(
+            video_id, [{"timestamp": 12, "type": "technique", "text": "Split step earlier"}], coach)),
+        ("get_coach_stats", lambda: dashboard.get_coach_stats(coach)),
+        ("process_annotation_request", lambda: notification_system.process_annotation_request(
+            student, "Bench Student", coach, "bench_request.mp4", "benchmark")),
+        ("get_daily_report", lambda: root_console.get_daily_report())
+    ]
+
+def _on_alarm(signum, frame):
+    raise OperationTimeout()
+
+def time_operation(func: Callable, repeat: int, max_seconds: float) -> Dict:
+    """Run an operation up to `repeat` times within a time budget"""
+    use_alarm = hasattr(signal, "setitimer")
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _on_alarm)
+
+    samples = []
+    status = "ok"
+    budget_end = time.perf_counter() + max_seconds
+    try:
+        for _ in range(repeat):
+            remaining = budget_end - time.perf_counter()
+            if remaining <= 0:
+                break
+            if use_alarm:
+                signal.setitimer(signal.ITIMER_REAL, remaining)
+            start = time.perf_counter()
+            try:
+                func()
+            except OperationTimeout:
+                status = "timeout"
+                break
+            finally:
+                if use_alarm:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+            samples.append(time.perf_counter() - start)
+    finally:
+        if use_alarm:
+            signal.signal(signal.SIGALRM, previous)
+
+    if not samples:
+        return {"status": "timeout", "runs": 0}
+
+    ordered = sorted(samples)
+    return {
+        "status": status,
+        "runs": len(samples),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "median_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3)
+    }
+
+def run_benchmark(scale: str, repeat: int = 5, max_seconds: float = 30.0,
+                  seed: int = 42, work_dir: Optional[str] = None) -> Dict:
+    """Generate a data set for `scale` and time every operation against it"""
+    num_videos = SCALES[scale]
+    original_dir = os.getcwd()
+    temp_dir = None
+    if work_dir is None:
+        temp_dir = tempfile.TemporaryDirectory(prefix=f"pickleball_bench_{scale}_")
+        work_dir = temp_dir.name
+
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+
+    try:
+        os.chdir(work_dir)
+        generation_start = time.perf_counter()
+        context = generate_dataset("data", num_videos, seed=seed)
+        generation_seconds = time.perf_counter() - generation_start
+
+        results = {}
+        for name, func in build_operations(context):
+            results[name] = time_operation(func, repeat, max_seconds)
+            print(f"  {name:<28} {_format_result(results[name])}", flush=True)
+    finally:
+        os.chdir(original_dir)
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+    return {
+        "scale": scale,
+        "seed": seed,
+        "dataset": {k: v for k, v in context.items() if k.startswith("num_")},
+        "generation_seconds": round(generation_seconds, 3),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now().isoformat(),
+        "results": results
+    }
+
+def compare_to_baseline(run: Dict, baseline: Dict, tolerance: float,
+                        min_delta_ms: float = 1.0) -> List[Dict]:
+    """Return operations whose fastest run regressed beyond the tolerance
+
+    The minimum is compared rather than the median because it is the least
+    affected by other load on the machine.
+    """
+    regressions = []
+    expected = baseline.get(run["scale"], {}).get("results", {})
+
+    for name, result in run["results"].items():
+        reference = expected.get(name)
+        if not reference or reference.get("status") != "ok":
+            continue
+        if result["status"] != "ok":
+            regressions.append({"operation": name, "reason": result["status"]})
+            continue
+
+        # Sub-millisecond operations are too noisy for a purely relative check
+        limit = max(reference["min_ms"] * (1 + tolerance),
+                    reference["min_ms"] + min_delta_ms)
+        if result["min_ms"] > limit:
+            regressions.append({
+                "operation": name,
+                "reason": "slower",
+                "baseline_ms": reference["min_ms"],
+                "current_ms": result["min_ms"],
+                "ratio": round(result["min_ms"] / reference["min_ms"], 2)
+            })
+
+    return regressions
+
+def _format_result(result: Dict) -> str:
+    if result["status"] == "timeout" and not result["runs"]:
+        return "timeout"
+    suffix = " (timed out)" if result["status"] == "timeout" else ""
+    return (f"median {result['median_ms']:>10.3f} ms  p95 {result['p95_ms']:>10.3f} ms  "
+            f"runs {result['runs']}{suffix}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the PickleballAI data layer")
+    parser.add_argument("--scale", choices=list(SCALES), action="append",
+                        help="Data set size (repeatable, default 1k)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per operation")
+    parser.add_argument("--max-seconds", type=float, default=30.0,
+                        help="Time budget per operation before it is reported as a timeout")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for data generation")
+    parser.add_argument("--output", help="Write machine-readable results to this JSON file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Allowed slowdown against the baseline (0.5 = 50%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                        help="Ignore slowdowns smaller than this many milliseconds")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Store these results as the new baseline")
+    args = parser.parse_args()
+
+    runs = []
+    for scale in args.scale or ["1k"]:
+        print(f"\n📊 Benchmarking data layer at scale {scale} ({SCALES[scale]:,} videos)")
+        runs.append(run_benchmark(scale, args.repeat, args.max_seconds, args.seed))
+
+    report = {"runs": runs}
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+
+    if args.save_baseline:
+        for run in runs:
+            baseline[run["scale"]] = run
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\n✅ Baseline saved to {args.baseline}")
+    else:
+        report["regressions"] = []
+        for run in runs:
+            regressions = compare_to_baseline(run, baseline, args.tolerance,
+                                              args.min_delta_ms)
+            report["regressions"].extend(dict(r, scale=run["scale"]) for r in regressions)
+
+        if report["regressions"]:
+            print("\n❌ Regressions against baseline:")
+            for r in report["regressions"]:
+                print(f"   [{r['scale']}] {r['operation']}: {r['reason']}"
+                      + (f" {r['baseline_ms']} ms -> {r['current_ms']} ms (x{r['ratio']})"
+                         if r["reason"] == "slower" else ""))
+        elif baseline:
+            print("\n✅ No regressions against baseline")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if report.get("regressions"):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
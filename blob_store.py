@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+PickleballAI Blob Store
+Video blob storage behind one interface: a filesystem backend and an S3-compatible backend
+"""
+
+import os
+import shutil
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from metrics_system import metrics
+
+try:
+    import boto3
+except ImportError:  # filesystem backend only
+    boto3 = None
+
+# Files larger than one part are uploaded in parallel parts
+MULTIPART_PART_SIZE = 8 * 1024 * 1024
+MULTIPART_WORKERS = 4
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+metrics.describe("pickleball_blob_bytes_total", "Bytes written to and read from the blob store")
+
+class BlobNotFound(KeyError):
+    pass
+
+class BlobStore(ABC):
+    """put/get_range/delete/stat plus multipart upload, keyed by relative names such as video_123_match.mp4"""
+
+    @abstractmethod
+    def put(self, key: str, data: bytes):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_range(self, key: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        """Bytes start..end inclusive (to the end of the blob when end is None)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def stat(self, key: str) -> Optional[Dict]:
+        """{"size", "modified"} or None when the blob does not exist"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def create_multipart(self, key: str) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    def upload_part(self, upload_id: str, part_number: int, data: bytes) -> str:
+        """Store one part (numbered from 1); returns its ETag"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def complete_multipart(self, upload_id: str, etags: List[Tuple[int, str]]):
+        raise NotImplementedError
+
+    @abstractmethod
+    def abort_multipart(self, upload_id: str):
+        raise NotImplementedError
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Path of the blob on this node's filesystem, when the backend has one"""
+        return None
+
+    def put_file(self, key: str, file_path: str, part_size: int = MULTIPART_PART_SIZE,
+                 workers: int = MULTIPART_WORKERS) -> int:
+        """Upload a file, in parallel parts when it is larger than part_size; returns its size"""
+        size = os.path.getsize(file_path)
+        if size <= part_size:
+            with open(file_path, 'rb') as f:
+                self.put(key, f.read())
+            metrics.inc("pickleball_blob_bytes_total", size, direction="write")
+            return size
+
+        def send(part_number: int) -> Tuple[int, str]:
+            # Each worker reads its own slice, so no part waits on another's I/O
+            with open(file_path, 'rb') as f:
+                f.seek((part_number - 1) * part_size)
+                return part_number, self.upload_part(upload_id, part_number, f.read(part_size))
+
+        upload_id = self.create_multipart(key)
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                etags = list(pool.map(send, range(1, (size + part_size - 1) // part_size + 1)))
+            self.complete_multipart(upload_id, etags)
+        except Exception:
+            self.abort_multipart(upload_id)
+            raise
+        metrics.inc("pickleball_blob_bytes_total", size, direction="write")
+        return size
+
+    def iter_range(self, key: str, start: int = 0, end: Optional[int] = None,
+                   chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        """Stream bytes start..end inclusive in chunks, without loading the blob"""
+        if end is None:
+            info = self.stat(key)
+            if info is None:
+                raise BlobNotFound(key)
+            end = info["size"] - 1
+        position = start
+        while position <= end:
+            chunk = self.get_range(key, position, min(position + chunk_size, end + 1) - 1)
+            if not chunk:
+                return
+            metrics.inc("pickleball_blob_bytes_total", len(chunk), direction="read")
+            yield chunk
+            position += len(chunk)
+
+class FileSystemBlobStore(BlobStore):
+    def __init__(self, root: str):
+        """Blobs are files under root, which may be a directory shared by several nodes"""
+        self.root = root
+        # Parts of multipart uploads in progress, one directory per upload
+        self.uploads_dir = os.path.join(root, ".uploads")
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, key))
+        if not path.startswith(os.path.normpath(self.root) + os.sep):
+            raise ValueError(f"Invalid blob key: {key}")
+        return path
+
+    def local_path(self, key: str) -> Optional[str]:
+        return self._path(key)
+
+    def put(self, key: str, data: bytes):
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def put_file(self, key: str, file_path: str, part_size: int = MULTIPART_PART_SIZE,
+                 workers: int = MULTIPART_WORKERS) -> int:
+        """A local copy is already a single streaming transfer"""
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.copyfile(file_path, temp_path)
+        os.replace(temp_path, path)
+        size = os.path.getsize(path)
+        metrics.inc("pickleball_blob_bytes_total", size, direction="write")
+        return size
+
+    def get_range(self, key: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        try:
+            with open(self._path(key), 'rb') as f:
+                f.seek(start)
+                return f.read() if end is None else f.read(end - start + 1)
+        except FileNotFoundError:
+            raise BlobNotFound(key)
+
+    def delete(self, key: str) -> bool:
+        try:
+            os.remove(self._path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def stat(self, key: str) -> Optional[Dict]:
+        try:
+            st = os.stat(self._path(key))
+        except FileNotFoundError:
+            return None
+        return {"size": st.st_size, "modified": datetime.fromtimestamp(st.st_mtime).isoformat()}
+
+    def create_multipart(self, key: str) -> str:
+        upload_id = uuid.uuid4().hex
+        upload_dir = os.path.join(self.uploads_dir, upload_id)
+        os.makedirs(upload_dir)
+        with open(os.path.join(upload_dir, "key"), 'w') as f:
+            f.write(key)
+        return upload_id
+
+    def upload_part(self, upload_id: str, part_number: int, data: bytes) -> str:
+        with open(os.path.join(self.uploads_dir, upload_id, f"{part_number:05d}.part"), 'wb') as f:
+            f.write(data)
+        return str(part_number)
+
+    def complete_multipart(self, upload_id: str, etags: List[Tuple[int, str]]):
+        upload_dir = os.path.join(self.uploads_dir, upload_id)
+        with open(os.path.join(upload_dir, "key"), 'r') as f:
+            path = self._path(f.read())
+        temp_path = f"{path}.{upload_id}.tmp"
+        with open(temp_path, 'wb') as out:
+            for part_number, _ in sorted(etags):
+                with open(os.path.join(upload_dir, f"{part_number:05d}.part"), 'rb') as part:
+                    shutil.copyfileobj(part, out)
+        os.replace(temp_path, path)
+        shutil.rmtree(upload_dir)
+
+    def abort_multipart(self, upload_id: str):
+        shutil.rmtree(os.path.join(self.uploads_dir, upload_id), ignore_errors=True)
+
+def _is_missing(error: Exception) -> bool:
+    code = getattr(error, "response", {}).get("Error", {}).get("Code")
+    return code in ("404", "NoSuchKey", "NotFound")
+
+class S3BlobStore(BlobStore):
+    def __init__(self, bucket: str, client=None, prefix: str = ""):
+        """client is a boto3 S3 client, or anything with the same methods"""
+        if client is None:
+            if boto3 is None:
+                raise RuntimeError("boto3 is required for the S3 blob store")
+            client = boto3.client("s3", endpoint_url=os.environ.get("PICKLEBALL_S3_ENDPOINT") or None)
+        self.bucket = bucket
+        self.client = client
+        self.prefix = prefix
+        # upload id -> object key
+        self._uploads: Dict[str, str] = {}
+
+    def _key(self, key: str) -> str:
+        return self.prefix + key
+
+    def put(self, key: str, data: bytes):
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data)
+
+    def get_range(self, key: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        byte_range = f"bytes={start}-{'' if end is None else end}"
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._key(key), Range=byte_range)
+        except Exception as e:
+            if _is_missing(e):
+                raise BlobNotFound(key)
+            raise
+        return response["Body"].read()
+
+    def delete(self, key: str) -> bool:
+        if self.stat(key) is None:
+            return False
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+        return True
+
+    def stat(self, key: str) -> Optional[Dict]:
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except Exception as e:
+            if _is_missing(e):
+                return None
+            raise
+        return {"size": response["ContentLength"], "modified": response["LastModified"].isoformat()}
+
+    def create_multipart(self, key: str) -> str:
+        response = self.client.create_multipart_upload(Bucket=self.bucket, Key=self._key(key))
+        self._uploads[response["UploadId"]] = self._key(key)
+        return response["UploadId"]
+
+    def upload_part(self, upload_id: str, part_number: int, data: bytes) -> str:
+        response = self.client.upload_part(Bucket=self.bucket, Key=self._uploads[upload_id],
+                                           UploadId=upload_id, PartNumber=part_number, Body=data)
+        return response["ETag"]
+
+    def complete_multipart(self, upload_id: str, etags: List[Tuple[int, str]]):
+        parts = [{"PartNumber": number, "ETag": etag} for number, etag in sorted(etags)]
+        self.client.complete_multipart_upload(Bucket=self.bucket, Key=self._uploads.pop(upload_id),
+                                              UploadId=upload_id, MultipartUpload={"Parts": parts})
+
+    def abort_multipart(self, upload_id: str):
+        key = self._uploads.pop(upload_id, None)
+        if key is not None:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+
+def send_blob(store: BlobStore, key: str, mimetype: str = "video/mp4"):
+    """Flask response for a blob honouring Range requests; local blobs go through send_file, others are streamed"""
+    from flask import Response, request, send_file
+
+    path = store.local_path(key)
+    if path is not None and os.path.exists(path):
+        return send_file(os.path.abspath(path), mimetype=mimetype, conditional=True)
+    info = store.stat(key)
+    if info is None:
+        return Response("Video file not available", status=404)
+
+    size = info["size"]
+    start, end, status = 0, size - 1, 200
+    byte_range = request.range.range_for_length(size) if request.range else None
+    if byte_range:
+        start, end, status = byte_range[0], byte_range[1] - 1, 206
+    response = Response(store.iter_range(key, start, end), status=status, mimetype=mimetype,
+                        direct_passthrough=True)
+    response.headers["Accept-Ranges"] = "bytes"
+    response.headers["Content-Length"] = str(end - start + 1)
+    if status == 206:
+        response.headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return response
+
+def get_blob_store(default_root: str = "videos") -> BlobStore:
+    """Backend from the environment: PICKLEBALL_BLOB_STORE=filesystem (default) or s3 (PICKLEBALL_S3_BUCKET)"""
+    backend = os.environ.get("PICKLEBALL_BLOB_STORE", "filesystem")
+    if backend == "s3":
+        return S3BlobStore(os.environ["PICKLEBALL_S3_BUCKET"], prefix=os.environ.get("PICKLEBALL_S3_PREFIX", ""))
+    return FileSystemBlobStore(os.environ.get("PICKLEBALL_BLOB_ROOT", default_root))
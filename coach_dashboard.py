@@ -4,26 +4,49 @@ PickleballAI Coach Dashboard
 Web interface for coaches to manage annotation requests and videos
 """
 
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, session, redirect, url_for
 from flask_cors import CORS
+import csv
 import json
 import os
 from datetime import datetime
 from typing import Dict, List, Optional
 import secrets
 
+import api_response
+import http_cache
+import metrics_system
+import profiling_system
+from api_response import select_fields
+from blob_store import send_blob
+from data_store import atomic_write_json, file_lock, load_json
+from event_stream import event_stream
+from http_cache import PRIVATE_MEDIA_CACHE, conditional
+from id_allocator import new_id
+from metrics_system import timed
+
 # Import the notification system and video permissions
 from coach_notification_system import CoachNotificationSystem
 from video_permission_system import VideoPermissionSystem
+from storage_tiering import StorageTiering
+from media_pipeline import CLIP_PADDING_SECONDS, MediaPipeline, clip_key, hls_key, preview_key
 
 app = Flask(__name__)
 app.secret_key = secrets.token_hex(16)
 CORS(app)
+metrics_system.init_app(app, "coach_dashboard")
+http_cache.init_app(app)
+api_response.init_app(app)
+profiling_system.init_app(app, "coach_dashboard")
 
 class CoachDashboard:
     def __init__(self):
         self.notification_system = CoachNotificationSystem()
         self.video_permissions = VideoPermissionSystem()
+        # Archived videos are recalled when streamed
+        self.tiering = StorageTiering(self.video_permissions)
+        # Uploads are transcoded into HLS renditions for adaptive playback
+        self.media_pipeline = MediaPipeline(self.video_permissions)
         self.data_dir = "data"
         self.coaches_file = os.path.join(self.data_dir, "coaches.json")
         self.requests_file = os.path.join(self.data_dir, "annotation_requests.json")
@@ -35,47 +58,45 @@ class CoachDashboard:
     
     def _load_data(self, file_path: str) -> Dict:
         """Load data from JSON file"""
-        try:
-            with open(file_path, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
+        return load_json(file_path)
     
     def _save_data(self, file_path: str, data: Dict):
         """Save data to JSON file"""
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        atomic_write_json(file_path, data)
     
+    @timed
     def authenticate_coach(self, email: str, password: str) -> Optional[Dict]:
         """Authenticate coach login"""
         data = self._load_data(self.coaches_file)
         
         for coach in data.get("coaches", []):
             if coach["email"] == email and coach.get("password") == password:
-                return coach
+                return coach if coach.get("status") != "blocked" else None
         
         return None
     
+    @timed
     def get_coach_requests(self, coach_email: str) -> List[Dict]:
         """Get all requests for a specific coach with video information"""
         requests = self.notification_system.get_pending_requests(coach_email)
         
-        # Add video information to each request
+        # Add video information to each request the coach can currently read
         for req in requests:
             if "video_id" in req:
-                video = self.video_permissions.get_video(req["video_id"])
+                permissions = self.video_permissions.get_user_permissions(req["video_id"], coach_email)
+                video = self.video_permissions.get_video(req["video_id"]) if "read" in permissions else None
                 if video:
                     req["video_info"] = video
-                    req["user_permissions"] = self.video_permissions.get_user_permissions(
-                        req["video_id"], coach_email
-                    )
+                    req["user_permissions"] = permissions
         
         return requests
     
+    @timed
     def get_coach_videos(self, coach_email: str) -> List[Dict]:
         """Get all videos the coach has access to"""
         return self.video_permissions.get_user_videos(coach_email)
     
+    @timed
     def get_coach_stats(self, coach_email: str) -> Dict:
         """Get coach statistics"""
         data = self._load_data(self.requests_file)
@@ -98,13 +119,36 @@ class CoachDashboard:
 
 # Initialize the dashboard
 dashboard = CoachDashboard()
+# Data files behind the request and video views, for ETags
+REQUEST_FILES = (dashboard.requests_file, dashboard.video_permissions.videos_file,
+                 dashboard.video_permissions.permissions_file, dashboard.video_permissions.groups_file,
+                 dashboard.video_permissions.coaches_file, dashboard.video_permissions.tombstones_file)
+VIDEO_FILES = (dashboard.video_permissions.videos_file, dashboard.video_permissions.permissions_file,
+               dashboard.video_permissions.groups_file, dashboard.video_permissions.coaches_file,
+               dashboard.video_permissions.tombstones_file)
+
+def lapsed_grants() -> str:
+    """Grants lapse without a file write; the count of lapsed ones keeps ETags from outliving them"""
+    return str(dashboard.video_permissions.permission_index.lapsed_count())
+
+@app.before_request
+def deny_blocked_coaches():
+    """End a blocked coach's session before any view, cached answer or event stream reaches them"""
+    if not dashboard.video_permissions.permission_index.is_blocked(session.get('coach_email')):
+        return None
+    session.clear()
+    if request.path.startswith('/api/'):
+        return jsonify({"error": "Account blocked"}), 403
+    if request.endpoint not in ('login', 'logout', 'signup', 'static'):
+        return redirect(url_for('login'))
+    return None
 
 # Routes
 @app.route('/')
 def index():
     if 'coach_email' not in session:
         return redirect(url_for('login'))
-    return redirect(url_for('dashboard'))
+    return redirect(url_for('dashboard_page'))
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -117,7 +161,7 @@ def login():
         if coach:
             session['coach_email'] = email
             session['coach_name'] = coach['name']
-            return redirect(url_for('dashboard'))
+            return redirect(url_for('dashboard_page'))
         else:
             return render_template('coach_login.html', error='Invalid credentials')
     
@@ -132,15 +176,8 @@ def signup():
         specialization = request.form.get('specialization')
         hourly_rate = float(request.form.get('hourly_rate', 50))
         
-        # Check if coach already exists
-        if dashboard.notification_system.check_coach_exists(email):
-            return render_template('coach_signup.html', error='Coach with this email already exists')
-        
-        # Create new coach
-        data = dashboard._load_data(dashboard.coaches_file)
-        
         coach = {
-            "id": f"coach_{len(data.get('coaches', [])) + 1}",
+            "id": new_id("coach"),
             "email": email,
             "name": name,
             "password": password,  # In production, hash the password
@@ -152,14 +189,21 @@ def signup():
             "total_sessions": 0
         }
         
-        data.setdefault("coaches", []).append(coach)
-        dashboard._save_data(dashboard.coaches_file, data)
+        with file_lock(dashboard.coaches_file):
+            # Check if coach already exists
+            if dashboard.notification_system.check_coach_exists(email):
+                return render_template('coach_signup.html', error='Coach with this email already exists')
+            
+            # Create new coach
+            data = dashboard._load_data(dashboard.coaches_file)
+            data.setdefault("coaches", []).append(coach)
+            dashboard._save_data(dashboard.coaches_file, data)
         
         # Auto-login
         session['coach_email'] = email
         session['coach_name'] = name
         
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('dashboard_page'))
     
     return render_template('coach_signup.html')
 
@@ -213,6 +257,71 @@ def video_detail(video_id):
                          permissions=permissions,
                          annotations=annotations)
 
+@app.route('/videos/<video_id>/stream')
+def stream_video(video_id):
+    if 'coach_email' not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    
+    if not dashboard.video_permissions.check_permissions(video_id, session['coach_email'], "read"):
+        return jsonify({"error": "Access denied to this video"}), 403
+    
+    video, error = dashboard.tiering.open_video(video_id)
+    if error:
+        return jsonify({"error": error}), 404
+    # Range requests let the player seek without downloading the whole file
+    return send_blob(dashboard.video_permissions.blobs, dashboard.video_permissions.blob_key(video))
+
+HLS_MIMETYPES = {".m3u8": "application/vnd.apple.mpegurl", ".ts": "video/mp2t"}
+PREVIEW_MIMETYPES = {".jpg": "image/jpeg", ".vtt": "text/vtt"}
+
+@app.route('/videos/<video_id>/hls/<name>')
+def stream_rendition(video_id, name):
+    if 'coach_email' not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    
+    if not dashboard.video_permissions.check_permissions(video_id, session['coach_email'], "read"):
+        return jsonify({"error": "Access denied to this video"}), 403
+    
+    video = dashboard.video_permissions.get_video(video_id)
+    # Only files the pipeline recorded; the name never reaches the blob store unchecked
+    if not video or name not in video.get("hls_files", []):
+        return jsonify({"error": "Rendition not found"}), 404
+    dashboard.tiering.access_log.touch(video_id)
+    mimetype = HLS_MIMETYPES.get(os.path.splitext(name)[1], "application/octet-stream")
+    return send_blob(dashboard.video_permissions.blobs, hls_key(video_id, name), mimetype)
+
+@app.route('/videos/<video_id>/previews/<name>')
+def video_preview(video_id, name):
+    if 'coach_email' not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    
+    if not dashboard.video_permissions.check_permissions(video_id, session['coach_email'], "read"):
+        return jsonify({"error": "Access denied to this video"}), 403
+    
+    video = dashboard.video_permissions.get_video(video_id)
+    if not video or name not in video.get("preview_files", []):
+        return jsonify({"error": "Preview not found"}), 404
+    mimetype = PREVIEW_MIMETYPES.get(os.path.splitext(name)[1], "application/octet-stream")
+    response = send_blob(dashboard.video_permissions.blobs, preview_key(video_id, name), mimetype)
+    # Scrubbing re-reads the same sheets; the browser keeps them instead of asking again
+    response.headers["Cache-Control"] = PRIVATE_MEDIA_CACHE
+    return response
+
+@app.route('/videos/<video_id>/clips/<clip_id>')
+def video_clip(video_id, clip_id):
+    if 'coach_email' not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    
+    result = dashboard.video_permissions.get_video_clips(video_id, session['coach_email'])
+    if not result["success"]:
+        return jsonify({"error": result["error"]}), 403
+    if not any(c["id"] == clip_id and c["status"] == "completed" for c in result["clips"]):
+        return jsonify({"error": "Clip not found"}), 404
+    response = send_blob(dashboard.video_permissions.blobs, clip_key(video_id, clip_id))
+    # A clip id names its time window, so its bytes never change
+    response.headers["Cache-Control"] = PRIVATE_MEDIA_CACHE
+    return response
+
 @app.route('/logout')
 def logout():
     session.clear()
@@ -220,6 +329,7 @@ def logout():
 
 # API Routes
 @app.route('/api/requests', methods=['GET'])
+@conditional(*REQUEST_FILES, extra=lapsed_grants)
 def api_requests():
     if 'coach_email' not in session:
         return jsonify({"error": "Not authenticated"}), 401
@@ -227,7 +337,7 @@ def api_requests():
     coach_email = session['coach_email']
     requests = dashboard.get_coach_requests(coach_email)
     
-    return jsonify({"success": True, "requests": requests})
+    return jsonify({"success": True, "requests": select_fields(requests)})
 
 @app.route('/api/requests/<request_id>/<action>', methods=['POST'])
 def api_request_action(request_id, action):
@@ -252,6 +362,7 @@ def api_request_action(request_id, action):
         return jsonify({"error": "Request not found"}), 404
 
 @app.route('/api/videos', methods=['GET'])
+@conditional(*VIDEO_FILES, extra=lapsed_grants)
 def api_videos():
     if 'coach_email' not in session:
         return jsonify({"error": "Not authenticated"}), 401
@@ -259,9 +370,10 @@ def api_videos():
     coach_email = session['coach_email']
     videos = dashboard.get_coach_videos(coach_email)
     
-    return jsonify({"success": True, "videos": videos})
+    return jsonify({"success": True, "videos": select_fields(videos)})
 
 @app.route('/api/videos/<video_id>/annotations', methods=['GET', 'POST'])
+@conditional(*VIDEO_FILES, extra=lapsed_grants)
 def api_video_annotations(video_id):
     if 'coach_email' not in session:
         return jsonify({"error": "Not authenticated"}), 401
@@ -284,6 +396,99 @@ def api_video_annotations(video_id):
         
         return jsonify(result)
 
+def _iter_jsonl_annotations(stream):
+    """Yield annotations from a JSON-lines byte stream without buffering the body"""
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield ValueError(f"Line {line_number}: invalid JSON")
+
+class MalformedUpload(ValueError):
+    """An upload that cannot be read past some line"""
+
+def _iter_csv_annotations(stream):
+    """Yield annotations from a CSV byte stream with a text,type,timestamp header"""
+    reader = csv.DictReader(line.decode('utf-8-sig') for line in stream)
+    try:
+        for row in reader:
+            yield {key.strip(): value for key, value in row.items() if key}
+    # line_num counts the lines parsed so far; the failing one is the next
+    except UnicodeDecodeError:
+        raise MalformedUpload(f"Line {reader.line_num + 1}: not UTF-8 text")
+    except csv.Error as e:
+        raise MalformedUpload(f"Line {reader.line_num + 1}: {e}")
+
+@app.route('/api/videos/<video_id>/annotations/bulk', methods=['POST'])
+def api_video_annotations_bulk(video_id):
+    if 'coach_email' not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    
+    coach_email = session['coach_email']
+    allow_partial = request.args.get('partial', '').lower() in ('1', 'true', 'yes')
+    
+    # Accept a JSON body, a raw JSON-lines/CSV body, or a multipart file upload
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('file')
+        if upload is None:
+            return jsonify({"success": False, "error": "No file uploaded"}), 400
+        stream = upload.stream
+        name = (upload.filename or '').lower()
+        upload_format = 'csv' if name.endswith('.csv') or upload.mimetype == 'text/csv' else 'jsonl'
+    else:
+        stream = request.stream
+        upload_format = {
+            'application/json': 'json',
+            'application/x-ndjson': 'jsonl',
+            'application/jsonl': 'jsonl',
+            'text/csv': 'csv'
+        }.get(request.mimetype)
+    
+    if upload_format == 'json':
+        annotations = (request.get_json(silent=True) or {}).get('annotations', [])
+    elif upload_format == 'jsonl':
+        annotations = _iter_jsonl_annotations(stream)
+    elif upload_format == 'csv':
+        annotations = _iter_csv_annotations(stream)
+    else:
+        return jsonify({"success": False, "error": f"Unsupported content type: {request.mimetype}"}), 415
+    
+    try:
+        result = dashboard.video_permissions.add_video_annotations_bulk(
+            video_id=video_id,
+            annotations=annotations,
+            added_by=coach_email,
+            allow_partial=allow_partial
+        )
+    except MalformedUpload as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    
+    return jsonify(result)
+
+@app.route('/api/videos/<video_id>/clips', methods=['GET', 'POST'])
+@conditional(*VIDEO_FILES, extra=lapsed_grants)
+def api_video_clips(video_id):
+    if 'coach_email' not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    
+    coach_email = session['coach_email']
+    
+    if request.method == 'GET':
+        return jsonify(dashboard.video_permissions.get_video_clips(video_id, coach_email))
+    
+    # Without annotation_ids every annotated moment gets a clip
+    data = request.json or {}
+    try:
+        padding = float(data.get('padding', CLIP_PADDING_SECONDS))
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "padding must be a number of seconds"}), 400
+    result = dashboard.video_permissions.request_clips(
+        video_id, coach_email, annotation_ids=data.get('annotation_ids'), padding=padding)
+    return jsonify(result)
+
 @app.route('/api/videos/<video_id>/analysis', methods=['POST'])
 def api_video_analysis(video_id):
     if 'coach_email' not in session:
@@ -300,7 +505,17 @@ def api_video_analysis(video_id):
     
     return jsonify(result)
 
+@app.route('/api/videos/<video_id>/analysis/run', methods=['POST'])
+def api_run_video_analysis(video_id):
+    if 'coach_email' not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    
+    # The analysis engine runs in the media pipeline; analysis_status tracks it
+    result = dashboard.video_permissions.request_video_analysis(video_id, session['coach_email'])
+    return jsonify(result)
+
 @app.route('/api/stats')
+@conditional(*REQUEST_FILES, extra=lapsed_grants)
 def api_stats():
     if 'coach_email' not in session:
         return jsonify({"error": "Not authenticated"}), 401
@@ -310,5 +525,40 @@ def api_stats():
     
     return jsonify({"success": True, "stats": stats})
 
+@app.route('/api/events')
+def api_events():
+    """Server-sent events with request and annotation updates for the logged-in coach"""
+    if 'coach_email' not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    
+    stream = event_stream.sse_stream(
+        session['coach_email'],
+        last_event_id=request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    )
+    return Response(stream, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/events/poll')
+def api_events_poll():
+    """Long-poll fallback for clients that cannot keep an event stream open"""
+    if 'coach_email' not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    
+    timeout = min(max(request.args.get('timeout', 25, type=float), 0), 60)
+    events = event_stream.wait_for_events(
+        session['coach_email'], request.args.get('last_event_id'), timeout
+    )
+    return jsonify({
+        "success": True,
+        "events": [{"id": e["id"], "type": e["type"], "data": e["data"]} for e in events],
+        "last_event_id": events[-1]["id"] if events else request.args.get('last_event_id')
+    })
+
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5001) 
\ No newline at end of file
+    # Request SLAs run alongside the dashboard; `python sla_timer.py` runs them on their own
+    dashboard.notification_system.sla_timer.start()
+    # Transcoding needs ffmpeg on this node; `python media_pipeline.py` runs it on its own
+    dashboard.media_pipeline.start()
+    app.run(debug=True, host='0.0.0.0', port=5001, threaded=True) 
\ No newline at end of file
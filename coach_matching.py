@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+PickleballAI Coach Matching
+In-memory coach index ranked by specialization, rate, pending load and response time
+"""
+
+import bisect
+import heapq
+import json
+import re
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from data_store import collection_version
+from event_stream import REQUEST_CREATED, REQUEST_STATUS, event_stream
+from metrics_system import timed
+
+# Score weights; each component is normalised to 0..1
+MATCH_WEIGHT = 0.4
+LOAD_WEIGHT = 0.25
+RESPONSE_WEIGHT = 0.25
+PRICE_WEIGHT = 0.1
+# Coaches without a response history rank as if they answered within a day
+UNKNOWN_RESPONSE_SCORE = 0.5
+STOPWORDS = {"and", "or", "the", "of", "a", "an", "for", "with"}
+
+def tokenize(text: str) -> Set[str]:
+    """Lowercase words of a specialization, without stopwords"""
+    return {word for word in re.findall(r"[a-z0-9]+", (text or "").lower()) if word not in STOPWORDS}
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+class CoachMatchingIndex:
+    def __init__(self, coaches_file: str, requests_file: str, stream=event_stream):
+        self.coaches_file = coaches_file
+        self.requests_file = requests_file
+        self.stream = stream
+
+        self._lock = threading.RLock()
+        self._built = False
+        self._coaches_version = None
+
+        # Coach side, rebuilt when coaches.json changes (small)
+        self._coaches: Dict[str, Dict] = {}
+        self._by_token: Dict[str, Set[str]] = {}
+        self._vocabulary: List[str] = []
+
+        # Request side, built once and then updated from request events
+        self._requests: Dict[str, Dict] = {}
+        self._pending = defaultdict(int)
+        self._response_seconds = defaultdict(float)
+        self._response_count = defaultdict(int)
+
+    def _load_json(self, file_path: str) -> Dict:
+        try:
+            with open(file_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _ensure_current(self):
+        """Build on first use, then reload only the coach side when coaches.json has changed"""
+        with self._lock:
+            if not self._built:
+                # Listen before scanning so no transition is lost; replays are idempotent
+                self.stream.add_listener(self.apply_event)
+                for request in self._load_json(self.requests_file).get("requests", []):
+                    self._apply_request(request)
+                self._built = True
+
+            version = collection_version(self.coaches_file)
+            if version != self._coaches_version:
+                self._load_coaches()
+                self._coaches_version = version
+
+    def _load_coaches(self):
+        coaches = {}
+        by_token = defaultdict(set)
+        for coach in self._load_json(self.coaches_file).get("coaches", []):
+            if coach.get("status") != "active":
+                continue
+            entry = dict(coach, tokens=tokenize(coach.get("specialization", "")),
+                         hourly_rate=float(coach.get("hourly_rate") or 0))
+            coaches[coach["email"]] = entry
+            for token in entry["tokens"]:
+                by_token[token].add(coach["email"])
+
+        self._coaches = coaches
+        self._by_token = dict(by_token)
+        self._vocabulary = sorted(by_token)
+
+    def close(self):
+        """Stop following the event stream"""
+        self.stream.remove_listener(self.apply_event)
+
+    def apply_event(self, event: Dict):
+        """Incremental update from the event stream"""
+        if event.get("type") not in (REQUEST_CREATED, REQUEST_STATUS):
+            return
+        with self._lock:
+            if self._built:
+                self._apply_request(event.get("data", {}))
+
+    def _apply_request(self, change: Dict):
+        """Fold a request (or a status change to one) into the per-coach counters"""
+        if change.get("type") == "coach_invitation" or not change.get("id"):
+            return
+
+        previous = self._requests.get(change["id"])
+        current = dict(previous or {}, **{key: value for key, value in change.items()
+                                          if key in ("coach_email", "status", "created_at", "responded_at")})
+        if not current.get("coach_email") or (previous and previous.get("status") == current.get("status")
+                                               and previous.get("coach_email") == current.get("coach_email")):
+            return
+
+        coach_email = current["coach_email"]
+        if previous and previous.get("status") == "pending":
+            # Reassigned requests leave the previous coach's count
+            self._pending[previous["coach_email"]] -= 1
+        if current.get("status") == "pending":
+            self._pending[coach_email] += 1
+
+        # Response time counts the first answer only
+        if current.get("responded_at") and not (previous and previous.get("responded_at")):
+            created_at = _parse_time(current.get("created_at"))
+            responded_at = _parse_time(current.get("responded_at"))
+            if created_at and responded_at and responded_at >= created_at:
+                self._response_seconds[coach_email] += (responded_at - created_at).total_seconds()
+                self._response_count[coach_email] += 1
+
+        self._requests[change["id"]] = current
+
+    def _matching_coaches(self, query_tokens: Set[str]) -> Dict[str, int]:
+        """Emails of coaches matching any query token (by prefix), with the number of tokens matched"""
+        matches = defaultdict(int)
+        for token in query_tokens:
+            matched = set()
+            start = bisect.bisect_left(self._vocabulary, token)
+            for word in self._vocabulary[start:]:
+                if not word.startswith(token):
+                    break
+                matched |= self._by_token[word]
+            for email in matched:
+                matches[email] += 1
+        return matches
+
+    def record_request(self, request: Dict):
+        """Apply a request this process just wrote, ahead of its event (which is then a no-op)"""
+        self._ensure_current()
+        with self._lock:
+            self._apply_request(request)
+
+    def get_coach(self, coach_email: str) -> Optional[Dict]:
+        """Active coach record, or None for unknown and blocked coaches"""
+        self._ensure_current()
+        with self._lock:
+            return self._coaches.get(coach_email)
+
+    def pending_count(self, coach_email: str) -> int:
+        self._ensure_current()
+        with self._lock:
+            return max(self._pending.get(coach_email, 0), 0)
+
+    def similar_coaches(self, coach_email: str) -> List[Dict]:
+        """Active coaches sharing a specialization word with the given coach, including that coach"""
+        self._ensure_current()
+        with self._lock:
+            coach = self._coaches.get(coach_email)
+            if coach is None:
+                return []
+            emails = {coach_email}
+            for token in coach["tokens"]:
+                emails |= self._by_token.get(token, set())
+            return [self._coaches[email] for email in emails]
+
+    def get_coach_stats(self, coach_email: str) -> Dict:
+        with self._lock:
+            count = self._response_count.get(coach_email, 0)
+            return {
+                "pending_requests": self._pending.get(coach_email, 0),
+                "avg_response_hours": round(self._response_seconds[coach_email] / count / 3600, 2) if count else None
+            }
+
+    @timed
+    def search(self, specialization: str = "", min_rate: Optional[float] = None,
+               max_rate: Optional[float] = None, k: int = 5) -> List[Dict]:
+        """Top-k active coaches for a student's needs and budget"""
+        self._ensure_current()
+
+        with self._lock:
+            query_tokens = tokenize(specialization)
+            if query_tokens:
+                matches = self._matching_coaches(query_tokens)
+            else:
+                matches = {email: 0 for email in self._coaches}
+
+            candidates = [
+                self._coaches[email] for email in matches
+                if (min_rate is None or self._coaches[email]["hourly_rate"] >= min_rate)
+                and (max_rate is None or self._coaches[email]["hourly_rate"] <= max_rate)
+            ]
+            if not candidates:
+                return []
+            highest_rate = max(coach["hourly_rate"] for coach in candidates) or 1.0
+
+            def score(coach: Dict) -> float:
+                email = coach["email"]
+                match = matches[email] / len(query_tokens) if query_tokens else 1.0
+                load = 1 / (1 + max(self._pending.get(email, 0), 0))
+                count = self._response_count.get(email, 0)
+                if count:
+                    response = 1 / (1 + self._response_seconds[email] / count / 86400)
+                else:
+                    response = UNKNOWN_RESPONSE_SCORE
+                price = 1 - coach["hourly_rate"] / highest_rate
+                return (MATCH_WEIGHT * match + LOAD_WEIGHT * load +
+                        RESPONSE_WEIGHT * response + PRICE_WEIGHT * price)
+
+            ranked = heapq.nlargest(k, ((score(coach), coach) for coach in candidates),
+                                    key=lambda pair: pair[0])
+
+            results = []
+            for value, coach in ranked:
+                result = {key: coach.get(key) for key in ("email", "name", "specialization", "hourly_rate")}
+                result.update(self.get_coach_stats(coach["email"]))
+                result["score"] = round(value, 4)
+                results.append(result)
+            return results
@@ -5,6 +5,7 @@ Handles email notifications for coach annotation requests
 """
 
 import smtplib
+import hashlib
 import json
 import os
 from datetime import datetime, timedelta
@@ -15,23 +16,45 @@ import logging
 
 # Import the video permission system
 from video_permission_system import VideoPermissionSystem
+from data_store import UnitOfWork, atomic_write_json, file_lock, load_json, recover_journal
+from event_stream import REQUEST_CREATED, REQUEST_STATUS, event_stream
+from id_allocator import id_range_bounds, new_id
+from metrics_system import metrics, timed
+from request_scheduler import PRIORITY_RANK, QUEUED, RequestScheduler
+from sla_timer import SlaTimer
+
+# Submissions retried with the same idempotency key within this window return the original result
+IDEMPOTENCY_KEY_TTL_HOURS = 24
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+metrics.describe("pickleball_idempotent_replays_total", "Retried submissions answered from the idempotency store")
 
 class CoachNotificationSystem:
     def __init__(self):
         self.data_dir = "data"
         self.coaches_file = os.path.join(self.data_dir, "coaches.json")
         self.requests_file = os.path.join(self.data_dir, "annotation_requests.json")
+        self.escalations_file = os.path.join(self.data_dir, "escalations.json")
+        self.idempotency_file = os.path.join(self.data_dir, "idempotency_keys.json")
+        self.journal_file = os.path.join(self.data_dir, "write_journal.json")
         self.logs_dir = "logs"
         
         # Initialize video permission system
         self.video_permissions = VideoPermissionSystem()
         
+        # Capacity-aware routing and the overflow queue
+        self.scheduler = RequestScheduler(self.coaches_file, self.requests_file)
+        
+        # Reminders, escalation and expiry for unanswered requests; started by the worker process
+        self.sla_timer = SlaTimer(self.requests_file, self)
+        
         # Ensure directories exist
         os.makedirs(self.data_dir, exist_ok=True)
         os.makedirs(self.logs_dir, exist_ok=True)
         
         # Initialize data files
         self._init_data_files()
+        recover_journal(self.journal_file)
         
         # Email configuration (in production, use environment variables)
         self.smtp_config = {
@@ -49,7 +72,9 @@ class CoachNotificationSystem:
         """Initialize data files if they don't exist"""
         files_to_init = {
             self.coaches_file: {"coaches": []},
-            self.requests_file: {"requests": []}
+            self.requests_file: {"requests": []},
+            self.escalations_file: {"escalations": []},
+            self.idempotency_file: {"keys": {}}
         }
         
         for file_path, default_data in files_to_init.items():
@@ -74,16 +99,11 @@ class CoachNotificationSystem:
     
     def _load_data(self, file_path: str) -> Dict:
         """Load data from JSON file"""
-        try:
-            with open(file_path, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
+        return load_json(file_path)
     
     def _save_data(self, file_path: str, data: Dict):
         """Save data to JSON file"""
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        atomic_write_json(file_path, data)
     
     def check_coach_exists(self, email: str) -> bool:
         """Check if a coach exists in the system"""
@@ -98,32 +118,49 @@ class CoachNotificationSystem:
                 return coach
         return None
     
+    @timed
     def create_coach_request(self, student_email: str, student_name: str, 
                            coach_email: str, coach_name: str, 
-                           video_filename: str, message: str = "") -> Dict:
+                           video_filename: str, message: str = "",
+                           video_id: str = None, status: str = "pending",
+                           priority: str = "normal", auto_assign: bool = False,
+                           uow: Optional[UnitOfWork] = None) -> Dict:
         """Create a new annotation request with video permissions"""
-        data = self._load_data(self.requests_file)
-        
         request = {
-            "id": f"req_{len(data.get('requests', [])) + 1}",
+            "id": new_id("req"),
             "student_email": student_email,
             "student_name": student_name,
             "coach_email": coach_email,
             "coach_name": coach_name,
             "video_filename": video_filename,
             "message": message,
-            "status": "pending",
+            "video_id": video_id,
+            "status": status,
             "created_at": datetime.now().isoformat(),
             "notified_at": None,
             "responded_at": None,
             "estimated_cost": self._calculate_cost(coach_email),
-            "priority": "normal"
+            "priority": priority,
+            "auto_assign": auto_assign
         }
-        
-        data.setdefault("requests", []).append(request)
-        self._save_data(self.requests_file, data)
-        
-        self._log_action("CREATE_COACH", f"Created coach: {email} ({name})")
+        if status == QUEUED:
+            request["queued_at"] = request["created_at"]
+        
+        def created():
+            self.scheduler.coach_index.record_request(request)
+            self.logger.info(f"Annotation request created: {request['id']} for {coach_email} ({status})")
+            event_stream.publish(REQUEST_CREATED, [coach_email, student_email], request)
+        
+        if uow is not None:
+            uow.load(self.requests_file).setdefault("requests", []).append(request)
+            uow.on_commit(created)
+            return request
+        
+        with file_lock(self.requests_file):
+            data = self._load_data(self.requests_file)
+            data.setdefault("requests", []).append(request)
+            self._save_data(self.requests_file, data)
+            created()
         return request
     
     def _calculate_cost(self, coach_email: str) -> float:
@@ -134,24 +171,26 @@ class CoachNotificationSystem:
             return coach.get("hourly_rate", 50) * 0.5
         return 25.0  # Default cost
     
+    @timed
     def send_coach_notification(self, request_id: str) -> bool:
         """Send email notification to coach about annotation request"""
-        data = self._load_data(self.requests_file)
-        
-        # Find the request
-        request = None
-        for req in data.get("requests", []):
-            if req["id"] == request_id:
-                request = req
-                break
-        
-        if not request:
-            self.logger.error(f"Request {request_id} not found")
-            return False
-        
-        # Update request status
-        request["notified_at"] = datetime.now().isoformat()
-        self._save_data(self.requests_file, data)
+        with file_lock(self.requests_file):
+            data = self._load_data(self.requests_file)
+            
+            # Find the request
+            request = None
+            for req in data.get("requests", []):
+                if req["id"] == request_id:
+                    request = req
+                    break
+            
+            if not request:
+                self.logger.error(f"Request {request_id} not found")
+                return False
+            
+            # Update request status
+            request["notified_at"] = datetime.now().isoformat()
+            self._save_data(self.requests_file, data)
         
         # Send email
         try:
@@ -183,6 +222,7 @@ class CoachNotificationSystem:
             self.logger.error(f"Error sending notification: {str(e)}")
             return False
     
+    @timed
     def _send_email(self, to_email: str, to_name: str, subject: str, 
                    template: str, context: Dict) -> bool:
         """Send email using SMTP"""
@@ -289,6 +329,7 @@ class CoachNotificationSystem:
         
         return logs
     
+    @timed
     def get_daily_report(self, date: str = None):
         """Get daily activity report"""
         if date is None:
@@ -336,88 +377,166 @@ class CoachNotificationSystem:
         data = self._load_data(self.requests_file)
         return data.get("buckets", [])
 
+    @timed
     def process_annotation_request(self, student_email: str, student_name: str,
                                  coach_email: str, video_filename: str, 
-                                 message: str = "") -> Dict:
+                                 message: str = "", priority: str = "normal",
+                                 auto_assign: bool = False, idempotency_key: str = None) -> Dict:
         """Main function to process an annotation request with video permissions"""
-        
-        # First, upload/register the video
-        video_result = self.video_permissions.upload_video(
-            student_email=student_email,
-            video_filename=video_filename
-        )
-        
-        if not video_result["success"]:
-            return {"success": False, "error": f"Failed to upload video: {video_result.get('error', 'Unknown error')}"}
-        
-        video_id = video_result["video_id"]
+        if priority not in PRIORITY_RANK:
+            return {"success": False, "error": f"Invalid priority: {priority}"}
+        
+        # A retried submission gets the first submission's result without touching the other files
+        key = fingerprint = None
+        if idempotency_key:
+            if len(idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+                return {"success": False, "error": "Idempotency key is too long"}
+            key = f"{student_email}:{idempotency_key}"
+            fingerprint = hashlib.sha256(json.dumps(
+                [coach_email, video_filename, message, priority, auto_assign]).encode()).hexdigest()
+            replay = self._replay_submission(self._load_data(self.idempotency_file), key, fingerprint)
+            if replay:
+                return replay
         
         # Check if coach exists
         coach_exists = self.check_coach_exists(coach_email)
         
-        if coach_exists:
-            # Get coach information
-            coach = self.get_coach_by_email(coach_email)
-            coach_name = coach["name"]
+        # Video, permissions, request and idempotency key are committed together or not at all
+        with UnitOfWork(self.journal_file,
+                        [self.requests_file, self.idempotency_file,
+                         self.video_permissions.videos_file, self.video_permissions.permissions_file],
+                        loader=self._load_data) as uow:
+            if key:
+                replay = self._replay_submission(uow.load(self.idempotency_file), key, fingerprint)
+                if replay:
+                    return replay
             
-            # Create request
-            request = self.create_coach_request(
+            # First, upload/register the video
+            video_result = self.video_permissions.upload_video(
                 student_email=student_email,
-                student_name=student_name,
-                coach_email=coach_email,
-                coach_name=coach_name,
                 video_filename=video_filename,
-                message=message
+                uow=uow
             )
             
-            # Assign coach permissions (read and edit only, no delete)
-            permission_result = self.video_permissions.assign_coach_permissions(
-                video_id=video_id,
-                coach_email=coach_email,
-                request_id=request["id"]
-            )
+            if not video_result["success"]:
+                return {"success": False, "error": f"Failed to upload video: {video_result.get('error', 'Unknown error')}"}
             
-            # Send notification
-            notification_sent = self.send_coach_notification(request["id"])
+            video_id = video_result["video_id"]
             
-            return {
-                "success": True,
-                "coach_exists": True,
-                "request_id": request["id"],
-                "video_id": video_id,
-                "notification_sent": notification_sent,
-                "permissions_assigned": permission_result["success"],
-                "estimated_cost": request["estimated_cost"],
-                "message": f"Request sent to {coach_name}. Video permissions assigned. Email notification {'sent' if notification_sent else 'failed'}."
-            }
-        
-        else:
-            # Coach doesn't exist - create invitation
-            invitation = self._create_coach_invitation(
-                student_email=student_email,
-                student_name=student_name,
-                coach_email=coach_email,
-                video_filename=video_filename,
-                message=message,
-                video_id=video_id
-            )
+            if coach_exists:
+                # Route under the requests lock so concurrent submissions see each other's load
+                assigned_email = self.scheduler.choose_coach(coach_email, auto_assign)
+                
+                # Get coach information
+                coach = self.get_coach_by_email(assigned_email or coach_email)
+                coach_name = coach["name"]
+                
+                # Create request; without a coach with free capacity it waits in the overflow queue
+                request = self.create_coach_request(
+                    student_email=student_email,
+                    student_name=student_name,
+                    coach_email=coach["email"],
+                    coach_name=coach_name,
+                    video_filename=video_filename,
+                    message=message,
+                    video_id=video_id,
+                    status="pending" if assigned_email else QUEUED,
+                    priority=priority,
+                    auto_assign=auto_assign,
+                    uow=uow
+                )
+                
+                if not assigned_email:
+                    result = {
+                        "success": True,
+                        "coach_exists": True,
+                        "queued": True,
+                        "request_id": request["id"],
+                        "video_id": video_id,
+                        "estimated_cost": request["estimated_cost"],
+                        "message": f"{coach_name} is at capacity. Your request is queued and will be assigned as soon as a coach is available."
+                    }
+                else:
+                    # Assign coach permissions (read and edit only, no delete)
+                    permission_result = self.video_permissions.assign_coach_permissions(
+                        video_id=video_id,
+                        coach_email=assigned_email,
+                        request_id=request["id"],
+                        uow=uow
+                    )
+                    
+                    result = {
+                        "success": True,
+                        "coach_exists": True,
+                        "queued": False,
+                        "request_id": request["id"],
+                        "video_id": video_id,
+                        "assigned_coach_email": assigned_email,
+                        "rerouted": assigned_email != coach_email,
+                        "permissions_assigned": permission_result["success"],
+                        "estimated_cost": request["estimated_cost"],
+                        "message": f"Request sent to {coach_name}. Video permissions assigned."
+                    }
             
-            return {
-                "success": True,
-                "coach_exists": False,
-                "invitation_id": invitation["id"],
-                "video_id": video_id,
-                "message": f"Coach invitation sent to {coach_email}. Video uploaded and ready for when coach joins."
-            }
+            else:
+                # Coach doesn't exist - create invitation
+                invitation = self._create_coach_invitation(
+                    student_email=student_email,
+                    student_name=student_name,
+                    coach_email=coach_email,
+                    video_filename=video_filename,
+                    message=message,
+                    video_id=video_id,
+                    uow=uow
+                )
+                
+                result = {
+                    "success": True,
+                    "coach_exists": False,
+                    "invitation_id": invitation["id"],
+                    "video_id": video_id,
+                    "message": f"Coach invitation sent to {coach_email}. Video uploaded and ready for when coach joins."
+                }
+            
+            if key:
+                self._remember_submission(uow.load(self.idempotency_file), key, fingerprint, result)
+            uow.commit()
+        
+        # Emails and queue bookkeeping follow the commit; a retry replays the result above without them
+        if not coach_exists:
+            self._send_coach_invitation(invitation)
+        elif result["queued"]:
+            self.scheduler.enqueue(request)
+        else:
+            notification_sent = self.send_coach_notification(request["id"])
+            result = dict(result, notification_sent=notification_sent,
+                          message=f"{result['message']} Email notification {'sent' if notification_sent else 'failed'}.")
+        return result
+    
+    def _replay_submission(self, data: Dict, key: str, fingerprint: str) -> Optional[Dict]:
+        """Stored result for a live idempotency key, or an error if it was used for a different submission"""
+        entry = data.get("keys", {}).get(key)
+        if entry is None or datetime.fromisoformat(entry["created_at"]) < datetime.now() - timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS):
+            return None
+        if entry["fingerprint"] != fingerprint:
+            return {"success": False, "error": "Idempotency key was already used for a different request"}
+        metrics.inc("pickleball_idempotent_replays_total")
+        return dict(entry["result"], replayed=True)
+    
+    def _remember_submission(self, data: Dict, key: str, fingerprint: str, result: Dict):
+        """Store a submission's result under its key and drop expired keys"""
+        cutoff = (datetime.now() - timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)).isoformat()
+        keys = {k: entry for k, entry in data.get("keys", {}).items() if entry["created_at"] >= cutoff}
+        keys[key] = {"fingerprint": fingerprint, "result": result, "created_at": datetime.now().isoformat()}
+        data["keys"] = keys
     
     def _create_coach_invitation(self, student_email: str, student_name: str,
                                 coach_email: str, video_filename: str, 
-                                message: str = "", video_id: str = None):
-        """Create a coach invitation for non-existing coaches"""
-        data = self._load_data(self.requests_file)
-        
+                                message: str = "", video_id: str = None,
+                                uow: Optional[UnitOfWork] = None):
+        """Create a coach invitation for non-existing coaches (the caller sends the email)"""
         invitation = {
-            "id": f"inv_{len(data.get('requests', [])) + 1}",
+            "id": new_id("inv"),
             "type": "coach_invitation",
             "student_email": student_email,
             "student_name": student_name,
@@ -431,11 +550,13 @@ class CoachNotificationSystem:
             "coach_joined_at": None
         }
         
-        data.setdefault("requests", []).append(invitation)
-        self._save_data(self.requests_file, data)
-        
-        # Send invitation email
-        self._send_coach_invitation(invitation)
+        if uow is not None:
+            uow.load(self.requests_file).setdefault("requests", []).append(invitation)
+        else:
+            with file_lock(self.requests_file):
+                data = self._load_data(self.requests_file)
+                data.setdefault("requests", []).append(invitation)
+                self._save_data(self.requests_file, data)
         
         self.logger.info(f"Created coach invitation: {invitation['id']} for {coach_email}")
         return invitation
@@ -460,12 +581,13 @@ class CoachNotificationSystem:
             
             if success:
                 # Update invitation status
-                data = self._load_data(self.requests_file)
-                for req in data.get("requests", []):
-                    if req["id"] == invitation["id"]:
-                        req["invitation_sent_at"] = datetime.now().isoformat()
-                        break
-                self._save_data(self.requests_file, data)
+                with file_lock(self.requests_file):
+                    data = self._load_data(self.requests_file)
+                    for req in data.get("requests", []):
+                        if req["id"] == invitation["id"]:
+                            req["invitation_sent_at"] = datetime.now().isoformat()
+                            break
+                    self._save_data(self.requests_file, data)
             
             return success
             
@@ -473,6 +595,7 @@ class CoachNotificationSystem:
             self.logger.error(f"Error sending coach invitation: {str(e)}")
             return False
     
+    @timed
     def get_pending_requests(self, coach_email: str = None):
         """Get pending requests, optionally filtered by coach"""
         data = self._load_data(self.requests_file)
@@ -483,21 +606,210 @@ class CoachNotificationSystem:
         
         return [req for req in requests if req["status"] == "pending"]
     
+    @timed
     def update_request_status(self, request_id: str, status: str, response: str = "") -> bool:
         """Update request status (accepted, declined, completed)"""
-        data = self._load_data(self.requests_file)
+        with file_lock(self.requests_file):
+            data = self._load_data(self.requests_file)
+            
+            for request in data.get("requests", []):
+                if request["id"] == request_id:
+                    freed_capacity = request["status"] == "pending" and status != "pending"
+                    request["status"] = status
+                    request["response"] = response
+                    request["responded_at"] = datetime.now().isoformat()
+                    
+                    self._save_data(self.requests_file, data)
+                    self.scheduler.coach_index.record_request(request)
+                    self.logger.info(f"Request {request_id} status updated to {status}")
+                    event_stream.publish(
+                        REQUEST_STATUS,
+                        [request.get("coach_email"), request.get("student_email")],
+                        {key: request.get(key) for key in
+                         ("id", "status", "response", "responded_at", "estimated_cost")}
+                    )
+                    break
+            else:
+                return False
         
-        for request in data.get("requests", []):
-            if request["id"] == request_id:
-                request["status"] = status
-                request["response"] = response
-                request["responded_at"] = datetime.now().isoformat()
-                
-                self._save_data(self.requests_file, data)
-                self.logger.info(f"Request {request_id} status updated to {status}")
-                return True
+        if freed_capacity:
+            self._dispatch_queued(request["coach_email"])
+        return True
+    
+    def _dispatch_queued(self, coach_email: str):
+        """Hand queued requests to a coach while it has free capacity"""
+        while self.scheduler.has_capacity(coach_email):
+            entry = self.scheduler.next_for_coach(coach_email)
+            if entry is None:
+                return
+            self._assign_queued_request(entry["id"], coach_email)
+    
+    def _assign_queued_request(self, request_id: str, coach_email: str) -> bool:
+        """Move a queued request to a coach, grant video access and notify them"""
+        coach = self.get_coach_by_email(coach_email)
+        estimated_cost = self._calculate_cost(coach_email)
+        
+        with file_lock(self.requests_file):
+            data = self._load_data(self.requests_file)
+            
+            request = None
+            for req in data.get("requests", []):
+                # Another process may have assigned it already
+                if req["id"] == request_id and req["status"] == QUEUED:
+                    request = req
+                    request.update({
+                        "status": "pending",
+                        "coach_email": coach_email,
+                        "coach_name": coach["name"],
+                        "estimated_cost": estimated_cost,
+                        "assigned_at": datetime.now().isoformat()
+                    })
+                    self._save_data(self.requests_file, data)
+                    self.scheduler.coach_index.record_request(request)
+                    break
+            self.scheduler.mark_assigned(request_id)
+        
+        if request is None:
+            return False
         
-        return False
+        self.logger.info(f"Queued request {request_id} assigned to {coach_email}")
+        event_stream.publish(REQUEST_STATUS, [coach_email, request["student_email"]], request)
+        if request.get("video_id"):
+            self.video_permissions.assign_coach_permissions(request["video_id"], coach_email, request_id)
+        self.send_coach_notification(request_id)
+        return True
+    
+    def _mark_pending_request(self, request_id: str, marker: str) -> Optional[Dict]:
+        """Stamp an SLA marker on a pending request once; returns the request when this call set it"""
+        with file_lock(self.requests_file):
+            data = self._load_data(self.requests_file)
+            for request in data.get("requests", []):
+                if request["id"] == request_id:
+                    if request["status"] != "pending" or request.get(marker):
+                        return None
+                    request[marker] = datetime.now().isoformat()
+                    self._save_data(self.requests_file, data)
+                    return request
+        return None
+    
+    def _is_pending(self, request_id: str) -> bool:
+        data = self._load_data(self.requests_file)
+        return any(req["id"] == request_id and req["status"] == "pending" for req in data.get("requests", []))
+    
+    def send_request_reminder(self, request_id: str) -> bool:
+        """Remind the coach of a request still waiting for an answer; True while it stays pending"""
+        request = self._mark_pending_request(request_id, "reminded_at")
+        if request is None:
+            return self._is_pending(request_id)
+        
+        self.logger.info(f"SLA reminder for request {request_id} sent to {request['coach_email']}")
+        self._send_email(
+            to_email=request["coach_email"],
+            to_name=request["coach_name"],
+            subject="Reminder: Pickleball Video Annotation Request Waiting",
+            template="coach_notification",
+            context={
+                "coach_name": request["coach_name"],
+                "student_name": request["student_name"],
+                "student_email": request["student_email"],
+                "video_filename": request["video_filename"],
+                "message": request["message"],
+                "estimated_cost": request["estimated_cost"],
+                "request_id": request["id"],
+                "login_url": "http://localhost:5001/coach/login"
+            }
+        )
+        return True
+    
+    def escalate_request(self, request_id: str, reason: str = "No coach response within the SLA") -> bool:
+        """Open an escalation on the admin console for an overdue request; True while it stays pending"""
+        request = self._mark_pending_request(request_id, "escalated_at")
+        if request is None:
+            return self._is_pending(request_id)
+        
+        escalation = {
+            "id": new_id("esc"),
+            "request_id": request_id,
+            "coach_email": request["coach_email"],
+            "student_email": request["student_email"],
+            "reason": reason,
+            "created_at": request["escalated_at"],
+            "status": "open"
+        }
+        with file_lock(self.escalations_file):
+            data = self._load_data(self.escalations_file)
+            data.setdefault("escalations", []).append(escalation)
+            self._save_data(self.escalations_file, data)
+        
+        self.logger.warning(f"Request {request_id} escalated: {reason}")
+        return True
+    
+    def expire_request(self, request_id: str) -> bool:
+        """Reassign an overdue request to a similar coach if the student allowed it, otherwise expire it"""
+        # The request moves to the new coach together with the video access
+        with UnitOfWork(self.journal_file,
+                        [self.requests_file,
+                         self.video_permissions.videos_file, self.video_permissions.permissions_file],
+                        loader=self._load_data) as uow:
+            data = uow.load(self.requests_file)
+            request = next((req for req in data.get("requests", []) if req["id"] == request_id), None)
+            if request is None or request["status"] != "pending":
+                return False
+            
+            previous_coach = request["coach_email"]
+            new_coach = None
+            if request.get("auto_assign"):
+                new_coach = self.scheduler.least_loaded_similar(previous_coach, exclude=[previous_coach])
+            
+            now = datetime.now().isoformat()
+            # The coach who let the request lapse loses access either way, in the same commit
+            if request.get("video_id"):
+                self.video_permissions.revoke_many(
+                    [{"video_id": request["video_id"], "user_email": previous_coach}], uow=uow)
+            if new_coach:
+                request.update({
+                    "coach_email": new_coach,
+                    "coach_name": self.get_coach_by_email(new_coach)["name"],
+                    "estimated_cost": self._calculate_cost(new_coach),
+                    "assigned_at": now,
+                    "reassigned_from": previous_coach,
+                    "notified_at": None,
+                    "reminded_at": None,
+                    "escalated_at": None
+                })
+                if request.get("video_id"):
+                    self.video_permissions.assign_coach_permissions(
+                        request["video_id"], new_coach, request_id, uow=uow)
+            else:
+                request.update({"status": "expired", "expired_at": now})
+            uow.commit()
+            self.scheduler.coach_index.record_request(request)
+        
+        if new_coach:
+            self.logger.info(f"Request {request_id} reassigned from {previous_coach} to {new_coach} after SLA expiry")
+            event_stream.publish(REQUEST_STATUS, [new_coach, previous_coach, request["student_email"]], request)
+            self.send_coach_notification(request_id)
+        else:
+            self.logger.info(f"Request {request_id} expired without a response from {previous_coach}")
+            event_stream.publish(
+                REQUEST_STATUS,
+                [previous_coach, request["student_email"]],
+                {key: request.get(key) for key in ("id", "status", "response", "responded_at", "estimated_cost")}
+            )
+            self._dispatch_queued(previous_coach)
+        return True
+    
+    def get_requests_created_between(self, start: datetime, end: datetime) -> List[Dict]:
+        """Get requests created in [start, end] by comparing time-sortable IDs instead of parsing created_at"""
+        low, high = id_range_bounds("req", start, end)
+        # Legacy IDs such as req_12 do not sort by time; their ISO created_at strings still compare as text
+        start_text, end_text = start.isoformat(), end.isoformat()
+        data = self._load_data(self.requests_file)
+        return [
+            req for req in data.get("requests", [])
+            if (low <= req["id"] <= high if len(req["id"]) == len(low)
+                else start_text <= req.get("created_at", "") <= end_text)
+        ]
 
 # Example usage
 if __name__ == "__main__":
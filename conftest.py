@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Shared Test Fixtures
+Runs each test in its own empty directory, with the Flask apps' module singletons rebuilt inside it
+"""
+
+import re
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import pytest
+
+import event_stream as event_stream_module
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Empty working directory; the systems create data/, logs/ and videos/ relative to it"""
+    monkeypatch.chdir(tmp_path)
+    yield str(tmp_path)
+    event_stream_module.event_stream.stop()
+
+# The apps are imported after the chdir: each module builds its singleton on first import
+
+@pytest.fixture
+def dashboard(workdir, monkeypatch):
+    """coach_dashboard's singleton for this directory; the routes look it up as a module global"""
+    import coach_dashboard
+    monkeypatch.setattr(coach_dashboard, "dashboard", coach_dashboard.CoachDashboard())
+    return coach_dashboard.dashboard
+
+@pytest.fixture
+def console(workdir, monkeypatch):
+    """web_root_console's singleton for this directory"""
+    import web_root_console
+    monkeypatch.setattr(web_root_console, "console", web_root_console.WebRootConsole())
+    return web_root_console.console
+
+@pytest.fixture
+def student_system(workdir, monkeypatch):
+    """student_request_system's singleton for this directory"""
+    import student_request_system
+    monkeypatch.setattr(student_request_system, "system", student_request_system.StudentRequestSystem())
+    return student_request_system.system
+
+# S3 stand-in: FakeS3Error carries a botocore-style response so S3BlobStore maps missing keys the same way
+
+class FakeS3Error(Exception):
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+class _Body:
+    def __init__(self, data: bytes):
+        self._data = data
+
+    def read(self) -> bytes:
+        return self._data
+
+class FakeS3Client:
+    """In-memory stand-in for the subset of the S3 API that S3BlobStore uses, in the spirit of a local MinIO"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.objects: Dict[Tuple[str, str], Tuple[bytes, datetime]] = {}
+        self.uploads: Dict[str, Dict[int, bytes]] = {}
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes):
+        with self._lock:
+            self.objects[(Bucket, Key)] = (bytes(Body), datetime.now())
+        return {"ETag": uuid.uuid4().hex}
+
+    def get_object(self, Bucket: str, Key: str, Range: Optional[str] = None):
+        with self._lock:
+            if (Bucket, Key) not in self.objects:
+                raise FakeS3Error("NoSuchKey")
+            data = self.objects[(Bucket, Key)][0]
+        if Range:
+            match = re.match(r"bytes=(\d+)-(\d*)$", Range)
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else len(data) - 1
+            data = data[start:end + 1]
+        return {"Body": _Body(data), "ContentLength": len(data)}
+
+    def head_object(self, Bucket: str, Key: str):
+        with self._lock:
+            if (Bucket, Key) not in self.objects:
+                raise FakeS3Error("404")
+            data, modified = self.objects[(Bucket, Key)]
+        return {"ContentLength": len(data), "LastModified": modified}
+
+    def delete_object(self, Bucket: str, Key: str):
+        with self._lock:
+            self.objects.pop((Bucket, Key), None)
+        return {}
+
+    def create_multipart_upload(self, Bucket: str, Key: str):
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket: str, Key: str, UploadId: str, PartNumber: int, Body: bytes):
+        with self._lock:
+            self.uploads[UploadId][PartNumber] = bytes(Body)
+        return {"ETag": f'"{PartNumber}-{len(Body)}"'}
+
+    def complete_multipart_upload(self, Bucket: str, Key: str, UploadId: str, MultipartUpload: Dict):
+        with self._lock:
+            parts = self.uploads.pop(UploadId)
+            data = b"".join(parts[p["PartNumber"]] for p in MultipartUpload["Parts"])
+            self.objects[(Bucket, Key)] = (data, datetime.now())
+        return {}
+
+    def abort_multipart_upload(self, Bucket: str, Key: str, UploadId: str):
+        with self._lock:
+            self.uploads.pop(UploadId, None)
+        return {}
+
+@pytest.fixture
+def s3_client():
+    """Empty in-memory S3 client for S3BlobStore"""
+    return FakeS3Client()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+PickleballAI Data Store
+File locking and atomic writes for the shared JSON data files
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Callable, Dict, Iterable, List, Optional
+
+from metrics_system import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: locks only serialize threads within one process
+    fcntl = None
+
+_registry_lock = threading.Lock()
+_thread_locks: Dict[str, threading.RLock] = {}
+_held = threading.local()
+
+def _thread_lock(file_path: str) -> threading.RLock:
+    with _registry_lock:
+        lock = _thread_locks.get(file_path)
+        if lock is None:
+            lock = _thread_locks[file_path] = threading.RLock()
+        return lock
+
+@contextmanager
+def file_lock(file_path: str):
+    """Exclusive lock on a data file across threads and processes (re-entrant per thread)"""
+    file_path = os.path.abspath(file_path)
+    depth = getattr(_held, "depth", None)
+    if depth is None:
+        depth = _held.depth = {}
+
+    lock = _thread_lock(file_path)
+    with lock:
+        if depth.get(file_path):
+            depth[file_path] += 1
+            try:
+                yield
+            finally:
+                depth[file_path] -= 1
+            return
+
+        lock_file = None
+        if fcntl is not None:
+            lock_file = open(f"{file_path}.lock", 'a')
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        depth[file_path] = 1
+        try:
+            yield
+        finally:
+            depth[file_path] = 0
+            if lock_file is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
+
+def collection_version(file_path: str) -> str:
+    """Version token for a data file from a single stat(); every atomic_write_json swaps in a new inode"""
+    try:
+        st = os.stat(file_path)
+    except FileNotFoundError:
+        return "missing"
+    return f"{st.st_ino}-{st.st_mtime_ns}-{st.st_size}"
+
+def _fsync_dir(dir_path: str):
+    """Flush a directory entry (a rename) to disk; Windows cannot open directories and has nothing to do"""
+    if os.name == "nt":
+        return
+    fd = os.open(dir_path or ".", os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _write_text(file_path: str, text: str, durable: bool = False):
+    temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'w') as f:
+        f.write(text)
+        if durable:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(temp_path, file_path)
+    if durable:
+        _fsync_dir(os.path.dirname(file_path))
+
+def atomic_write_json(file_path: str, data: Dict, indent: Optional[int] = 2, durable: bool = False):
+    """Write JSON to a temp file and rename it over the target so readers never see a torn file
+
+    With durable the contents and the rename are on disk before this returns, not just in the page cache.
+    """
+    # dumps() encodes in one pass (in C when unindented); dump() streams through the Python encoder
+    _write_text(file_path, json.dumps(data, indent=indent), durable)
+
+def load_json(file_path: str) -> Dict:
+    """Read and parse a data file, recording its size and parse time; a missing file is empty"""
+    try:
+        start = time.perf_counter()
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        data = json.loads(raw)
+        metrics.record_file_read(file_path, len(raw), time.perf_counter() - start)
+        return data
+    except FileNotFoundError:
+        return {}
+
+def _read_json(file_path: str) -> Dict:
+    try:
+        with open(file_path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def recover_journal(journal_path: str):
+    """Roll forward a unit of work whose process died between its journal write and its file writes"""
+    while os.path.exists(journal_path):
+        file_paths = sorted(_read_json(journal_path).get("files", {}))
+        # Same order as UnitOfWork: data files first, the journal last
+        with ExitStack() as stack:
+            for file_path in file_paths:
+                stack.enter_context(file_lock(file_path))
+            stack.enter_context(file_lock(journal_path))
+            journal = _read_json(journal_path)
+            if not journal:
+                return
+            if sorted(journal.get("files", {})) != file_paths:
+                continue
+            for file_path, data in journal["files"].items():
+                atomic_write_json(file_path, data, durable=True)
+            os.remove(journal_path)
+
+class UnitOfWork:
+    """Stage changes to several locked data files and commit them together; without commit() nothing is written
+
+    The journal and the files are fsynced, so a commit survives power loss as well as a crashed process.
+    """
+
+    def __init__(self, journal_path: str, file_paths: Iterable[str],
+                 loader: Optional[Callable[[str], Dict]] = None):
+        self.journal_path = journal_path
+        self.file_paths = sorted(set(file_paths))
+        self.loader = loader or _read_json
+        self._staged: Dict[str, Dict] = {}
+        # Unindented JSON of each file as loaded, to tell which working copies were changed
+        self._loaded: Dict[str, str] = {}
+        self._on_commit: List[Callable[[], None]] = []
+        self._on_abort: List[Callable[[], None]] = []
+        self._committed = False
+        self._stack = None
+
+    def __enter__(self):
+        recover_journal(self.journal_path)
+        self._stack = ExitStack()
+        for file_path in self.file_paths:
+            self._stack.enter_context(file_lock(file_path))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if not self._committed:
+                for callback in self._on_abort:
+                    callback()
+        finally:
+            self._stack.close()
+        return False
+
+    def load(self, file_path: str) -> Dict:
+        """Working copy of a locked data file; changes to it are written on commit"""
+        if file_path not in self.file_paths:
+            raise ValueError(f"{file_path} is not part of this unit of work")
+        if file_path not in self._staged:
+            self._staged[file_path] = self.loader(file_path)
+            self._loaded[file_path] = json.dumps(self._staged[file_path])
+        return self._staged[file_path]
+
+    def on_commit(self, callback: Callable[[], None]):
+        """Run after the files are written, while their locks are still held"""
+        self._on_commit.append(callback)
+
+    def on_abort(self, callback: Callable[[], None]):
+        """Undo a side effect outside the data files if the unit of work is abandoned"""
+        self._on_abort.append(callback)
+
+    def commit(self):
+        # Files that were only read are neither journaled nor rewritten
+        changed = {}
+        for file_path, data in self._staged.items():
+            text = json.dumps(data)
+            if text != self._loaded[file_path]:
+                changed[file_path] = text
+        if changed:
+            # The journal write is the commit point; recover_journal finishes the file writes after a crash.
+            # Unindented JSON takes the C encoder; nobody reads the journal by hand
+            journal = ", ".join(f"{json.dumps(file_path)}: {text}" for file_path, text in changed.items())
+            with file_lock(self.journal_path):
+                _write_text(self.journal_path, f'{{"files": {{{journal}}}}}', durable=True)
+                for file_path in changed:
+                    atomic_write_json(file_path, self._staged[file_path], durable=True)
+                # Only once every file is on disk; a journal that survives anyway is replayed harmlessly
+                os.remove(self.journal_path)
+        self._committed = True
+        for callback in self._on_commit:
+            callback()
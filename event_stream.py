@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+PickleballAI Event Stream
+Append-only event log shared by all apps, tailed once per process and fanned out to SSE subscribers
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from data_store import file_lock
+from id_allocator import new_id
+from metrics_system import metrics
+
+EVENTS_FILE = os.path.join("data", "events.jsonl")
+MAX_EVENTS_FILE_BYTES = 10 * 1024 * 1024
+HISTORY_SIZE = 2000
+SEED_BYTES = 512 * 1024
+SUBSCRIBER_QUEUE_SIZE = 100
+HEARTBEAT_SECONDS = 15
+POLL_INTERVAL_SECONDS = 0.25
+
+# Event types pushed to dashboards
+REQUEST_CREATED = "request_created"
+REQUEST_STATUS = "request_status"
+ANNOTATIONS_ADDED = "annotations_added"
+# Picked up by the media pipeline
+VIDEO_UPLOADED = "video_uploaded"
+CLIPS_REQUESTED = "clips_requested"
+ANALYSIS_REQUESTED = "analysis_requested"
+RESYNC = "resync"
+
+metrics.describe("pickleball_event_subscribers", "Open event stream connections")
+metrics.describe("pickleball_events_published_total", "Events appended to the event log")
+metrics.describe("pickleball_events_delivered_total", "Events handed to subscriber queues")
+
+logger = logging.getLogger(__name__)
+
+class Subscription:
+    def __init__(self, user_email: str):
+        self.user_email = user_email
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def push(self, event: Dict):
+        """Queue an event without blocking the tailer; a full queue marks the client for resync"""
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+class EventStream:
+    def __init__(self, events_file: str = EVENTS_FILE, history_size: int = HISTORY_SIZE,
+                 poll_interval: float = POLL_INTERVAL_SECONDS):
+        self.events_file = events_file
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._history = deque(maxlen=history_size)
+        self._subscribers: Dict[str, set] = {}
+        self._subscriber_count = 0
+        self._listeners: List[Callable[[Dict], None]] = []
+        self._tailer = None
+        self._stop = threading.Event()
+
+    def publish(self, event_type: str, audience: Iterable[str], payload: Dict) -> Optional[Dict]:
+        """Append an event for the given users; failures are logged, never raised to the write path"""
+        event = {
+            "id": new_id("evt"),
+            "type": event_type,
+            "audience": sorted({email for email in audience if email}),
+            "data": payload,
+            "created_at": datetime.now().isoformat()
+        }
+        line = json.dumps(event, separators=(",", ":")) + "\n"
+
+        try:
+            os.makedirs(os.path.dirname(self.events_file) or ".", exist_ok=True)
+            with file_lock(self.events_file):
+                self._rotate_if_needed()
+                with open(self.events_file, 'a') as f:
+                    f.write(line)
+        except OSError as e:
+            logger.error(f"Failed to publish {event_type} event: {e}")
+            return None
+
+        metrics.inc("pickleball_events_published_total", type=event_type)
+        return event
+
+    def _rotate_if_needed(self):
+        """Start a new log once the current one is large; caller holds the events file lock"""
+        try:
+            if os.path.getsize(self.events_file) >= MAX_EVENTS_FILE_BYTES:
+                os.replace(self.events_file, f"{self.events_file}.1")
+        except FileNotFoundError:
+            pass
+
+    def subscribe(self, user_email: str) -> Subscription:
+        """Register a connection for a user and make sure the tailer is running"""
+        self._ensure_tailer()
+        subscription = Subscription(user_email)
+        with self._lock:
+            self._subscribers.setdefault(user_email, set()).add(subscription)
+            self._subscriber_count += 1
+            metrics.set_gauge("pickleball_event_subscribers", self._subscriber_count)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove a connection once its client goes away"""
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.user_email)
+            if subscriptions and subscription in subscriptions:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[subscription.user_email]
+                self._subscriber_count -= 1
+                metrics.set_gauge("pickleball_event_subscribers", self._subscriber_count)
+
+    def add_listener(self, callback: Callable[[Dict], None]):
+        """Call back with every event appended from now on, whatever its audience (for in-memory indexes)"""
+        self._ensure_tailer()
+        with self._lock:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[Dict], None]):
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def events_since(self, user_email: str, last_event_id: Optional[str]) -> Optional[List[Dict]]:
+        """Events for a user after last_event_id, or None when it has fallen out of history"""
+        with self._lock:
+            history = list(self._history)
+
+        if last_event_id:
+            for index in range(len(history) - 1, -1, -1):
+                if history[index]["id"] == last_event_id:
+                    history = history[index + 1:]
+                    break
+            else:
+                return None
+        else:
+            history = []
+
+        return [event for event in history if user_email in event["audience"]]
+
+    def wait_for_events(self, user_email: str, last_event_id: Optional[str],
+                        timeout: float) -> List[Dict]:
+        """Long-poll: return missed events at once, otherwise block until one arrives or timeout"""
+        subscription = self.subscribe(user_email)
+        try:
+            missed = self.events_since(user_email, last_event_id)
+            if missed is None:
+                return [self._resync_event()]
+            if missed:
+                return missed
+
+            try:
+                events = [subscription.queue.get(timeout=timeout)]
+            except queue.Empty:
+                return []
+            while True:
+                try:
+                    events.append(subscription.queue.get_nowait())
+                except queue.Empty:
+                    return events
+        finally:
+            self.unsubscribe(subscription)
+
+    def sse_stream(self, user_email: str, last_event_id: Optional[str] = None,
+                   heartbeat_seconds: float = HEARTBEAT_SECONDS) -> Iterator[str]:
+        """Server-sent events for one connection; idle connections just block on their queue"""
+        subscription = self.subscribe(user_email)
+        try:
+            yield f"retry: {int(heartbeat_seconds * 1000)}\n\n"
+
+            # Replayed events may also be in the queue already; skip them there
+            replayed = set()
+            if last_event_id:
+                missed = self.events_since(user_email, last_event_id)
+                for event in missed if missed is not None else [self._resync_event()]:
+                    replayed.add(event["id"])
+                    yield _format_sse(event)
+
+            while not self._stop.is_set():
+                if subscription.overflowed:
+                    yield _format_sse(self._resync_event())
+                    return
+                try:
+                    event = subscription.queue.get(timeout=heartbeat_seconds)
+                except queue.Empty:
+                    # Comment line keeps proxies from closing the connection and detects dead clients
+                    yield ": keepalive\n\n"
+                    continue
+                if event["id"] not in replayed:
+                    yield _format_sse(event)
+        finally:
+            self.unsubscribe(subscription)
+
+    def _resync_event(self) -> Dict:
+        with self._lock:
+            last_id = self._history[-1]["id"] if self._history else None
+        return {"id": last_id, "type": RESYNC, "data": {}}
+
+    def _ensure_tailer(self):
+        with self._lock:
+            if self._tailer is not None and self._tailer.is_alive():
+                return
+            self._stop.clear()
+            # Open before returning so nothing published after subscribe() is missed
+            f = self._open_at_end()
+            self._tailer = threading.Thread(target=self._tail, args=(f,),
+                                            name="event-stream-tailer", daemon=True)
+            self._tailer.start()
+
+    def stop(self):
+        """Stop the tailer thread (used by tests)"""
+        self._stop.set()
+        if self._tailer is not None:
+            self._tailer.join(timeout=5)
+
+    def _open_at_end(self):
+        """Open the log at its end, seeding history from the tail so reconnects survive restarts"""
+        try:
+            f = open(self.events_file, 'rb')
+        except FileNotFoundError:
+            return None
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - SEED_BYTES))
+        lines = f.read().decode("utf-8", errors="replace").split("\n")
+        if size > SEED_BYTES:
+            lines = lines[1:]  # first line is probably cut
+        for line in lines[-self._history.maxlen:]:
+            try:
+                self._history.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return f
+
+    def _tail(self, f):
+        """Follow the event log from its current end, surviving rotation by other processes"""
+        partial = b""
+        while not self._stop.is_set():
+            if f is None:
+                try:
+                    f = open(self.events_file, 'rb')
+                except FileNotFoundError:
+                    self._stop.wait(self.poll_interval)
+                    continue
+
+            chunk = f.read()
+            if chunk:
+                lines = (partial + chunk).split(b"\n")
+                partial = lines.pop()
+                self._dispatch(lines)
+                continue
+
+            # Caught up; if the log was rotated, switch to the new file once the old one is drained
+            try:
+                rotated = os.stat(self.events_file).st_ino != os.fstat(f.fileno()).st_ino
+            except FileNotFoundError:
+                rotated = False
+            if rotated:
+                f.close()
+                f = None
+                partial = b""
+                continue
+
+            self._stop.wait(self.poll_interval)
+
+        if f is not None:
+            f.close()
+
+    def _dispatch(self, lines: List[bytes]):
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                event = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                logger.error("Skipping malformed event log line")
+                continue
+
+            with self._lock:
+                self._history.append(event)
+                targets = [subscription
+                           for email in event.get("audience", [])
+                           for subscription in self._subscribers.get(email, ())]
+                listeners = list(self._listeners)
+
+            for listener in listeners:
+                try:
+                    listener(event)
+                except Exception as e:
+                    logger.error(f"Event listener failed on {event.get('type')}: {e}")
+            for subscription in targets:
+                subscription.push(event)
+            if targets:
+                metrics.inc("pickleball_events_delivered_total", len(targets), type=event.get("type", ""))
+
+def _format_sse(event: Dict) -> str:
+    """Encode an event as an SSE message; the audience stays server-side"""
+    payload = json.dumps(event.get("data", {}), separators=(",", ":"))
+    lines = [f"event: {event['type']}", f"data: {payload}"]
+    if event.get("id"):
+        lines.insert(0, f"id: {event['id']}")
+    return "\n".join(lines) + "\n\n"
+
+# Process-wide stream shared by all subsystems
+event_stream = EventStream()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+PickleballAI HTTP Cache
+Strong ETags from data file versions, 304 answers without touching the data, and static asset caching
+"""
+
+import functools
+import hashlib
+import os
+from typing import Callable, Optional
+
+from data_store import collection_version
+
+# Static files requested with ?v=<version> never change, so browsers may keep them for a year
+VERSIONED_STATIC_CACHE = "public, max-age=31536000, immutable"
+UNVERSIONED_STATIC_CACHE = "public, max-age=300, must-revalidate"
+# Generated media (sprite sheets, thumbnail tracks) never changes once written, but sits behind a login
+PRIVATE_MEDIA_CACHE = "private, max-age=31536000, immutable"
+# API responses are per user and must be revalidated, which costs one stat() per file
+API_CACHE = "private, no-cache"
+ENCODING_SUFFIXES = ("", "-gzip", "-br")
+
+def compute_etag(*file_paths: str, extra: Optional[Callable[[], str]] = None) -> str:
+    """ETag for the current request: route, query, session identity and data file versions
+
+    extra returns a version for state that changes without a file write, such as grants lapsing.
+    """
+    from flask import request, session
+
+    parts = [request.path, request.query_string.decode("latin-1")]
+    parts.extend(f"{key}={session[key]}" for key in sorted(session.keys()))
+    parts.extend(collection_version(path) for path in file_paths)
+    if extra is not None:
+        parts.append(extra())
+    return hashlib.sha1("\0".join(parts).encode("utf-8")).hexdigest()
+
+def conditional(*file_paths: str, extra: Optional[Callable[[], str]] = None) -> Callable:
+    """Serve GETs with a strong ETag and answer a matching If-None-Match with 304 before the view runs"""
+    def decorator(view: Callable) -> Callable:
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            from flask import make_response, request
+
+            if request.method not in ("GET", "HEAD"):
+                return view(*args, **kwargs)
+
+            etag = compute_etag(*file_paths, extra=extra)
+            # Compressed representations carry the encoding as a suffix (see api_response)
+            # Only listed tags count: "If-None-Match: *" would answer 304 before the view checks the session
+            matched = next((etag + suffix for suffix in ENCODING_SUFFIXES
+                            if request.if_none_match.is_strong(etag + suffix)), None)
+            if matched:
+                response = make_response("", 304)
+                etag = matched
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = API_CACHE
+            response.vary.add("Cookie")
+            return response
+        return wrapper
+    return decorator
+
+def init_app(app):
+    """Cache headers for static assets and a static_url() template helper that adds ?v=<version>"""
+    from flask import request, url_for
+
+    def static_url(filename: str) -> str:
+        path = os.path.join(app.static_folder, filename)
+        version = None
+        if os.path.exists(path):
+            version = hashlib.sha1(collection_version(path).encode("utf-8")).hexdigest()[:10]
+        return url_for("static", filename=filename, v=version)
+
+    @app.context_processor
+    def _static_url_helper():
+        return {"static_url": static_url}
+
+    @app.after_request
+    def _static_cache_headers(response):
+        if request.endpoint == "static" and response.status_code in (200, 304):
+            response.headers["Cache-Control"] = (VERSIONED_STATIC_CACHE if request.args.get("v")
+                                                 else UNVERSIONED_STATIC_CACHE)
+        return response
+
+    return app
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+PickleballAI ID Allocator
+Monotonic, time-sortable record IDs (ULID-style) that need no collection read to allocate
+"""
+
+import bisect
+import secrets
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+# Crockford base32, as used by ULID; lexicographic order matches numeric order
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+TIME_CHARS = 10    # 48-bit millisecond timestamp
+RANDOM_CHARS = 16  # 80 random bits
+RANDOM_BITS = 80
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        value, remainder = divmod(value, 32)
+        chars.append(ALPHABET[remainder])
+    return "".join(reversed(chars))
+
+def _decode(text: str) -> int:
+    value = 0
+    for char in text:
+        value = value * 32 + ALPHABET.index(char)
+    return value
+
+class IdAllocator:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+
+    def new_id(self, prefix: str) -> str:
+        """Allocate an ID such as req_01J9Z3M4K8Q2X7V5T1N6B0C2D4
+
+        IDs from one process are strictly increasing: within the same
+        millisecond the random part is incremented instead of redrawn.
+        Separate processes draw 80 random bits, so they do not collide.
+        """
+        with self._lock:
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._last_random = secrets.randbits(RANDOM_BITS)
+            else:
+                self._last_random += 1
+                if self._last_random >= 1 << RANDOM_BITS:
+                    # Random space exhausted for this millisecond; borrow the next one
+                    self._last_ms += 1
+                    self._last_random = secrets.randbits(RANDOM_BITS - 1)
+            timestamp_ms, random_part = self._last_ms, self._last_random
+
+        return f"{prefix}_{_encode(timestamp_ms, TIME_CHARS)}{_encode(random_part, RANDOM_CHARS)}"
+
+def id_timestamp(record_id: str) -> Optional[datetime]:
+    """Creation time encoded in an allocated ID, or None for legacy IDs like req_12"""
+    _, _, body = record_id.rpartition("_")
+    if len(body) != TIME_CHARS + RANDOM_CHARS or any(c not in ALPHABET for c in body):
+        return None
+    return datetime.fromtimestamp(_decode(body[:TIME_CHARS]) / 1000)
+
+def id_range_bounds(prefix: str, start: datetime, end: datetime) -> Tuple[str, str]:
+    """Lowest and highest possible IDs created in [start, end], for string range scans"""
+    start_ms = int(start.timestamp() * 1000)
+    end_ms = int(end.timestamp() * 1000)
+    return (
+        f"{prefix}_{_encode(start_ms, TIME_CHARS)}{ALPHABET[0] * RANDOM_CHARS}",
+        f"{prefix}_{_encode(end_ms, TIME_CHARS)}{ALPHABET[-1] * RANDOM_CHARS}"
+    )
+
+def ids_in_range(sorted_ids: List[str], prefix: str, start: datetime, end: datetime) -> List[str]:
+    """Slice of an ascending list of allocated IDs created in [start, end] via binary search"""
+    low, high = id_range_bounds(prefix, start, end)
+    return sorted_ids[bisect.bisect_left(sorted_ids, low):bisect.bisect_right(sorted_ids, high)]
+
+# Process-wide allocator shared by all subsystems
+id_allocator = IdAllocator()
+
+def new_id(prefix: str) -> str:
+    return id_allocator.new_id(prefix)
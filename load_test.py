@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+PickleballAI Load Test
+Drives the student, coach and root console apps with concurrent simulated users
+and checks the JSON data files for lost updates afterwards
+"""
+
+import argparse
+import http.cookiejar
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from data_store import atomic_write_json, file_lock, load_json
+from id_allocator import new_id
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+COACH_PASSWORD = "password123"
+STUDENT_PASSWORD = "password123"
+
+class FlaskClientSession:
+    """Talks to an in-process Flask app through its test client"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method: str, path: str, json_body: Dict = None,
+                form: Dict = None) -> Tuple[int, bytes]:
+        response = self.client.open(path, method=method, json=json_body, data=form)
+        return response.status_code, response.get_data()
+
+class HttpSession:
+    """Talks to a running app over HTTP with its own cookie jar"""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def request(self, method: str, path: str, json_body: Dict = None,
+                form: Dict = None) -> Tuple[int, bytes]:
+        headers = {}
+        body = None
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+            headers["Content-Type"] = "application/json"
+        elif form is not None:
+            body = urllib.parse.urlencode(form).encode()
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+
+        req = urllib.request.Request(self.base_url + path, data=body,
+                                     headers=headers, method=method)
+        try:
+            with self.opener.open(req, timeout=30) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+class LoadStats:
+    """Per-worker latency samples; merged once at the end so workers never contend"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.expected = defaultdict(int)
+
+    def record(self, route: str, seconds: float, ok: bool):
+        self.samples[route].append(seconds)
+        if not ok:
+            self.errors[route] += 1
+
+    def merge(self, other: "LoadStats"):
+        for route, values in other.samples.items():
+            self.samples[route].extend(values)
+        for route, count in other.errors.items():
+            self.errors[route] += count
+        for key, count in other.expected.items():
+            self.expected[key] += count
+
+def _timed_call(stats: LoadStats, session, route: str, method: str, path: str,
+                json_body: Dict = None, form: Dict = None) -> Tuple[int, Optional[Dict]]:
+    start = time.perf_counter()
+    try:
+        status, body = session.request(method, path, json_body=json_body, form=form)
+    except Exception:
+        stats.record(route, time.perf_counter() - start, False)
+        return 0, None
+    stats.record(route, time.perf_counter() - start, status < 400)
+
+    payload = None
+    if body[:1] in (b"{", b"["):
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            pass
+    return status, payload
+
+def student_worker(session, email: str, coaches: List[str], stats: LoadStats,
+                   stop_at: float, rng: random.Random):
+    session.request("POST", "/login", form={"email": email, "password": STUDENT_PASSWORD})
+    n = 0
+    while time.perf_counter() < stop_at:
+        n += 1
+        coach = rng.choice(coaches)
+        filename = f"{email.split('@')[0]}_{n}.mp4"
+
+        if n % 2:
+            status, _ = _timed_call(stats, session, "POST /submit-request", "POST", "/submit-request",
+                                    form={"coach_email": coach, "video_filename": filename,
+                                          "message": "load test"})
+            ok = status == 200
+        else:
+            status, payload = _timed_call(stats, session, "POST /api/submit-request", "POST",
+                                          "/api/submit-request",
+                                          json_body={"coach_email": coach, "video_filename": filename,
+                                                     "message": "load test"})
+            ok = bool(payload and payload.get("success"))
+
+        if ok:
+            stats.expected["videos"] += 1
+            stats.expected["requests"] += 1
+
+        _timed_call(stats, session, "GET /api/requests (student)", "GET", "/api/requests")
+
+def coach_worker(session, email: str, stats: LoadStats, stop_at: float, rng: random.Random):
+    session.request("POST", "/login", form={"email": email, "password": COACH_PASSWORD})
+    n = 0
+    while time.perf_counter() < stop_at:
+        n += 1
+        _timed_call(stats, session, "GET /dashboard", "GET", "/dashboard")
+        _timed_call(stats, session, "GET /api/requests (coach)", "GET", "/api/requests")
+        _, payload = _timed_call(stats, session, "GET /api/videos", "GET", "/api/videos")
+
+        videos = (payload or {}).get("videos") or []
+        if not videos:
+            continue
+
+        video_id = rng.choice(videos)["id"]
+        path = f"/api/videos/{video_id}/annotations"
+        _, result = _timed_call(stats, session, "POST /api/videos/<id>/annotations", "POST", path,
+                                json_body={"annotations": [{
+                                    "timestamp": rng.randint(0, 600),
+                                    "type": "technique",
+                                    "text": f"load test note {n}"
+                                }]})
+        if result and result.get("success"):
+            stats.expected["annotations"] += result.get("annotations_added", 0)
+
+        _timed_call(stats, session, "GET /api/videos/<id>/annotations", "GET", path)
+
+def admin_worker(session, stats: LoadStats, stop_at: float, rng: random.Random):
+    session.request("POST", "/login", form={"username": "admin", "password": "admin123"})
+    while time.perf_counter() < stop_at:
+        _timed_call(stats, session, "GET /api/report", "GET", "/api/report")
+        _timed_call(stats, session, "GET /api/coaches", "GET", "/api/coaches")
+        time.sleep(rng.uniform(0, 0.05))
+
+def seed_accounts(data_dir: str, num_coaches: int, num_students: int) -> Tuple[List[str], List[str]]:
+    """Add the coach and student accounts the simulated users log in with, keeping existing ones"""
+    os.makedirs(data_dir, exist_ok=True)
+    now = datetime.now().isoformat()
+    coaches = [f"coach{i}@loadtest.example.com" for i in range(num_coaches)]
+    students = [f"student{i}@loadtest.example.com" for i in range(num_students)]
+
+    coaches_file = os.path.join(data_dir, "coaches.json")
+    with file_lock(coaches_file):
+        data = load_json(coaches_file)
+        records = data.setdefault("coaches", [])
+        existing = {c.get("email") for c in records}
+        records.extend(
+            {
+                "id": new_id("coach"), "email": email, "name": f"Load Coach {i}",
+                "password": COACH_PASSWORD, "specialization": "serve", "hourly_rate": 60,
+                "status": "active", "created_at": now, "total_earnings": 0.0, "total_sessions": 0
+            }
+            for i, email in enumerate(coaches) if email not in existing
+        )
+        atomic_write_json(coaches_file, data)
+
+    users_file = os.path.join(data_dir, "users.json")
+    with file_lock(users_file):
+        data = load_json(users_file)
+        records = data.setdefault("users", [])
+        existing = {u.get("email") for u in records}
+        records.extend(
+            {
+                "id": new_id("user"), "email": email, "name": f"Load Student {i}",
+                "password": STUDENT_PASSWORD, "role": "student", "status": "active",
+                "created_at": now, "total_spent": 0.0, "total_sessions": 0
+            }
+            for i, email in enumerate(students) if email not in existing
+        )
+        atomic_write_json(users_file, data)
+
+    return coaches, students
+
+def _is_live_data_dir(data_dir: str) -> bool:
+    """Whether data_dir is the data/ directory the apps use when started from here or the repo"""
+    target = os.path.realpath(data_dir)
+    return target in {os.path.realpath(os.path.join(REPO_DIR, "data")), os.path.realpath("data")}
+
+def check_lost_updates(data_dir: str, expected: Dict[str, int], students: List[str]) -> Dict:
+    """Compare acknowledged writes with what actually landed in the JSON files"""
+    student_set = set(students)
+    corrupt_files = []
+
+    def load(name: str, key: str) -> List[Dict]:
+        try:
+            with open(os.path.join(data_dir, name), 'r') as f:
+                return json.load(f).get(key, [])
+        except OSError:
+            return []
+        except ValueError:
+            # A torn write left the file unparseable
+            corrupt_files.append(name)
+            return []
+
+    videos = [v for v in load("videos.json", "videos") if v.get("student_email") in student_set]
+    requests = [r for r in load("annotation_requests.json", "requests")
+                if r.get("student_email") in student_set]
+    annotations = sum(len(v.get("annotations", [])) for v in videos)
+
+    video_ids = [v["id"] for v in videos]
+    request_ids = [r["id"] for r in requests]
+    duplicate_annotation_ids = 0
+    for video in videos:
+        ids = [a.get("annotation_id") for a in video.get("annotations", [])]
+        duplicate_annotation_ids += len(ids) - len(set(ids))
+
+    found = {"videos": len(videos), "requests": len(requests), "annotations": annotations}
+    return {
+        "expected": dict(expected),
+        "found": found,
+        "lost": {k: max(0, expected.get(k, 0) - found[k]) for k in found},
+        "corrupt_files": corrupt_files,
+        "duplicate_ids": {
+            "videos": len(video_ids) - len(set(video_ids)),
+            "requests": len(request_ids) - len(set(request_ids)),
+            "annotations": duplicate_annotation_ids
+        }
+    }
+
+def summarize(stats: LoadStats, elapsed: float) -> Dict:
+    routes = {}
+    total = 0
+    total_errors = 0
+    for route, values in sorted(stats.samples.items()):
+        ordered = sorted(values)
+        count = len(ordered)
+        total += count
+        total_errors += stats.errors.get(route, 0)
+
+        def pct(q):
+            return round(ordered[min(count - 1, int(q * count))] * 1000, 3)
+
+        routes[route] = {
+            "requests": count,
+            "throughput_rps": round(count / elapsed, 2),
+            "error_rate": round(stats.errors.get(route, 0) / count, 4),
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99)
+        }
+
+    return {
+        "duration_seconds": round(elapsed, 3),
+        "total_requests": total,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0,
+        "error_rate": round(total_errors / total, 4) if total else 0,
+        "routes": routes
+    }
+
+def run_load_test(students: int = 8, coaches: int = 4, admins: int = 1,
+                  duration: float = 10.0, seed: int = 42,
+                  base_urls: Optional[Dict[str, str]] = None,
+                  data_dir: Optional[str] = None) -> Dict:
+    """Run concurrent simulated users against in-process apps or running servers"""
+    temp_dir = None
+    original_dir = os.getcwd()
+
+    if base_urls:
+        if data_dir is None:
+            raise ValueError("data_dir is required to check lost updates against running servers")
+        make_session = {name: (lambda url=url: HttpSession(url)) for name, url in base_urls.items()}
+    else:
+        temp_dir = tempfile.TemporaryDirectory(prefix="pickleball_load_")
+        data_dir = os.path.join(temp_dir.name, "data")
+        os.chdir(temp_dir.name)
+        if REPO_DIR not in sys.path:
+            sys.path.insert(0, REPO_DIR)
+
+    try:
+        coach_emails, student_emails = seed_accounts(data_dir, coaches, students) \
+            if not base_urls else _existing_accounts(data_dir, coaches, students)
+
+        if not base_urls:
+            # Apps are imported after chdir so they use the temporary data directory
+            import student_request_system
+            import coach_dashboard
+            import web_root_console
+
+            # Email delivery is not part of the request path being measured
+            student_request_system.system.notification_system._send_email = lambda **kwargs: True
+            logging.getLogger().setLevel(logging.WARNING)
+            for module in (student_request_system, coach_dashboard, web_root_console):
+                # Failed requests are counted in the report instead of printing tracebacks
+                module.app.logger.setLevel(logging.CRITICAL)
+
+            make_session = {
+                "student": lambda: FlaskClientSession(student_request_system.app),
+                "coach": lambda: FlaskClientSession(coach_dashboard.app),
+                "root": lambda: FlaskClientSession(web_root_console.app)
+            }
+
+        rng = random.Random(seed)
+        worker_stats = []
+        threads = []
+        stop_at = time.perf_counter() + duration
+
+        def spawn(target, *args):
+            stats = LoadStats()
+            worker_stats.append(stats)
+            thread = threading.Thread(target=target, args=args + (stats, stop_at,
+                                                                  random.Random(rng.random())))
+            threads.append(thread)
+
+        for email in student_emails[:students]:
+            spawn(student_worker, make_session["student"](), email, coach_emails)
+        for email in coach_emails[:coaches]:
+            spawn(coach_worker, make_session["coach"](), email)
+        for _ in range(admins):
+            spawn(admin_worker, make_session["root"]())
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        merged = LoadStats()
+        for stats in worker_stats:
+            merged.merge(stats)
+
+        report = summarize(merged, elapsed)
+        report["users"] = {"students": students, "coaches": coaches, "admins": admins}
+        report["consistency"] = check_lost_updates(data_dir, merged.expected, student_emails)
+        return report
+    finally:
+        os.chdir(original_dir)
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+def _existing_accounts(data_dir: str, coaches: int, students: int) -> Tuple[List[str], List[str]]:
+    """Use the seeded load-test accounts of a running deployment"""
+    with open(os.path.join(data_dir, "coaches.json"), 'r') as f:
+        coach_emails = [c["email"] for c in json.load(f).get("coaches", [])
+                        if c["email"].endswith("@loadtest.example.com")]
+    with open(os.path.join(data_dir, "users.json"), 'r') as f:
+        student_emails = [u["email"] for u in json.load(f).get("users", [])
+                          if u["email"].endswith("@loadtest.example.com")]
+    if len(coach_emails) < coaches or len(student_emails) < students:
+        raise ValueError("Not enough load-test accounts; run with --seed-only against the data directory first")
+    return coach_emails, student_emails
+
+def print_report(report: Dict):
+    print(f"\n📈 {report['total_requests']} requests in {report['duration_seconds']}s "
+          f"({report['throughput_rps']} req/s, error rate {report['error_rate']:.2%})")
+    print(f"{'Route':<40} {'Reqs':>7} {'RPS':>8} {'Err%':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    print("-" * 95)
+    for route, r in report["routes"].items():
+        print(f"{route:<40} {r['requests']:>7} {r['throughput_rps']:>8} {r['error_rate']:>7.2%} "
+              f"{r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9}")
+
+    consistency = report["consistency"]
+    print("\n🔎 Consistency check")
+    for key in ("videos", "requests", "annotations"):
+        print(f"   {key:<12} acknowledged {consistency['expected'].get(key, 0):>6}  "
+              f"stored {consistency['found'][key]:>6}  lost {consistency['lost'][key]:>6}  "
+              f"duplicate ids {consistency['duplicate_ids'][key]:>4}")
+    if consistency["corrupt_files"]:
+        print(f"   corrupt files: {', '.join(consistency['corrupt_files'])}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the PickleballAI Flask apps")
+    parser.add_argument("--students", type=int, default=8, help="Concurrent simulated students")
+    parser.add_argument("--coaches", type=int, default=4, help="Concurrent simulated coaches")
+    parser.add_argument("--admins", type=int, default=1, help="Concurrent simulated admins")
+    parser.add_argument("--duration", type=float, default=10.0, help="Test duration in seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--student-url", help="Base URL of a running student app (default: in-process)")
+    parser.add_argument("--coach-url", help="Base URL of a running coach dashboard")
+    parser.add_argument("--root-url", help="Base URL of a running root console")
+    parser.add_argument("--data-dir", help="Data directory of the running apps (for lost-update checks)")
+    parser.add_argument("--seed-only", action="store_true",
+                        help="Only create load-test accounts in --data-dir and exit")
+    parser.add_argument("--allow-live-data", action="store_true",
+                        help="Allow --seed-only to add accounts to the apps' own data/ directory")
+    parser.add_argument("--output", help="Write machine-readable results to this JSON file")
+    args = parser.parse_args()
+
+    if args.seed_only:
+        data_dir = args.data_dir or "data"
+        if _is_live_data_dir(data_dir) and not args.allow_live_data:
+            parser.error(f"refusing to seed accounts into {data_dir}; pass --allow-live-data to do so")
+        seed_accounts(data_dir, args.coaches, args.students)
+        print("✅ Load-test accounts created")
+        return
+
+    base_urls = None
+    if args.student_url or args.coach_url or args.root_url:
+        if not (args.student_url and args.coach_url and args.root_url):
+            parser.error("--student-url, --coach-url and --root-url must be given together")
+        base_urls = {"student": args.student_url, "coach": args.coach_url, "root": args.root_url}
+
+    report = run_load_test(args.students, args.coaches, args.admins, args.duration,
+                           args.seed, base_urls, args.data_dir)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    consistency = report["consistency"]
+    if (any(consistency["lost"].values()) or any(consistency["duplicate_ids"].values())
+            or consistency["corrupt_files"]):
+        print("\n❌ Lost updates or duplicate IDs detected")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
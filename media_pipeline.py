@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+"""
+PickleballAI Media Pipeline
+Post-upload stages (HLS renditions, sprite-sheet previews), clips of annotated moments and technique analysis
+"""
+
+import json
+import logging
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import analysis_engine
+from analysis_engine import AnalysisEngine, AnalysisSummary
+from data_store import file_lock
+from event_stream import ANALYSIS_REQUESTED, CLIPS_REQUESTED, VIDEO_UPLOADED, event_stream
+from metrics_system import metrics
+
+# Lowest first; renditions are never scaled above the source height
+RENDITIONS = [
+    {"name": "360p", "width": 640, "height": 360, "video_bitrate": 800_000, "audio_bitrate": 96_000},
+    {"name": "540p", "width": 960, "height": 540, "video_bitrate": 1_600_000, "audio_bitrate": 96_000},
+    {"name": "720p", "width": 1280, "height": 720, "video_bitrate": 3_000_000, "audio_bitrate": 128_000},
+]
+SEGMENT_SECONDS = 4
+# Scrubbing previews: a thumbnail every PREVIEW_INTERVAL_SECONDS, tiled into sprite sheets
+PREVIEW_INTERVAL_SECONDS = 5
+THUMB_WIDTH = 160
+THUMB_HEIGHT = 90
+SPRITE_COLUMNS = 10
+SPRITE_ROWS = 10
+THUMBNAIL_TRACK = "thumbnails.vtt"
+# Clips around annotated moments: whole seconds either side, so nearby requests share a clip
+CLIP_PADDING_SECONDS = 5
+MAX_CLIP_PADDING_SECONDS = 30
+# Stages run in this order for every upload; each keeps its own <stage>_status on the video record
+STAGES = ("transcode", "preview")
+PENDING_STATES = ("pending", "queued", "processing")
+# Each worker runs one ffmpeg process, which is itself multi-threaded
+TRANSCODE_WORKERS = int(os.environ.get("PICKLEBALL_TRANSCODE_WORKERS", 2))
+TRANSCODE_TIMEOUT_SECONDS = 3600
+PROBE_TIMEOUT_SECONDS = 60
+MASTER_PLAYLIST = "master.m3u8"
+
+metrics.describe("pickleball_media_jobs_total", "Media pipeline stages finished, by stage and outcome")
+metrics.describe("pickleball_media_job_seconds_total", "Wall time spent in media pipeline stages")
+metrics.describe("pickleball_analysis_frames_total", "Frames run through the analysis engine")
+metrics.describe("pickleball_media_queue", "Videos waiting for or going through the media pipeline")
+
+logger = logging.getLogger(__name__)
+
+def find_ffmpeg() -> Optional[str]:
+    """PICKLEBALL_FFMPEG, else ffmpeg on the PATH; None when this node cannot transcode"""
+    return os.environ.get("PICKLEBALL_FFMPEG") or shutil.which("ffmpeg")
+
+def find_ffprobe(ffmpeg: Optional[str] = None) -> Optional[str]:
+    """PICKLEBALL_FFPROBE, else the ffprobe next to ffmpeg, else ffprobe on the PATH"""
+    if os.environ.get("PICKLEBALL_FFPROBE"):
+        return os.environ["PICKLEBALL_FFPROBE"]
+    if ffmpeg:
+        sibling = os.path.join(os.path.dirname(ffmpeg), "ffprobe")
+        if os.access(sibling, os.X_OK):
+            return sibling
+    return shutil.which("ffprobe")
+
+def hls_key(video_id: str, name: str) -> str:
+    """Blob key of an HLS file, stored next to the original upload"""
+    return f"{video_id}_hls_{name}"
+
+def preview_key(video_id: str, name: str) -> str:
+    """Blob key of a sprite sheet or the thumbnail track"""
+    return f"{video_id}_preview_{name}"
+
+def analysis_key(video_id: str) -> str:
+    """Blob key of the per-frame analysis results, one JSON object per line"""
+    return f"{video_id}_analysis.jsonl"
+
+def clip_key(video_id: str, clip_id: str) -> str:
+    return f"{video_id}_{clip_id}.mp4"
+
+def clip_window(timestamp: float, padding: float = CLIP_PADDING_SECONDS) -> Tuple[int, int]:
+    """Whole-second (start, end) around a moment; equal windows are one clip"""
+    return max(int(math.floor(timestamp - padding)), 0), int(math.ceil(timestamp + padding))
+
+def ffmpeg_command(ffmpeg: str, source: str, output_dir: str) -> List[str]:
+    """One ffmpeg run that decodes the source once and writes every rendition as an HLS playlist"""
+    command = [ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-i", source]
+    for rendition in RENDITIONS:
+        name = rendition["name"]
+        command += [
+            "-map", "0:v:0", "-map", "0:a:0?",
+            "-vf", f"scale=-2:'min({rendition['height']},ih)'",
+            "-c:v", "libx264", "-preset", "veryfast", "-profile:v", "main",
+            "-b:v", str(rendition["video_bitrate"]),
+            "-maxrate", str(int(rendition["video_bitrate"] * 1.1)),
+            "-bufsize", str(rendition["video_bitrate"] * 2),
+            # Keyframes at every segment boundary whatever the frame rate, so renditions switch cleanly
+            "-force_key_frames", f"expr:gte(t,n_forced*{SEGMENT_SECONDS})", "-sc_threshold", "0",
+            "-c:a", "aac", "-b:a", str(rendition["audio_bitrate"]), "-ac", "2",
+            "-f", "hls", "-hls_time", str(SEGMENT_SECONDS), "-hls_playlist_type", "vod",
+            "-hls_segment_filename", os.path.join(output_dir, f"{name}_%03d.ts"),
+            os.path.join(output_dir, f"{name}.m3u8"),
+        ]
+    return command
+
+def probe_command(ffprobe: str, source: str) -> List[str]:
+    """Width and height of the first video stream, printed as WIDTHxHEIGHT"""
+    return [ffprobe, "-v", "error", "-select_streams", "v:0", "-show_entries", "stream=width,height",
+            "-of", "csv=p=0:s=x", source]
+
+def output_size(rendition: Dict, source_size: Tuple[int, int]) -> Tuple[int, int]:
+    """Frame size ffmpeg_command's scale filter gives a rendition: capped at the source height, even width"""
+    source_width, source_height = source_size
+    height = min(rendition["height"], source_height)
+    return 2 * round(source_width * height / source_height / 2), height
+
+def master_playlist(renditions: List[Dict], source_size: Optional[Tuple[int, int]] = None) -> str:
+    """Variant playlist the player starts from; RESOLUTION is left out when the source size is unknown"""
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3"]
+    for rendition in renditions:
+        attributes = f"BANDWIDTH={rendition['video_bitrate'] + rendition['audio_bitrate']}"
+        if source_size:
+            width, height = output_size(rendition, source_size)
+            attributes += f",RESOLUTION={width}x{height}"
+        lines.append(f"#EXT-X-STREAM-INF:{attributes}")
+        lines.append(f"{rendition['name']}.m3u8")
+    return "\n".join(lines) + "\n"
+
+def thumbnail_command(ffmpeg: str, source: str, thumbs_dir: str) -> List[str]:
+    """Periodic thumbnails of identical size; only keyframes are decoded, which keeps long matches cheap"""
+    scale = (f"scale={THUMB_WIDTH}:{THUMB_HEIGHT}:force_original_aspect_ratio=decrease,"
+             f"pad={THUMB_WIDTH}:{THUMB_HEIGHT}:(ow-iw)/2:(oh-ih)/2")
+    return [ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-skip_frame", "nokey", "-i", source,
+            "-vf", f"fps=1/{PREVIEW_INTERVAL_SECONDS},{scale}", "-an", "-q:v", "5",
+            os.path.join(thumbs_dir, "%05d.jpg")]
+
+def sprite_command(ffmpeg: str, thumbs_dir: str, output_dir: str) -> List[str]:
+    """Tile the thumbnails into sheets of SPRITE_COLUMNS x SPRITE_ROWS, numbered from sprite_000.jpg"""
+    return [ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-framerate", "1",
+            "-i", os.path.join(thumbs_dir, "%05d.jpg"), "-vf", f"tile={SPRITE_COLUMNS}x{SPRITE_ROWS}",
+            "-q:v", "5", "-start_number", "0", os.path.join(output_dir, "sprite_%03d.jpg")]
+
+def clip_command(ffmpeg: str, source: str, start: int, end: int, output: str, copy: bool = True) -> List[str]:
+    """Seeking before -i lands on the keyframe at or before start; stream copy then cuts without re-encoding"""
+    command = [ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-ss", str(start), "-i", source,
+               "-t", str(end - start), "-map", "0:v:0", "-map", "0:a:0?"]
+    if copy:
+        command += ["-c", "copy", "-avoid_negative_ts", "make_zero"]
+    else:
+        command += ["-c:v", "libx264", "-preset", "veryfast", "-crf", "23", "-c:a", "aac", "-b:a", "128k"]
+    # Moov atom first so the clip starts playing before it has downloaded
+    return command + ["-movflags", "+faststart", output]
+
+def _vtt_time(seconds: float) -> str:
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:06.3f}"
+
+def thumbnail_track(count: int, interval: float = PREVIEW_INTERVAL_SECONDS) -> str:
+    """WebVTT cue per thumbnail, pointing at its tile as sprite_NNN.jpg#xywh=x,y,w,h"""
+    per_sheet = SPRITE_COLUMNS * SPRITE_ROWS
+    lines = ["WEBVTT", ""]
+    for index in range(count):
+        sheet, tile = divmod(index, per_sheet)
+        x, y = (tile % SPRITE_COLUMNS) * THUMB_WIDTH, (tile // SPRITE_COLUMNS) * THUMB_HEIGHT
+        lines.append(f"{_vtt_time(index * interval)} --> {_vtt_time((index + 1) * interval)}")
+        lines.append(f"sprite_{sheet:03d}.jpg#xywh={x},{y},{THUMB_WIDTH},{THUMB_HEIGHT}")
+        lines.append("")
+    return "\n".join(lines)
+
+class MediaPipeline:
+    def __init__(self, video_permissions, stream=event_stream, workers: int = TRANSCODE_WORKERS,
+                 ffmpeg: Optional[str] = None, engine: Optional[AnalysisEngine] = None,
+                 ffprobe: Optional[str] = None):
+        """video_permissions is the VideoPermissionSystem whose uploads are transcoded"""
+        self.video_permissions = video_permissions
+        self.stream = stream
+        self.workers = workers
+        self.ffmpeg = ffmpeg or find_ffmpeg()
+        self.ffprobe = ffprobe or find_ffprobe(self.ffmpeg)
+        # Technique analysis needs numpy; without it analysis requests wait for a node that has it
+        self.engine = engine or (AnalysisEngine(self.ffmpeg) if analysis_engine.available() else None)
+        self._lock = threading.Lock()
+        # Videos queued or transcoding in this process; a video is never transcoded twice at once
+        self._active = set()
+        self._rerun = set()
+        self._pool = None
+
+    def _update_video(self, video_id: str, **fields) -> Optional[Dict]:
+        """Set fields on a video record; None once the video is gone"""
+        videos_file = self.video_permissions.videos_file
+        with file_lock(videos_file):
+            data = self.video_permissions._load_data(videos_file)
+            video = next((v for v in data.get("videos", []) if v["id"] == video_id), None)
+            if video is None:
+                return None
+            video.update(fields)
+            self.video_permissions._save_data(videos_file, data)
+        return video
+
+    def _due_stages(self, video: Optional[Dict]) -> List[str]:
+        """Stages (and clip cutting) a video still needs"""
+        if not video:
+            return []
+        stages = [stage for stage in STAGES if video.get(f"{stage}_status") in PENDING_STATES]
+        if any(clip["status"] in PENDING_STATES for clip in video.get("clips", [])):
+            stages.append("clips")
+        # "pending" is every upload's initial analysis_status; only requested analyses are queued
+        if self.engine is not None and video.get("analysis_status") in ("queued", "processing"):
+            stages.append("analysis")
+        return stages
+
+    def submit(self, video_id: str) -> bool:
+        """Queue a video's unfinished stages; False when there are none or the pipeline is stopped"""
+        stages = self._due_stages(self.video_permissions.get_video(video_id))
+        with self._lock:
+            if self._pool is None or not stages:
+                return False
+            if video_id in self._active:
+                # Work requested while a job runs is picked up when that job ends
+                self._rerun.add(video_id)
+                return True
+            self._active.add(video_id)
+            metrics.set_gauge("pickleball_media_queue", len(self._active))
+        queued = {f"{stage}_status": "queued" for stage in stages if stage in STAGES}
+        if queued:
+            self._update_video(video_id, **queued)
+        self._pool.submit(self._run, video_id, stages)
+        return True
+
+    def apply_event(self, event: Dict):
+        """Uploads, clip and analysis requests from any app arrive as events"""
+        if event.get("type") not in (VIDEO_UPLOADED, CLIPS_REQUESTED, ANALYSIS_REQUESTED):
+            return
+        video_id = event.get("data", {}).get("video_id")
+        if video_id:
+            self.submit(video_id)
+
+    def _run(self, video_id: str, stages: List[str]):
+        handlers = {"transcode": self.transcode, "preview": self.generate_previews, "clips": self.cut_clips,
+                    "analysis": self.analyze}
+        try:
+            for stage in stages:
+                try:
+                    handlers[stage](video_id)
+                except Exception as e:
+                    logger.error(f"Media {stage} failed for {video_id}: {e}")
+                    if stage == "clips":
+                        self._finish_clips(video_id, {}, error=str(e))
+                    else:
+                        self._update_video(video_id, **{f"{stage}_status": "failed", f"{stage}_error": str(e)})
+        finally:
+            with self._lock:
+                self._active.discard(video_id)
+                rerun = video_id in self._rerun
+                self._rerun.discard(video_id)
+                metrics.set_gauge("pickleball_media_queue", len(self._active))
+            if rerun:
+                self.submit(video_id)
+
+    def _begin(self, video_id: str, stage: str) -> Optional[str]:
+        """Blob key of the original once the stage is marked processing; None (and failed) without one"""
+        video = self.video_permissions.get_video(video_id)
+        key = self.video_permissions.blob_key(video) if video else None
+        if not key or self.video_permissions.blobs.stat(key) is None:
+            self._update_video(video_id, **{f"{stage}_status": "failed",
+                                            f"{stage}_error": "Original file not available"})
+            metrics.inc("pickleball_media_jobs_total", stage=stage, outcome="missing")
+            return None
+        self._update_video(video_id, **{f"{stage}_status": "processing",
+                                        f"{stage}_started_at": datetime.now().isoformat()})
+        return key
+
+    def _local_source(self, key: str, work_dir: str) -> str:
+        """Path ffmpeg can read; remote blobs are copied because ffmpeg needs a seekable file"""
+        blobs = self.video_permissions.blobs
+        source = blobs.local_path(key)
+        if source is not None and os.path.exists(source):
+            return source
+        source = os.path.join(work_dir, "source")
+        with open(source, 'wb') as f:
+            for chunk in blobs.iter_range(key):
+                f.write(chunk)
+        return source
+
+    def _ffmpeg(self, command: List[str]) -> Optional[str]:
+        """Run one ffmpeg command; returns the error, or None on success"""
+        try:
+            subprocess.run(command, check=True, capture_output=True, timeout=TRANSCODE_TIMEOUT_SECONDS)
+        except subprocess.CalledProcessError as e:
+            return e.stderr.decode("utf-8", errors="replace").strip()[-500:] or f"ffmpeg exited with {e.returncode}"
+        except subprocess.TimeoutExpired:
+            return f"ffmpeg timed out after {TRANSCODE_TIMEOUT_SECONDS}s"
+        return None
+
+    def _probe(self, source: str) -> Optional[Tuple[int, int]]:
+        """(width, height) of the source's video stream; None without ffprobe or when it cannot be read"""
+        if not self.ffprobe:
+            return None
+        try:
+            output = subprocess.run(probe_command(self.ffprobe, source), check=True, capture_output=True,
+                                    timeout=PROBE_TIMEOUT_SECONDS).stdout.decode().strip()
+            width, height = (int(value) for value in output.splitlines()[0].split("x")[:2])
+        except (OSError, subprocess.SubprocessError, ValueError, IndexError):
+            return None
+        return (width, height) if width > 0 and height > 0 else None
+
+    def _store(self, output_dir: str, key_for: Callable[[str], str]) -> Tuple[List[str], int]:
+        """Upload every file of output_dir to the blob store; returns (file names, bytes)"""
+        files, total = [], 0
+        for name in sorted(os.listdir(output_dir)):
+            total += self.video_permissions.blobs.put_file(key_for(name), os.path.join(output_dir, name))
+            files.append(name)
+        return files, total
+
+    def _finish(self, video_id: str, stage: str, files: List[str], key_for: Callable[[str], str],
+                started: float, **fields) -> bool:
+        """Record a finished stage; False (and its files deleted) when the video was purged meanwhile"""
+        fields.update({f"{stage}_status": "completed", f"{stage}_error": None})
+        if self._update_video(video_id, **fields) is None:
+            for name in files:
+                self.video_permissions.blobs.delete(key_for(name))
+            return False
+        metrics.inc("pickleball_media_jobs_total", stage=stage, outcome="completed")
+        metrics.inc("pickleball_media_job_seconds_total", time.monotonic() - started, stage=stage)
+        return True
+
+    def _fail(self, video_id: str, stage: str, error: str, started: float) -> Dict:
+        self._update_video(video_id, **{f"{stage}_status": "failed", f"{stage}_error": error})
+        metrics.inc("pickleball_media_jobs_total", stage=stage, outcome="failed")
+        metrics.inc("pickleball_media_job_seconds_total", time.monotonic() - started, stage=stage)
+        logger.error(f"Media {stage} failed for {video_id}: {error}")
+        return {"success": False, "error": error}
+
+    def transcode(self, video_id: str) -> Dict:
+        """Write every rendition and the master playlist to the blob store and record them on the video"""
+        key = self._begin(video_id, "transcode")
+        if key is None:
+            return {"success": False, "error": "Original file not available"}
+        started = time.monotonic()
+        key_for = lambda name: hls_key(video_id, name)
+        work_dir = tempfile.mkdtemp(prefix=f"transcode_{video_id}_")
+        try:
+            output_dir = os.path.join(work_dir, "hls")
+            os.makedirs(output_dir)
+            source = self._local_source(key, work_dir)
+            error = self._ffmpeg(ffmpeg_command(self.ffmpeg, source, output_dir))
+            if error:
+                return self._fail(video_id, "transcode", error, started)
+            source_size = self._probe(source)
+            with open(os.path.join(output_dir, MASTER_PLAYLIST), 'w') as f:
+                f.write(master_playlist(RENDITIONS, source_size))
+            files, total = self._store(output_dir, key_for)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        renditions = [{"name": r["name"], "height": r["height"],
+                       "bandwidth": r["video_bitrate"] + r["audio_bitrate"],
+                       "playlist": f"{r['name']}.m3u8"} for r in RENDITIONS]
+        if not self._finish(video_id, "transcode", files, key_for, started,
+                            hls_manifest=MASTER_PLAYLIST, hls_files=files, renditions=renditions,
+                            rendition_bytes=total, transcoded_at=datetime.now().isoformat()):
+            return {"success": False, "error": "Video not found"}
+        logger.info(f"Transcoded {video_id} into {len(RENDITIONS)} renditions ({total} bytes)")
+        return {"success": True, "renditions": renditions, "files": len(files), "bytes": total}
+
+    def generate_previews(self, video_id: str) -> Dict:
+        """Tile periodic keyframe thumbnails into sprite sheets with a WebVTT track pointing into them"""
+        key = self._begin(video_id, "preview")
+        if key is None:
+            return {"success": False, "error": "Original file not available"}
+        started = time.monotonic()
+        key_for = lambda name: preview_key(video_id, name)
+        work_dir = tempfile.mkdtemp(prefix=f"preview_{video_id}_")
+        try:
+            thumbs_dir, output_dir = os.path.join(work_dir, "thumbs"), os.path.join(work_dir, "sprites")
+            os.makedirs(thumbs_dir)
+            os.makedirs(output_dir)
+            error = self._ffmpeg(thumbnail_command(self.ffmpeg, self._local_source(key, work_dir), thumbs_dir))
+            count = len(os.listdir(thumbs_dir))
+            if not error and not count:
+                error = "No frames could be extracted"
+            error = error or self._ffmpeg(sprite_command(self.ffmpeg, thumbs_dir, output_dir))
+            if error:
+                return self._fail(video_id, "preview", error, started)
+            with open(os.path.join(output_dir, THUMBNAIL_TRACK), 'w') as f:
+                f.write(thumbnail_track(count))
+            files, total = self._store(output_dir, key_for)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        if not self._finish(video_id, "preview", files, key_for, started,
+                            thumbnail_track=THUMBNAIL_TRACK, preview_files=files,
+                            preview_interval=PREVIEW_INTERVAL_SECONDS, previewed_at=datetime.now().isoformat()):
+            return {"success": False, "error": "Video not found"}
+        logger.info(f"Built {len(files) - 1} sprite sheets of {count} thumbnails for {video_id}")
+        return {"success": True, "thumbnails": count, "files": len(files), "bytes": total}
+
+    def cut_clips(self, video_id: str) -> Dict:
+        """Cut every pending clip of a video, stream-copying from keyframes and re-encoding only when that fails"""
+        video = self.video_permissions.get_video(video_id)
+        pending = [clip for clip in (video or {}).get("clips", []) if clip["status"] in PENDING_STATES]
+        if not pending:
+            return {"success": True, "clips": 0}
+        key = self.video_permissions.blob_key(video)
+        if not key or self.video_permissions.blobs.stat(key) is None:
+            self._finish_clips(video_id, {}, error="Original file not available")
+            return {"success": False, "error": "Original file not available"}
+
+        started = time.monotonic()
+        self._finish_clips(video_id, {clip["id"]: {"status": "processing"} for clip in pending})
+        results = {}
+        work_dir = tempfile.mkdtemp(prefix=f"clips_{video_id}_")
+        try:
+            source = self._local_source(key, work_dir)
+            for clip in pending:
+                output = os.path.join(work_dir, f"{clip['id']}.mp4")
+                error = self._ffmpeg(clip_command(self.ffmpeg, source, clip["start"], clip["end"], output))
+                reencoded = bool(error)
+                if error:
+                    error = self._ffmpeg(clip_command(self.ffmpeg, source, clip["start"], clip["end"], output,
+                                                      copy=False))
+                if error:
+                    results[clip["id"]] = {"status": "failed", "error": error}
+                    metrics.inc("pickleball_media_jobs_total", stage="clips", outcome="failed")
+                    continue
+                size = self.video_permissions.blobs.put_file(clip_key(video_id, clip["id"]), output)
+                results[clip["id"]] = {"status": "completed", "error": None, "bytes": size,
+                                       "reencoded": reencoded, "cut_at": datetime.now().isoformat()}
+                metrics.inc("pickleball_media_jobs_total", stage="clips", outcome="completed")
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        self._finish_clips(video_id, results)
+        metrics.inc("pickleball_media_job_seconds_total", time.monotonic() - started, stage="clips")
+        cut = sum(1 for result in results.values() if result["status"] == "completed")
+        logger.info(f"Cut {cut} of {len(pending)} clips for {video_id}")
+        return {"success": True, "clips": cut, "failed": len(pending) - cut}
+
+    def _finish_clips(self, video_id: str, results: Dict[str, Dict], error: Optional[str] = None):
+        """Merge per-clip results into the record; with error, every pending clip fails"""
+        videos_file = self.video_permissions.videos_file
+        with file_lock(videos_file):
+            data = self.video_permissions._load_data(videos_file)
+            video = next((v for v in data.get("videos", []) if v["id"] == video_id), None)
+            if video is None:
+                # Purged while cutting; nothing references the clips any more
+                for clip_id, result in results.items():
+                    if result["status"] == "completed":
+                        self.video_permissions.blobs.delete(clip_key(video_id, clip_id))
+                return
+            for clip in video.get("clips", []):
+                if clip["id"] in results:
+                    clip.update(results[clip["id"]])
+                elif error and clip["status"] in PENDING_STATES:
+                    clip.update(status="failed", error=error)
+            self.video_permissions._save_data(videos_file, data)
+
+    def analyze(self, video_id: str) -> Dict:
+        """Run the analysis engine over the video, store per-frame results and record a summary as analysis_data"""
+        key = self._begin(video_id, "analysis")
+        if key is None:
+            return {"success": False, "error": "Original file not available"}
+        started = time.monotonic()
+        summary = AnalysisSummary()
+        work_dir = tempfile.mkdtemp(prefix=f"analysis_{video_id}_")
+        try:
+            results_path = os.path.join(work_dir, "analysis.jsonl")
+            try:
+                # Results are written as they arrive; a two-hour match never sits in memory
+                with open(results_path, 'w') as f:
+                    for result in self.engine.analyze(self._local_source(key, work_dir)):
+                        f.write(json.dumps(result, separators=(",", ":")) + "\n")
+                        summary.add(result)
+            except Exception as e:
+                return self._fail(video_id, "analysis", str(e), started)
+            size = self.video_permissions.blobs.put_file(analysis_key(video_id), results_path)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        elapsed = time.monotonic() - started
+        analysis_data = summary.to_dict()
+        analysis_data.update(model=self.engine.model_name, sample_fps=self.engine.fps,
+                             frames_per_second=round(summary.frames / elapsed, 1) if elapsed else None,
+                             results_file=analysis_key(video_id), results_bytes=size)
+        if not self.video_permissions.record_analysis(video_id, analysis_data, "analysis_engine")["success"]:
+            self.video_permissions.blobs.delete(analysis_key(video_id))
+            return {"success": False, "error": "Video not found"}
+        metrics.inc("pickleball_media_jobs_total", stage="analysis", outcome="completed")
+        metrics.inc("pickleball_media_job_seconds_total", elapsed, stage="analysis")
+        metrics.inc("pickleball_analysis_frames_total", summary.frames)
+        logger.info(f"Analyzed {summary.frames} frames of {video_id} at {analysis_data['frames_per_second']} frames/s")
+        return {"success": True, "frames": summary.frames, "analysis": analysis_data}
+
+    def pending_video_ids(self) -> List[str]:
+        """Uploads with unfinished stages or clips, including jobs cut short by a restart"""
+        data = self.video_permissions._load_data(self.video_permissions.videos_file)
+        return [video["id"] for video in data.get("videos", [])
+                if self._due_stages(video) and not self.video_permissions.tombstones.contains(video["id"])]
+
+    def start(self) -> bool:
+        """Start the worker pool, pick up pending uploads and follow new ones; False without ffmpeg"""
+        if not self.ffmpeg:
+            # Uploads stay pending for a node that has ffmpeg; players fall back to the original file
+            logger.warning("ffmpeg not found; uploads will not be processed on this node")
+            return False
+        with self._lock:
+            if self._pool is not None:
+                return True
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="media")
+        self.stream.add_listener(self.apply_event)
+        for video_id in self.pending_video_ids():
+            self.submit(video_id)
+        return True
+
+    def stop(self, wait: bool = True):
+        self.stream.remove_listener(self.apply_event)
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait)
+
+def main():
+    """Run the media pipeline workers as their own process"""
+    from video_permission_system import VideoPermissionSystem
+
+    pipeline = MediaPipeline(VideoPermissionSystem())
+    if not pipeline.start():
+        print("❌ ffmpeg not found; set PICKLEBALL_FFMPEG or install ffmpeg")
+        return
+    print(f"🎞️  Processing uploads with {pipeline.workers} workers ({pipeline.ffmpeg}); press Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pipeline.stop()
+
+if __name__ == "__main__":
+    main()
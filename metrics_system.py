@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+PickleballAI Metrics System
+Lightweight latency histograms and counters exposed in Prometheus text format
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Latency buckets in seconds (upper bounds, the last bucket is +Inf)
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is a bisect plus two additions"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by linear interpolation inside the matching bucket"""
+        if self.count == 0:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                # Observations above the last bound are reported at that bound
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * ((rank - seen) / bucket_count)
+            seen += bucket_count
+
+        return self.buckets[-1]
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[Tuple, Histogram]] = {}
+        self._counters: Dict[str, Dict[Tuple, float]] = {}
+        self._gauges: Dict[str, Dict[Tuple, float]] = {}
+        self._help: Dict[str, str] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+
+    def describe(self, name: str, help_text: str, buckets: Optional[Tuple[float, ...]] = None):
+        """Attach HELP text (and optionally histogram buckets) to a metric family"""
+        self._help[name] = help_text
+        if buckets:
+            self._buckets[name] = tuple(buckets)
+
+    def observe(self, name: str, value: float, **labels):
+        """Record a value in a histogram"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self._histograms.setdefault(name, {})
+            histogram = family.get(key)
+            if histogram is None:
+                histogram = family[key] = Histogram(self._buckets.get(name, DEFAULT_BUCKETS))
+            histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        """Increment a counter"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self._counters.setdefault(name, {})
+            family[key] = family.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """Set a gauge to an absolute value"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Time a block of code into a histogram"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def record_file_read(self, file_path: str, num_bytes: int, seconds: float):
+        """Account for one JSON data file read and parse"""
+        name = file_path.replace("\\", "/").rsplit("/", 1)[-1]
+        self.inc("pickleball_file_reads_total", file=name)
+        self.inc("pickleball_file_bytes_parsed_total", num_bytes, file=name)
+        self.observe("pickleball_json_load_seconds", seconds, file=name)
+
+    def get_quantiles(self, name: str) -> List[Dict]:
+        """Return p50/p95/p99 for every label set of a histogram family"""
+        with self._lock:
+            family = dict(self._histograms.get(name, {}))
+            results = []
+            for key, histogram in family.items():
+                entry = dict(key)
+                entry["count"] = histogram.count
+                for q in QUANTILES:
+                    entry[f"p{int(q * 100)}"] = histogram.quantile(q)
+                results.append(entry)
+        return results
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                self._render_header(lines, name, "counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+            for name in sorted(self._gauges):
+                self._render_header(lines, name, "gauge")
+                for key, value in sorted(self._gauges[name].items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+            for name in sorted(self._histograms):
+                family = self._histograms[name]
+                self._render_header(lines, name, "histogram")
+                for key, histogram in sorted(family.items()):
+                    cumulative = 0
+                    for bound, bucket_count in zip(histogram.buckets, histogram.counts):
+                        cumulative += bucket_count
+                        le = key + (("le", _format_value(bound)),)
+                        lines.append(f"{name}_bucket{_format_labels(le)} {cumulative}")
+                    le = key + (("le", "+Inf"),)
+                    lines.append(f"{name}_bucket{_format_labels(le)} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_value(histogram.sum)}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+
+                # Pre-computed percentiles for dashboards without a Prometheus server
+                quantile_name = f"{name}_quantile"
+                lines.append(f"# TYPE {quantile_name} gauge")
+                for key, histogram in sorted(family.items()):
+                    for q in QUANTILES:
+                        labeled = key + (("quantile", str(q)),)
+                        lines.append(
+                            f"{quantile_name}{_format_labels(labeled)} "
+                            f"{_format_value(histogram.quantile(q))}"
+                        )
+
+        return "\n".join(lines) + "\n"
+
+    def _render_header(self, lines: List[str], name: str, metric_type: str):
+        if name in self._help:
+            lines.append(f"# HELP {name} {self._help[name]}")
+        lines.append(f"# TYPE {name} {metric_type}")
+
+    def reset(self):
+        """Drop all recorded values"""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+def _format_labels(key: Tuple) -> str:
+    if not key:
+        return ""
+    parts = []
+    for label, value in key:
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{label}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+# Process-wide registry shared by all subsystems
+metrics = MetricsRegistry()
+metrics.describe("pickleball_http_request_duration_seconds", "HTTP request latency by route")
+metrics.describe("pickleball_http_requests_total", "HTTP requests by route and status")
+metrics.describe("pickleball_method_duration_seconds", "Subsystem method latency")
+metrics.describe("pickleball_json_load_seconds", "Time spent reading and parsing JSON data files")
+metrics.describe("pickleball_file_reads_total", "JSON data file reads")
+metrics.describe("pickleball_file_bytes_parsed_total", "Bytes of JSON parsed from data files")
+
+def timed(func: Optional[Callable] = None, *, name: Optional[str] = None):
+    """Decorator recording a method's latency under its qualified name"""
+    def decorator(f: Callable) -> Callable:
+        label = name or f.__qualname__
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                metrics.observe(
+                    "pickleball_method_duration_seconds",
+                    time.perf_counter() - start,
+                    method=label
+                )
+        return wrapper
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+def init_app(app, app_name: str):
+    """Install request timing hooks and a /metrics endpoint on a Flask app"""
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_request_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _note_response_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    # Teardown runs even when the view raises, so failed requests are counted
+    @app.teardown_request
+    def _record_request_metrics(exc):
+        start = g.pop("metrics_start", None)
+        status = g.pop("metrics_status", None)
+        if start is None or request.endpoint == "metrics_endpoint":
+            return
+        if exc is not None or status is None:
+            status = 500
+        route = request.url_rule.rule if request.url_rule else "<unmatched>"
+        metrics.observe(
+            "pickleball_http_request_duration_seconds",
+            time.perf_counter() - start,
+            app=app_name, route=route, method=request.method
+        )
+        metrics.inc(
+            "pickleball_http_requests_total",
+            app=app_name, route=route, method=request.method,
+            status=str(status)
+        )
+
+    @app.route('/metrics', endpoint="metrics_endpoint")
+    def _metrics():
+        return Response(metrics.render_prometheus(),
+                        mimetype="text/plain; version=0.0.4")
+
+    return app
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+PickleballAI Permission Index
+Materialized effective video permissions (direct and group grants) with an expiry heap, refreshed only when the grant files change,
+and cached sets of blocked coaches and deleted videos whose grants are denied
+"""
+
+import bisect
+import heapq
+import json
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from data_store import collection_version
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+def _load_json(file_path: Optional[str]) -> Dict:
+    if not file_path:
+        return {}
+    try:
+        with open(file_path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def grant_allows(grant: Dict, permission: str) -> bool:
+    """Edit access includes annotating; annotation-only grants carry "annotate" alone"""
+    permissions = grant["permissions"]
+    return permission in permissions or (permission == "annotate" and "edit" in permissions)
+
+# Position for checks about the video as a whole (opening it, listing it) rather than a point in it
+ANY_POSITION = object()
+
+def in_time_range(grant: Dict, timestamp: Optional[float]) -> bool:
+    """Whether a video position falls inside the grant's scope; unscoped grants cover the whole video"""
+    scope = grant.get("scope") or {}
+    if "start_seconds" not in scope and "end_seconds" not in scope:
+        return True
+    # Without a position the scope cannot be checked
+    if timestamp is None:
+        return False
+    return scope.get("start_seconds", 0) <= timestamp <= scope.get("end_seconds", float("inf"))
+
+def expiry_key(grant: Dict) -> Tuple[str, str]:
+    """Key of a grant in the expiry heap: group grants by id, direct grants by (video, user)"""
+    if "group_id" in grant:
+        return ("group_grant", grant["id"])
+    return (grant["video_id"], grant["user_email"])
+
+class _GrantLayer:
+    """Effective grants of one kind (direct or group), looked up by (video, user), video and user"""
+
+    def __init__(self):
+        # (video id, user email) -> [(grant, expires_at)]
+        self.effective: Dict[Tuple[str, str], List[Tuple[Dict, Optional[datetime]]]] = defaultdict(list)
+        self.by_video: Dict[str, Set[str]] = defaultdict(set)
+        self.by_user: Dict[str, Set[str]] = defaultdict(set)
+        self.expires: Dict[Tuple[str, str], datetime] = {}
+
+    def add(self, grant: Dict, pairs) -> Optional[datetime]:
+        expires_at = _parse_time(grant.get("expires_at"))
+        if expires_at:
+            self.expires[expiry_key(grant)] = expires_at
+        for video_id, user_email in pairs:
+            self.effective[(video_id, user_email)].append((grant, expires_at))
+            self.by_video[video_id].add(user_email)
+            self.by_user[user_email].add(video_id)
+        return expires_at
+
+class PermissionIndex:
+    def __init__(self, permissions_file: str, groups_file: Optional[str] = None,
+                 coaches_file: Optional[str] = None, tombstones=None):
+        """tombstones (a video_gc.TombstoneLog) hides soft-deleted videos until they are collected"""
+        self.permissions_file = permissions_file
+        self.groups_file = groups_file
+        self.coaches_file = coaches_file
+        self.tombstones = tombstones
+        self._lock = threading.RLock()
+        self._version = (None, None)
+        # Direct grants, extended in place when rows are only appended (every upload adds its owner's row)
+        self._direct = _GrantLayer()
+        self._rows: Optional[List[Dict]] = None
+        # User email -> positions of that user's direct grants in the permissions list
+        self._rows_by_user: Dict[str, List[int]] = {}
+        # Group grants expanded to members and collection videos; redone only when groups or group grants change
+        self._group = _GrantLayer()
+        self._group_grants: Optional[List[Dict]] = None
+        self._expires: Dict[Tuple[str, str], datetime] = {}
+        # Heap of (expires_at, expiry key) for grants that expire
+        self._expiry_heap: List = []
+        # The same expiry times in order, for counting lapsed grants
+        self._expiry_times: List[datetime] = []
+        # Blocked coaches, reloaded separately so status changes do not rebuild the grants
+        self._blocked: Set[str] = set()
+        self._blocked_version = None
+
+    def _ensure_current(self):
+        """One stat() per grant file per lookup; the index is refreshed only after a file has been replaced"""
+        version = (collection_version(self.permissions_file),
+                   collection_version(self.groups_file) if self.groups_file else None)
+        with self._lock:
+            if version == self._version:
+                return
+
+            group_grants = self._group_grants
+            expiries_reset = False
+            if version[0] != self._version[0]:
+                permissions = _load_json(self.permissions_file)
+                group_grants = permissions.get("group_grants", [])
+                if not self._append_rows(permissions.get("permissions", [])):
+                    self._rebuild_direct(permissions.get("permissions", []))
+                    expiries_reset = True
+
+            if version[1] != self._version[1] or group_grants != self._group_grants:
+                self._rebuild_groups(group_grants, _load_json(self.groups_file))
+                expiries_reset = True
+
+            if expiries_reset:
+                self._expires = {**self._group.expires, **self._direct.expires}
+                self._expiry_heap = [(expires_at, key) for key, expires_at in self._expires.items()]
+                heapq.heapify(self._expiry_heap)
+                self._expiry_times = sorted(self._expires.values())
+            self._version = version
+
+    def _append_rows(self, rows: List[Dict]) -> bool:
+        """Index only the rows added after the ones already indexed; False when earlier rows changed"""
+        indexed = self._rows
+        if indexed is None or len(rows) < len(indexed) or rows[:len(indexed)] != indexed:
+            return False
+        added = rows[len(indexed):]
+        # A second row for the same grant key would shadow an indexed expiry; leave that to a rebuild
+        if any(expiry_key(grant) in self._direct.expires for grant in added):
+            return False
+
+        for position, grant in enumerate(added, start=len(indexed)):
+            expires_at = self._direct.add(grant, [(grant["video_id"], grant["user_email"])])
+            self._rows_by_user.setdefault(grant["user_email"], []).append(position)
+            if expires_at:
+                key = expiry_key(grant)
+                self._expires[key] = expires_at
+                heapq.heappush(self._expiry_heap, (expires_at, key))
+                bisect.insort(self._expiry_times, expires_at)
+        self._rows = rows
+        return True
+
+    def _rebuild_direct(self, rows: List[Dict]):
+        direct = _GrantLayer()
+        rows_by_user = defaultdict(list)
+        for position, grant in enumerate(rows):
+            direct.add(grant, [(grant["video_id"], grant["user_email"])])
+            rows_by_user[grant["user_email"]].append(position)
+        self._direct = direct
+        self._rows = rows
+        self._rows_by_user = dict(rows_by_user)
+
+    def _rebuild_groups(self, group_grants: List[Dict], groups: Dict):
+        """A group grant is one stored row, expanded here to every member and video it covers"""
+        members = {group["id"]: group.get("members", []) for group in groups.get("groups", [])}
+        collections = {c["id"]: c.get("video_ids", []) for c in groups.get("collections", [])}
+        layer = _GrantLayer()
+        for grant in group_grants:
+            layer.add(grant, [(video_id, email)
+                              for video_id in collections.get(grant["collection_id"], [])
+                              for email in members.get(grant["group_id"], [])])
+        self._group = layer
+        self._group_grants = group_grants
+
+    def _ensure_blocked_current(self):
+        """One stat() of the coaches file per lookup; the blocked set is reloaded only after it changes"""
+        if not self.coaches_file:
+            return
+        version = collection_version(self.coaches_file)
+        with self._lock:
+            if version == self._blocked_version:
+                return
+            coaches = _load_json(self.coaches_file).get("coaches", [])
+            self._blocked = {coach["email"] for coach in coaches if coach.get("status") == "blocked"}
+            self._blocked_version = version
+
+    def is_blocked(self, user_email: str) -> bool:
+        self._ensure_blocked_current()
+        with self._lock:
+            return user_email in self._blocked
+
+    def user_rows(self, user_email: str) -> List[int]:
+        """Positions of a user's direct grants in the permissions list as currently stored"""
+        self._ensure_current()
+        with self._lock:
+            return list(self._rows_by_user.get(user_email, ()))
+
+    def grants(self, video_id: str, user_email: str, now: Optional[datetime] = None) -> List[Dict]:
+        """Live grants giving a user access to a video; none while the user is a blocked coach or the video is deleted"""
+        if self.is_blocked(user_email) or (self.tombstones is not None and self.tombstones.contains(video_id)):
+            return []
+        self._ensure_current()
+        now = now or datetime.now()
+        key = (video_id, user_email)
+        with self._lock:
+            entries = self._direct.effective.get(key, []) + self._group.effective.get(key, [])
+        return [grant for grant, expires_at in entries if not expires_at or expires_at > now]
+
+    def allows(self, video_id: str, user_email: str, permission: str,
+               timestamp: Optional[float] = ANY_POSITION) -> bool:
+        return any(grant_allows(grant, permission)
+                   and (timestamp is ANY_POSITION or in_time_range(grant, timestamp))
+                   for grant in self.grants(video_id, user_email))
+
+    def permissions(self, video_id: str, user_email: str) -> List[str]:
+        """Union of the permissions of a user's live grants on a video, in grant order"""
+        result = []
+        for grant in self.grants(video_id, user_email):
+            for permission in grant["permissions"]:
+                if permission not in result:
+                    result.append(permission)
+        return result
+
+    def holders(self, video_id: str, permission: str) -> List[str]:
+        """Users with a live grant including the permission on a video"""
+        self._ensure_current()
+        with self._lock:
+            emails = self._direct.by_video.get(video_id, set()) | self._group.by_video.get(video_id, set())
+        return [email for email in emails if self.allows(video_id, email, permission)]
+
+    def candidate_videos(self, user_email: str) -> Set[str]:
+        """Videos a user holds any grant on, live or not; callers still check each one"""
+        self._ensure_current()
+        with self._lock:
+            return self._direct.by_user.get(user_email, set()) | self._group.by_user.get(user_email, set())
+
+    def next_expiry(self) -> Optional[datetime]:
+        self._ensure_current()
+        with self._lock:
+            return self._expiry_heap[0][0] if self._expiry_heap else None
+
+    def lapsed_count(self, now: Optional[datetime] = None) -> int:
+        """Grants in the files as loaded whose expiry has passed; it grows as grants lapse, without a file write"""
+        self._ensure_current()
+        with self._lock:
+            return bisect.bisect_right(self._expiry_times, now or datetime.now())
+
+    def pop_expired(self, now: Optional[datetime] = None) -> Set[Tuple[str, str]]:
+        """Expiry keys of expired grants from the front of the expiry heap as last loaded"""
+        now = now or datetime.now()
+        expired = set()
+        with self._lock:
+            while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                expires_at, key = heapq.heappop(self._expiry_heap)
+                # Skip heap entries for grants that were replaced with a different expiry
+                if self._expires.get(key) == expires_at:
+                    expired.add(key)
+        return expired
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+PickleballAI Profiling System
+Opt-in cProfile capture of individual requests, saved per route under logs/profiles
+"""
+
+import cProfile
+import glob
+import heapq
+import io
+import json
+import os
+import pstats
+import re
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+# Set PICKLEBALL_PROFILE=1 to profile every request
+PROFILE_ENV_VAR = "PICKLEBALL_PROFILE"
+# Requests carrying X-Profile-Request: <token> are profiled when the token matches
+PROFILE_TOKEN_ENV_VAR = "PICKLEBALL_PROFILE_TOKEN"
+PROFILE_HEADER = "X-Profile-Request"
+
+class RequestProfiler:
+    def __init__(self, profiles_dir: str = os.path.join("logs", "profiles"),
+                 max_profiles_per_route: int = 50, stack_depth: int = 15):
+        self.profiles_dir = profiles_dir
+        self.max_profiles_per_route = max_profiles_per_route
+        self.stack_depth = stack_depth
+
+        os.makedirs(self.profiles_dir, exist_ok=True)
+
+    def is_enabled(self) -> bool:
+        """Check if profiling every request is turned on by environment"""
+        return os.environ.get(PROFILE_ENV_VAR, "").lower() in ("1", "true", "yes")
+
+    def should_profile(self, header_value: Optional[str], is_admin: bool = False) -> bool:
+        """Decide whether the current request should be profiled"""
+        if self.is_enabled():
+            return True
+
+        if not header_value:
+            return False
+
+        # Admin sessions may ask for a profile; everyone else needs the shared token
+        if is_admin:
+            return True
+
+        token = os.environ.get(PROFILE_TOKEN_ENV_VAR)
+        return bool(token) and header_value == token
+
+    def save_profile(self, profiler: cProfile.Profile, app_name: str, route: str,
+                     method: str, duration: float, status_code: int) -> Dict:
+        """Dump raw stats and a JSON summary for one profiled request"""
+        route_dir = os.path.join(self.profiles_dir, _route_slug(app_name, route))
+        os.makedirs(route_dir, exist_ok=True)
+
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        base_path = os.path.join(route_dir, f"{stamp}_{method}")
+        profiler.dump_stats(f"{base_path}.prof")
+
+        summary = {
+            "app": app_name,
+            "route": route,
+            "method": method,
+            "status_code": status_code,
+            "duration_ms": round(duration * 1000, 3),
+            "profiled_at": datetime.now().isoformat(),
+            "profile_path": f"{base_path}.prof",
+            "call_stack": self._summarize(profiler)
+        }
+
+        with open(f"{base_path}.json", 'w') as f:
+            json.dump(summary, f, indent=2)
+
+        self._prune(route_dir)
+        return summary
+
+    def _summarize(self, profiler: cProfile.Profile) -> List[Dict]:
+        """Top functions by cumulative time, the usual starting point for a slow request"""
+        stats = pstats.Stats(profiler, stream=io.StringIO())
+        entries = []
+
+        for (filename, line, function), (_, calls, tottime, cumtime, _) in stats.stats.items():
+            entries.append({
+                "function": f"{os.path.basename(filename)}:{line}({function})",
+                "calls": calls,
+                "tottime_ms": round(tottime * 1000, 3),
+                "cumtime_ms": round(cumtime * 1000, 3)
+            })
+
+        return heapq.nlargest(self.stack_depth, entries, key=lambda e: e["cumtime_ms"])
+
+    def _prune(self, route_dir: str):
+        """Keep only the newest profiles for a route"""
+        summaries = sorted(glob.glob(os.path.join(route_dir, "*.json")))
+        for summary_path in summaries[:-self.max_profiles_per_route]:
+            for path in (summary_path, summary_path[:-len(".json")] + ".prof"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def get_slowest_requests(self, limit: int = 20) -> List[Dict]:
+        """Return the slowest profiled requests across all routes"""
+        summaries = []
+        for summary_path in glob.glob(os.path.join(self.profiles_dir, "*", "*.json")):
+            try:
+                with open(summary_path, 'r') as f:
+                    summaries.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+
+        return heapq.nlargest(limit, summaries, key=lambda s: s.get("duration_ms", 0))
+
+def _route_slug(app_name: str, route: str) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+    return f"{app_name}__{slug}"
+
+def init_app(app, app_name: str, is_admin: Optional[Callable[[], bool]] = None,
+             profiler: Optional[RequestProfiler] = None):
+    """Install opt-in request profiling hooks on a Flask app"""
+    from flask import g, request
+
+    request_profiler = profiler or RequestProfiler()
+
+    @app.before_request
+    def _start_profiler():
+        header_value = request.headers.get(PROFILE_HEADER)
+        if not request_profiler.should_profile(header_value, bool(is_admin and is_admin())):
+            return
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is already active on this thread
+            return
+        g.request_profile = profile
+        g.request_profile_start = time.perf_counter()
+
+    @app.after_request
+    def _stop_profiler(response):
+        profile = g.pop("request_profile", None)
+        if profile is None:
+            return response
+
+        profile.disable()
+        duration = time.perf_counter() - g.pop("request_profile_start")
+        route = request.url_rule.rule if request.url_rule else "<unmatched>"
+        request_profiler.save_profile(profile, app_name, route, request.method,
+                                      duration, response.status_code)
+        response.headers["X-Profile-Duration-Ms"] = f"{duration * 1000:.3f}"
+        return response
+
+    return request_profiler
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+PickleballAI Request Scheduler
+Per-coach capacity limits, least-loaded routing and a priority overflow queue for annotation requests
+"""
+
+import heapq
+import json
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from coach_matching import CoachMatchingIndex
+from event_stream import REQUEST_CREATED, REQUEST_STATUS, event_stream
+from metrics_system import metrics
+
+# Pending requests a coach takes before new ones are queued; coaches may set "max_pending"
+DEFAULT_COACH_CAPACITY = 10
+PRIORITY_RANK = {"urgent": 0, "high": 1, "normal": 2, "low": 3}
+QUEUED = "queued"
+# Queue waits range from seconds to days
+WAIT_BUCKETS = (1, 10, 60, 300, 900, 1800, 3600, 7200, 14400, 43200, 86400, 259200)
+
+metrics.describe("pickleball_request_queue_depth", "Annotation requests waiting for coach capacity")
+metrics.describe("pickleball_request_queue_wait_seconds", "Time requests spent in the overflow queue",
+                 buckets=WAIT_BUCKETS)
+metrics.describe("pickleball_request_routing_total", "Routing decisions for new annotation requests")
+
+def _parse_time(value: Optional[str]) -> datetime:
+    try:
+        return datetime.fromisoformat(value) if value else datetime.now()
+    except ValueError:
+        return datetime.now()
+
+class RequestScheduler:
+    def __init__(self, coaches_file: str, requests_file: str, stream=event_stream):
+        self.requests_file = requests_file
+        self.coach_index = CoachMatchingIndex(coaches_file, requests_file, stream)
+        self.stream = stream
+
+        self._lock = threading.RLock()
+        self._built = False
+        # Heap of (priority rank, queued_at, request id); entries leave lazily once dequeued
+        self._heap: List = []
+        self._queued: Dict[str, Dict] = {}
+        self._depth = {priority: 0 for priority in PRIORITY_RANK}
+
+    def capacity(self, coach: Dict) -> int:
+        return int(coach.get("max_pending") or DEFAULT_COACH_CAPACITY)
+
+    def has_capacity(self, coach_email: str) -> bool:
+        coach = self.coach_index.get_coach(coach_email)
+        return coach is not None and self.coach_index.pending_count(coach_email) < self.capacity(coach)
+
+    def choose_coach(self, coach_email: str, auto_assign: bool = False) -> Optional[str]:
+        """Coach to assign a new request to, or None when it has to wait in the overflow queue"""
+        if self.coach_index.get_coach(coach_email) is None:
+            # Inactive coaches are outside capacity management; keep the direct assignment
+            metrics.inc("pickleball_request_routing_total", decision="unmanaged")
+            return coach_email
+
+        if self.has_capacity(coach_email):
+            metrics.inc("pickleball_request_routing_total", decision="requested_coach")
+            return coach_email
+
+        if auto_assign:
+            least_loaded = self.least_loaded_similar(coach_email)
+            if least_loaded:
+                metrics.inc("pickleball_request_routing_total", decision="least_loaded")
+                return least_loaded
+
+        metrics.inc("pickleball_request_routing_total", decision="queued")
+        return None
+
+    def least_loaded_similar(self, coach_email: str, exclude: Iterable[str] = ()) -> Optional[str]:
+        """Similar coach with free capacity and the lowest relative load"""
+        exclude = set(exclude)
+        candidates = [
+            (self.coach_index.pending_count(coach["email"]) / self.capacity(coach), coach["email"])
+            for coach in self.coach_index.similar_coaches(coach_email)
+            if coach["email"] not in exclude and self.has_capacity(coach["email"])
+        ]
+        return min(candidates)[1] if candidates else None
+
+    def _ensure_built(self):
+        with self._lock:
+            if self._built:
+                return
+            self.stream.add_listener(self.apply_event)
+            try:
+                with open(self.requests_file, 'r') as f:
+                    requests = json.load(f).get("requests", [])
+            except FileNotFoundError:
+                requests = []
+            for request in requests:
+                if request.get("status") == QUEUED:
+                    self._enqueue(request)
+            self._built = True
+
+    def _enqueue(self, request: Dict):
+        if request["id"] in self._queued:
+            return
+        entry = {
+            "id": request["id"],
+            "coach_email": request.get("coach_email"),
+            "auto_assign": bool(request.get("auto_assign")),
+            "priority": request.get("priority") if request.get("priority") in PRIORITY_RANK else "normal",
+            "queued_at": request.get("queued_at") or request.get("created_at")
+        }
+        self._queued[request["id"]] = entry
+        heapq.heappush(self._heap, (PRIORITY_RANK[entry["priority"]], entry["queued_at"] or "", request["id"]))
+        self._set_depth(entry["priority"], 1)
+
+    def _discard(self, request_id: str) -> Optional[Dict]:
+        entry = self._queued.pop(request_id, None)
+        if entry:
+            self._set_depth(entry["priority"], -1)
+        # Drop stale heap heads so the heap does not grow with dequeued requests
+        while self._heap and self._heap[0][2] not in self._queued:
+            heapq.heappop(self._heap)
+        return entry
+
+    def _set_depth(self, priority: str, delta: int):
+        self._depth[priority] += delta
+        metrics.set_gauge("pickleball_request_queue_depth", self._depth[priority], priority=priority)
+
+    def enqueue(self, request: Dict):
+        """Track a request this process just queued"""
+        self._ensure_built()
+        with self._lock:
+            self._enqueue(request)
+
+    def apply_event(self, event: Dict):
+        """Keep the queue in step with requests queued or assigned by other processes"""
+        if event.get("type") not in (REQUEST_CREATED, REQUEST_STATUS):
+            return
+        data = event.get("data", {})
+        with self._lock:
+            if not self._built or not data.get("id"):
+                return
+            if data.get("status") == QUEUED:
+                if event["type"] == REQUEST_CREATED:
+                    self._enqueue(data)
+            elif data["id"] in self._queued:
+                self._discard(data["id"])
+
+    def next_for_coach(self, coach_email: str) -> Optional[Dict]:
+        """Highest-priority queued request this coach may take: requested by name, or open to any similar coach"""
+        self._ensure_built()
+        with self._lock:
+            similar = None
+            for _, _, request_id in sorted(self._heap):
+                entry = self._queued.get(request_id)
+                if entry is None:
+                    continue
+                if entry["coach_email"] == coach_email:
+                    return entry
+                if entry["auto_assign"]:
+                    if similar is None:
+                        similar = {coach["email"] for coach in self.coach_index.similar_coaches(coach_email)}
+                    if entry["coach_email"] in similar:
+                        return entry
+            return None
+
+    def mark_assigned(self, request_id: str):
+        """Remove a request from the queue once it has been handed to a coach"""
+        with self._lock:
+            entry = self._discard(request_id)
+        if entry:
+            wait = (datetime.now() - _parse_time(entry["queued_at"])).total_seconds()
+            metrics.observe("pickleball_request_queue_wait_seconds", max(wait, 0), priority=entry["priority"])
+
+    def queue_depth(self) -> int:
+        self._ensure_built()
+        with self._lock:
+            return len(self._queued)
@@ -10,6 +10,10 @@ import sys
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
+from data_store import atomic_write_json, file_lock
+from id_allocator import new_id
+from video_permission_system import VideoPermissionSystem
+
 class RootConsole:
     def __init__(self):
         self.data_dir = "data"
@@ -25,6 +29,9 @@ class RootConsole:
         
         # Initialize data files if they don't exist
         self._init_data_files()
+        
+        # Blocking a coach can suspend their video grants
+        self.video_permissions = VideoPermissionSystem()
     
     def _init_data_files(self):
         """Initialize data files with empty structures if they don't exist"""
@@ -61,127 +68,148 @@ class RootConsole:
     
     def _save_data(self, file_path: str, data: Dict):
         """Save data to JSON file"""
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        atomic_write_json(file_path, data)
     
     def create_coach(self, email: str, name: str, specialization: str, hourly_rate: float):
         """Create a new coach account"""
-        data = self._load_data(self.coaches_file)
-        
-        # Check if coach already exists
-        for coach in data.get("coaches", []):
-            if coach["email"] == email:
-                print(f"❌ Coach with email {email} already exists")
-                return
-        
-        coach = {
-            "id": f"coach_{len(data.get('coaches', [])) + 1}",
-            "email": email,
-            "name": name,
-            "specialization": specialization,
-            "hourly_rate": hourly_rate,
-            "status": "active",
-            "created_at": datetime.now().isoformat(),
-            "total_earnings": 0.0,
-            "total_sessions": 0
-        }
-        
-        data.setdefault("coaches", []).append(coach)
-        self._save_data(self.coaches_file, data)
-        
-        self._log_action("CREATE_COACH", f"Created coach: {email} ({name})")
-        print(f"✅ Coach {name} ({email}) created successfully")
-        print(f"   ID: {coach['id']}")
-        print(f"   Specialization: {specialization}")
-        print(f"   Hourly Rate: ${hourly_rate}")
+        with file_lock(self.coaches_file):
+            data = self._load_data(self.coaches_file)
+            
+            # Check if coach already exists
+            for coach in data.get("coaches", []):
+                if coach["email"] == email:
+                    print(f"❌ Coach with email {email} already exists")
+                    return
+            
+            coach = {
+                "id": new_id("coach"),
+                "email": email,
+                "name": name,
+                "specialization": specialization,
+                "hourly_rate": hourly_rate,
+                "status": "active",
+                "created_at": datetime.now().isoformat(),
+                "total_earnings": 0.0,
+                "total_sessions": 0
+            }
+            
+            data.setdefault("coaches", []).append(coach)
+            self._save_data(self.coaches_file, data)
+            
+            self._log_action("CREATE_COACH", f"Created coach: {email} ({name})")
+            print(f"✅ Coach {name} ({email}) created successfully")
+            print(f"   ID: {coach['id']}")
+            print(f"   Specialization: {specialization}")
+            print(f"   Hourly Rate: ${hourly_rate}")
     
-    def block_coach(self, email: str):
-        """Block a coach's access"""
-        data = self._load_data(self.coaches_file)
-        
-        for coach in data.get("coaches", []):
-            if coach["email"] == email:
-                coach["status"] = "blocked"
-                self._save_data(self.coaches_file, data)
-                
-                self._log_action("BLOCK_COACH", f"Blocked coach: {email}")
-                print(f"✅ Coach {email} has been blocked")
+    def block_coach(self, email: str, revoke_grants: bool = False):
+        """Block a coach's access; video permission checks deny a blocked coach at once"""
+        with file_lock(self.coaches_file):
+            data = self._load_data(self.coaches_file)
+            
+            for coach in data.get("coaches", []):
+                if coach["email"] == email:
+                    coach["status"] = "blocked"
+                    self._save_data(self.coaches_file, data)
+                    break
+            else:
+                print(f"❌ Coach with email {email} not found")
                 return
         
-        print(f"❌ Coach with email {email} not found")
+        self._log_action("BLOCK_COACH", f"Blocked coach: {email}")
+        print(f"✅ Coach {email} has been blocked")
+        if revoke_grants:
+            suspended = self.video_permissions.suspend_user_grants(email)["suspended"]
+            print(f"   Suspended {suspended} video grants")
     
     def unblock_coach(self, email: str):
-        """Unblock a coach's access"""
-        data = self._load_data(self.coaches_file)
-        
-        for coach in data.get("coaches", []):
-            if coach["email"] == email:
-                coach["status"] = "active"
-                self._save_data(self.coaches_file, data)
-                
-                self._log_action("UNBLOCK_COACH", f"Unblocked coach: {email}")
-                print(f"✅ Coach {email} has been unblocked")
+        """Unblock a coach's access, reinstating any grants suspended when they were blocked"""
+        with file_lock(self.coaches_file):
+            data = self._load_data(self.coaches_file)
+            
+            for coach in data.get("coaches", []):
+                if coach["email"] == email:
+                    coach["status"] = "active"
+                    self._save_data(self.coaches_file, data)
+                    break
+            else:
+                print(f"❌ Coach with email {email} not found")
                 return
         
-        print(f"❌ Coach with email {email} not found")
+        self._log_action("UNBLOCK_COACH", f"Unblocked coach: {email}")
+        print(f"✅ Coach {email} has been unblocked")
+        restored = self.video_permissions.restore_user_grants(email)["restored"]
+        if restored:
+            print(f"   Restored {restored} video grants")
     
     def create_user(self, email: str, name: str, role: str = "student"):
         """Create a new user account"""
-        data = self._load_data(self.users_file)
-        
-        # Check if user already exists
-        for user in data.get("users", []):
-            if user["email"] == email:
-                print(f"❌ User with email {email} already exists")
-                return
-        
-        user = {
-            "id": f"user_{len(data.get('users', [])) + 1}",
-            "email": email,
-            "name": name,
-            "role": role,
-            "status": "active",
-            "created_at": datetime.now().isoformat(),
-            "total_spent": 0.0,
-            "total_sessions": 0
-        }
-        
-        data.setdefault("users", []).append(user)
-        self._save_data(self.users_file, data)
-        
-        self._log_action("CREATE_USER", f"Created user: {email} ({name}) - Role: {role}")
-        print(f"✅ User {name} ({email}) created successfully")
-        print(f"   ID: {user['id']}")
-        print(f"   Role: {role}")
+        with file_lock(self.users_file):
+            data = self._load_data(self.users_file)
+            
+            # Check if user already exists
+            for user in data.get("users", []):
+                if user["email"] == email:
+                    print(f"❌ User with email {email} already exists")
+                    return
+            
+            user = {
+                "id": new_id("user"),
+                "email": email,
+                "name": name,
+                "role": role,
+                "status": "active",
+                "created_at": datetime.now().isoformat(),
+                "total_spent": 0.0,
+                "total_sessions": 0
+            }
+            
+            data.setdefault("users", []).append(user)
+            self._save_data(self.users_file, data)
+            
+            self._log_action("CREATE_USER", f"Created user: {email} ({name}) - Role: {role}")
+            print(f"✅ User {name} ({email}) created successfully")
+            print(f"   ID: {user['id']}")
+            print(f"   Role: {role}")
     
-    def create_storage_bucket(self, bucket_name: str, purpose: str, size_gb: int):
-        """Create a new storage bucket"""
-        data = self._load_data(self.storage_file)
-        
-        # Check if bucket already exists
-        for bucket in data.get("buckets", []):
-            if bucket["name"] == bucket_name:
-                print(f"❌ Bucket with name {bucket_name} already exists")
-                return
-        
-        bucket = {
-            "id": f"bucket_{len(data.get('buckets', [])) + 1}",
-            "name": bucket_name,
-            "purpose": purpose,
-            "size_gb": size_gb,
-            "used_gb": 0,
-            "status": "active",
-            "created_at": datetime.now().isoformat()
-        }
-        
-        data.setdefault("buckets", []).append(bucket)
-        self._save_data(self.storage_file, data)
-        
-        self._log_action("CREATE_BUCKET", f"Created bucket: {bucket_name} ({size_gb}GB)")
-        print(f"✅ Storage bucket '{bucket_name}' created successfully")
-        print(f"   ID: {bucket['id']}")
-        print(f"   Purpose: {purpose}")
-        print(f"   Size: {size_gb}GB")
+    def create_storage_bucket(self, bucket_name: str, purpose: str, size_gb: int,
+                              tier: str = "hot", path: Optional[str] = None):
+        """Create a new storage bucket; "archive" buckets hold compressed videos in path (any local directory)"""
+        if tier not in ("hot", "archive"):
+            print(f"❌ Unknown storage tier: {tier}")
+            return
+        
+        with file_lock(self.storage_file):
+            data = self._load_data(self.storage_file)
+            
+            # Check if bucket already exists
+            for bucket in data.get("buckets", []):
+                if bucket["name"] == bucket_name:
+                    print(f"❌ Bucket with name {bucket_name} already exists")
+                    return
+            
+            bucket = {
+                "id": new_id("bucket"),
+                "name": bucket_name,
+                "purpose": purpose,
+                "size_gb": size_gb,
+                "used_gb": 0,
+                "used_bytes": 0,
+                "video_count": 0,
+                "tier": tier,
+                "path": path,
+                "status": "active",
+                "created_at": datetime.now().isoformat()
+            }
+            
+            data.setdefault("buckets", []).append(bucket)
+            self._save_data(self.storage_file, data)
+            
+            self._log_action("CREATE_BUCKET", f"Created bucket: {bucket_name} ({size_gb}GB)")
+            print(f"✅ Storage bucket '{bucket_name}' created successfully")
+            print(f"   ID: {bucket['id']}")
+            print(f"   Purpose: {purpose}")
+            print(f"   Size: {size_gb}GB")
     
     def view_logs(self, days: int = 1):
         """View logs for the specified number of days"""
@@ -245,37 +273,42 @@ class RootConsole:
         data = self._load_data(self.coaches_file)
         
         print("\n👨‍🏫 Coaches:")
-        print("=" * 80)
-        print(f"{'ID':<10} {'Name':<20} {'Email':<25} {'Status':<10} {'Rate':<10} {'Earnings':<12}")
-        print("-" * 80)
+        print("=" * 102)
+        print(f"{'ID':<32} {'Name':<20} {'Email':<25} {'Status':<10} {'Rate':<10} {'Earnings':<12}")
+        print("-" * 102)
         
         for coach in data.get("coaches", []):
-            print(f"{coach['id']:<10} {coach['name']:<20} {coach['email']:<25} {coach['status']:<10} ${coach['hourly_rate']:<9} ${coach['total_earnings']:<11}")
+            print(f"{coach['id']:<32} {coach['name']:<20} {coach['email']:<25} {coach['status']:<10} ${coach['hourly_rate']:<9} ${coach['total_earnings']:<11}")
     
     def list_users(self):
         """List all users"""
         data = self._load_data(self.users_file)
         
         print("\n👤 Users:")
-        print("=" * 70)
-        print(f"{'ID':<10} {'Name':<20} {'Email':<25} {'Role':<10} {'Status':<10}")
-        print("-" * 70)
+        print("=" * 92)
+        print(f"{'ID':<32} {'Name':<20} {'Email':<25} {'Role':<10} {'Status':<10}")
+        print("-" * 92)
         
         for user in data.get("users", []):
-            print(f"{user['id']:<10} {user['name']:<20} {user['email']:<25} {user['role']:<10} {user['status']:<10}")
+            print(f"{user['id']:<32} {user['name']:<20} {user['email']:<25} {user['role']:<10} {user['status']:<10}")
     
     def list_storage(self):
-        """List all storage buckets"""
-        data = self._load_data(self.storage_file)
+        """List all storage buckets with usage from the upload/delete counters"""
+        usage = self.video_permissions.quota.usage()
         
         print("\n🗄️ Storage Buckets:")
-        print("=" * 70)
-        print(f"{'ID':<10} {'Name':<20} {'Purpose':<20} {'Used/Total':<15} {'Status':<10}")
-        print("-" * 70)
-        
-        for bucket in data.get("buckets", []):
-            usage = f"{bucket['used_gb']}/{bucket['size_gb']}GB"
-            print(f"{bucket['id']:<10} {bucket['name']:<20} {bucket['purpose']:<20} {usage:<15} {bucket['status']:<10}")
+        print("=" * 92)
+        print(f"{'Name':<20} {'Purpose':<20} {'Used/Total':<18} {'Used %':<8} {'Videos':<8} {'Status':<10}")
+        print("-" * 92)
+        
+        for bucket in usage["buckets"]:
+            used = f"{bucket['used_gb']}/{bucket['size_gb']}GB"
+            print(f"{bucket['name']:<20} {bucket['purpose']:<20} {used:<18} {bucket['used_percent']:<8} "
+                  f"{bucket['video_count']:<8} {bucket['status']:<10}")
+        total = usage["total"]
+        print("-" * 92)
+        print(f"{'Total':<41} {str(total['used_gb']) + '/' + str(total['size_gb']) + 'GB':<18} "
+              f"{total['used_percent']:<8} {total['video_count']:<8}")
     
     def show_menu(self):
         """Show the main menu"""
@@ -320,7 +353,8 @@ class RootConsole:
                 email = input("Coach Email: ").strip()
                 action = input("Action (block/unblock): ").strip().lower()
                 if action == "block":
-                    self.block_coach(email)
+                    revoke = input("Also suspend their video grants? (y/N): ").strip().lower() == "y"
+                    self.block_coach(email, revoke_grants=revoke)
                 elif action == "unblock":
                     self.unblock_coach(email)
                 else:
@@ -339,7 +373,11 @@ class RootConsole:
                 purpose = input("Purpose: ").strip()
                 try:
                     size_gb = int(input("Size (GB): ").strip())
-                    self.create_storage_bucket(bucket_name, purpose, size_gb)
+                    tier = input("Tier (hot/archive, default hot): ").strip().lower() or "hot"
+                    path = None
+                    if tier == "archive":
+                        path = input("Archive directory (blank for storage/<name>): ").strip() or None
+                    self.create_storage_bucket(bucket_name, purpose, size_gb, tier, path)
                 except ValueError:
                     print("❌ Invalid size")
             
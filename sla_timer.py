@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+PickleballAI SLA Timer
+Heap of per-request deadlines driving reminders, escalation to the admin console and expiry/reassignment
+"""
+
+import heapq
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from event_stream import REQUEST_CREATED, REQUEST_STATUS, event_stream
+from metrics_system import metrics
+
+# Hours after a request reaches its coach (assigned_at, else created_at); override via environment
+SLA_DEFAULTS = {
+    "reminder": 24.0,
+    "escalate": 48.0,
+    "expire": 72.0
+}
+SLA_ENV_PREFIX = "PICKLEBALL_SLA_"
+# Actions in the order they fire for a pending request
+ACTIONS = ("reminder", "escalate", "expire")
+# A failed action is retried after this delay, doubling per consecutive failure up to the cap
+RETRY_BACKOFF_SECONDS = 60
+RETRY_BACKOFF_MAX_SECONDS = 3600
+
+metrics.describe("pickleball_sla_timers", "Pending requests with an armed SLA timer")
+metrics.describe("pickleball_sla_actions_total", "SLA actions fired by kind and outcome")
+
+logger = logging.getLogger(__name__)
+
+def load_sla_hours() -> Dict[str, float]:
+    """SLA thresholds, e.g. PICKLEBALL_SLA_EXPIRE_HOURS=48"""
+    hours = dict(SLA_DEFAULTS)
+    for action in hours:
+        value = os.environ.get(f"{SLA_ENV_PREFIX}{action.upper()}_HOURS")
+        if value:
+            hours[action] = float(value)
+    return hours
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+class SlaTimer:
+    def __init__(self, requests_file: str, handler, stream=event_stream,
+                 sla_hours: Optional[Dict[str, float]] = None):
+        """handler provides send_request_reminder, escalate_request and expire_request(request_id)"""
+        self.requests_file = requests_file
+        self.handler = handler
+        self.stream = stream
+        self.sla_hours = sla_hours or load_sla_hours()
+
+        self._condition = threading.Condition()
+        self._heap = []
+        # request id -> generation; stale heap entries carry an older generation and are skipped
+        self._armed: Dict[str, int] = {}
+        # request id -> consecutive failed attempts of its current action
+        self._failures: Dict[str, int] = {}
+        self._generations = itertools.count(1)
+        self._loaded = False
+        self._thread = None
+        self._stop = threading.Event()
+
+    def load(self):
+        """Arm timers for every pending request once; later changes arrive as events"""
+        with self._condition:
+            if self._loaded:
+                return
+            self.stream.add_listener(self.apply_event)
+            try:
+                with open(self.requests_file, 'r') as f:
+                    requests = json.load(f).get("requests", [])
+            except FileNotFoundError:
+                requests = []
+            for request in requests:
+                if request.get("status") == "pending":
+                    self._arm(request)
+            self._loaded = True
+
+    def _next_action(self, request: Dict) -> Optional[str]:
+        """First action that has not been carried out for this request"""
+        if not request.get("reminded_at"):
+            return "reminder"
+        if not request.get("escalated_at"):
+            return "escalate"
+        return "expire"
+
+    def _arm(self, request: Dict, action: Optional[str] = None, due: Optional[datetime] = None):
+        """Push the next deadline for a pending request (or an explicit retry time): O(log n)"""
+        action = action or self._next_action(request)
+        if due is None:
+            base = _parse_time(request.get("assigned_at")) or _parse_time(request.get("created_at"))
+            if base is None:
+                return
+            due = base + timedelta(hours=self.sla_hours[action])
+        generation = next(self._generations)
+        self._armed[request["id"]] = generation
+        heapq.heappush(self._heap, (due, generation, request["id"], action, request))
+        metrics.set_gauge("pickleball_sla_timers", len(self._armed))
+        self._condition.notify()
+
+    def _disarm(self, request_id: str):
+        if self._armed.pop(request_id, None) is not None:
+            metrics.set_gauge("pickleball_sla_timers", len(self._armed))
+
+    def apply_event(self, event: Dict):
+        """New and reassigned pending requests get fresh timers; answered ones are disarmed"""
+        if event.get("type") not in (REQUEST_CREATED, REQUEST_STATUS):
+            return
+        data = event.get("data", {})
+        if not data.get("id"):
+            return
+        with self._condition:
+            if not self._loaded:
+                return
+            if data.get("status") != "pending":
+                self._disarm(data["id"])
+                self._failures.pop(data["id"], None)
+            elif event["type"] == REQUEST_CREATED or data.get("assigned_at"):
+                # Created, or handed to a (new) coach: the clock restarts
+                self._failures.pop(data["id"], None)
+                self._arm(data, "reminder")
+
+    def fire_due(self, now: Optional[datetime] = None) -> int:
+        """Run every action due by now; returns how many fired"""
+        now = now or datetime.now()
+        fired = 0
+        while True:
+            with self._condition:
+                if not self._heap or self._heap[0][0] > now:
+                    return fired
+                due, generation, request_id, action, request = heapq.heappop(self._heap)
+                if self._armed.get(request_id) != generation:
+                    continue
+                self._disarm(request_id)
+
+            outcome = self._run(action, request_id)
+            fired += 1
+            metrics.inc("pickleball_sla_actions_total", action=action, outcome=outcome)
+
+            with self._condition:
+                # An event may have re-armed or answered the request while the action ran
+                if request_id in self._armed:
+                    continue
+                if outcome == "error":
+                    # Retry the same action later instead of leaving the request without a timer
+                    failures = self._failures[request_id] = self._failures.get(request_id, 0) + 1
+                    delay = min(RETRY_BACKOFF_SECONDS * 2 ** (failures - 1), RETRY_BACKOFF_MAX_SECONDS)
+                    self._arm(request, action, due=now + timedelta(seconds=delay))
+                    continue
+                self._failures.pop(request_id, None)
+                # Reminder and escalation lead to the next step; expiry ends the request or restarts it
+                if outcome == "done" and action != "expire":
+                    self._arm(request, ACTIONS[ACTIONS.index(action) + 1])
+
+    def _run(self, action: str, request_id: str) -> str:
+        handlers = {
+            "reminder": self.handler.send_request_reminder,
+            "escalate": self.handler.escalate_request,
+            "expire": self.handler.expire_request
+        }
+        try:
+            return "done" if handlers[action](request_id) else "skipped"
+        except Exception as e:
+            logger.error(f"SLA {action} failed for {request_id}: {e}")
+            return "error"
+
+    def seconds_until_next(self) -> Optional[float]:
+        with self._condition:
+            if not self._heap:
+                return None
+            return max((self._heap[0][0] - datetime.now()).total_seconds(), 0)
+
+    def start(self):
+        """Run timers on a background thread that sleeps until the earliest deadline"""
+        self.load()
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run_loop, name="sla-timer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._condition:
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run_loop(self):
+        while not self._stop.is_set():
+            self.fire_due()
+            with self._condition:
+                wait = self.seconds_until_next()
+                # New earlier deadlines notify the condition; cap the wait to absorb clock changes
+                self._condition.wait(timeout=min(wait, 300) if wait is not None else 300)
+
+def main():
+    """Run the SLA timer as its own worker process"""
+    from coach_notification_system import CoachNotificationSystem
+
+    notification_system = CoachNotificationSystem()
+    timer = notification_system.sla_timer
+    timer.start()
+    print(f"⏰ SLA timer running ({timer.sla_hours}); press Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        timer.stop()
+
+if __name__ == "__main__":
+    main()
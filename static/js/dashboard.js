@@ -11,6 +11,8 @@ document.addEventListener('DOMContentLoaded', function() {
     loadStorage();
     loadLogs();
     loadReport();
+    loadProfiles();
+    loadEscalations();
 });
 
 // Navigation functions
@@ -36,9 +38,9 @@ function showSection(section) {
 async function loadDashboard() {
     try {
         const [coachesRes, usersRes, storageRes, reportRes] = await Promise.all([
-            fetch('/api/coaches'),
-            fetch('/api/users'),
-            fetch('/api/storage'),
+            fetch('/api/coaches?fields=status'),
+            fetch('/api/users?fields=status'),
+            fetch('/api/storage?fields=id'),
             fetch('/api/report')
         ]);
         
@@ -85,7 +87,7 @@ function updateRecentActivity(transactions) {
 // Coach functions
 async function loadCoaches() {
     try {
-        const response = await fetch('/api/coaches');
+        const response = await fetch('/api/coaches?fields=name,email,specialization,hourly_rate,status');
         const data = await response.json();
         
         const container = document.getElementById('coaches-list');
@@ -189,13 +191,14 @@ async function createCoach() {
 }
 
 async function blockCoach(email) {
+    const revoke_grants = confirm(`Also suspend ${email}'s video grants? They are restored on unblock.`);
     try {
         const response = await fetch('/api/coaches/block', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
             },
-            body: JSON.stringify({ email })
+            body: JSON.stringify({ email, revoke_grants })
         });
         
         const result = await response.json();
@@ -241,7 +244,7 @@ async function unblockCoach(email) {
 // User functions
 async function loadUsers() {
     try {
-        const response = await fetch('/api/users');
+        const response = await fetch('/api/users?fields=name,email,role,status,created_at');
         const data = await response.json();
         
         const container = document.getElementById('users-list');
@@ -337,7 +340,7 @@ async function createUser() {
 // Storage functions
 async function loadStorage() {
     try {
-        const response = await fetch('/api/storage');
+        const response = await fetch('/api/storage/usage');
         const data = await response.json();
         
         const container = document.getElementById('storage-list');
@@ -354,8 +357,10 @@ async function loadStorage() {
                         <tr>
                             <th>Name</th>
                             <th>Purpose</th>
+                            <th>Tier</th>
                             <th>Size</th>
                             <th>Used</th>
+                            <th>Videos</th>
                             <th>Status</th>
                         </tr>
                     </thead>
@@ -364,8 +369,10 @@ async function loadStorage() {
                             <tr>
                                 <td>${bucket.name}</td>
                                 <td>${bucket.purpose}</td>
+                                <td>${bucket.tier}</td>
                                 <td>${bucket.size_gb}GB</td>
-                                <td>${bucket.used_gb}GB</td>
+                                <td>${bucket.used_gb}GB (${bucket.used_percent}%)</td>
+                                <td>${bucket.video_count}</td>
                                 <td>
                                     <span class="badge bg-${bucket.status === 'active' ? 'success' : 'danger'}">
                                         ${bucket.status}
@@ -398,7 +405,9 @@ async function createStorage() {
     const data = {
         name: formData.get('name'),
         purpose: formData.get('purpose'),
-        size_gb: formData.get('size_gb')
+        size_gb: formData.get('size_gb'),
+        tier: formData.get('tier'),
+        path: formData.get('path')
     };
     
     try {
@@ -501,6 +510,127 @@ async function loadReport() {
     }
 }
 
+// Profile functions
+async function loadProfiles() {
+    try {
+        const limit = document.getElementById('profiles-limit').value;
+        const response = await fetch(`/api/profiles?limit=${limit}`);
+        const data = await response.json();
+        
+        const container = document.getElementById('profiles-content');
+        
+        if (data.profiles.length === 0) {
+            container.innerHTML = '<p class="text-muted">No profiled requests yet</p>';
+            return;
+        }
+        
+        const html = data.profiles.map(p => `
+            <div class="mb-3">
+                <div class="d-flex justify-content-between align-items-center">
+                    <h6 class="mb-1">
+                        <span class="badge bg-secondary">${p.method}</span>
+                        ${p.route} <small class="text-muted">(${p.app})</small>
+                    </h6>
+                    <span class="badge bg-${p.duration_ms > 500 ? 'danger' : 'warning'}">${p.duration_ms.toFixed(1)} ms</span>
+                </div>
+                <small class="text-muted">${p.profiled_at} &middot; ${p.profile_path}</small>
+                <pre class="bg-light p-3 rounded small" style="max-height: 200px; overflow-y: auto;">${
+                    p.call_stack.map(f => `${f.cumtime_ms.toFixed(2).padStart(10)} ms  ${String(f.calls).padStart(6)}x  ${f.function}`).join('\n')
+                }</pre>
+            </div>
+        `).join('');
+        
+        container.innerHTML = html;
+        
+    } catch (error) {
+        console.error('Error loading profiles:', error);
+        document.getElementById('profiles-content').innerHTML = '<p class="text-danger">Error loading profiles</p>';
+    }
+}
+
+// Escalation functions
+async function loadEscalations() {
+    try {
+        const status = document.getElementById('escalations-status').value;
+        const response = await fetch(`/api/escalations?status=${status}`);
+        const data = await response.json();
+        
+        const container = document.getElementById('escalations-content');
+        
+        if (data.escalations.length === 0) {
+            container.innerHTML = '<p class="text-muted">No escalations</p>';
+            return;
+        }
+        
+        const html = `
+            <div class="table-responsive">
+                <table class="table table-hover">
+                    <thead>
+                        <tr>
+                            <th>Request</th>
+                            <th>Coach</th>
+                            <th>Student</th>
+                            <th>Reason</th>
+                            <th>Escalated</th>
+                            <th>Actions</th>
+                        </tr>
+                    </thead>
+                    <tbody>
+                        ${data.escalations.map(e => `
+                            <tr>
+                                <td><code>${e.request_id}</code></td>
+                                <td>${e.coach_email}</td>
+                                <td>${e.student_email}</td>
+                                <td>${e.reason}</td>
+                                <td>${new Date(e.created_at).toLocaleString()}</td>
+                                <td>
+                                    ${e.status === 'open' ?
+                                        `<button class="btn btn-sm btn-success" onclick="resolveEscalation('${e.id}')">
+                                            <i class="fas fa-check"></i> Resolve
+                                        </button>` :
+                                        `<span class="badge bg-secondary">resolved</span>`
+                                    }
+                                </td>
+                            </tr>
+                        `).join('')}
+                    </tbody>
+                </table>
+            </div>
+        `;
+        
+        container.innerHTML = html;
+        
+    } catch (error) {
+        console.error('Error loading escalations:', error);
+        document.getElementById('escalations-content').innerHTML = '<p class="text-danger">Error loading escalations</p>';
+    }
+}
+
+async function resolveEscalation(id) {
+    try {
+        const response = await fetch(`/api/escalations/${id}/resolve`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({})
+        });
+        
+        const result = await response.json();
+        
+        if (result.success) {
+            loadEscalations();
+            showAlert('success', result.message);
+        } else {
+            showAlert('danger', result.message);
+        }
+        
+    } catch (error) {
+        console.error('Error resolving escalation:', error);
+        showAlert('danger', 'Error resolving escalation');
+    }
+}
+
 // Utility functions
 function showAlert(type, message) {
     const alertDiv = document.createElement('div');
@@ -522,4 +652,6 @@ function showAlert(type, message) {
 
 // Event listeners
 document.getElementById('logs-days').addEventListener('change', loadLogs);
+document.getElementById('profiles-limit').addEventListener('change', loadProfiles);
+document.getElementById('escalations-status').addEventListener('change', loadEscalations);
 document.getElementById('report-date').addEventListener('change', loadReport); 
\ No newline at end of file
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+PickleballAI Storage Quota
+Places uploads into storage buckets, enforces bucket quotas and keeps per-bucket usage counters
+"""
+
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from data_store import atomic_write_json, file_lock
+from metrics_system import metrics
+
+BYTES_PER_GB = 1024 ** 3
+# Buckets without a "path" keep their objects here, one directory per bucket
+BUCKET_ROOT = "storage"
+
+metrics.describe("pickleball_storage_rejections_total", "Uploads refused because no bucket had room")
+
+def _used_bytes(bucket: Dict) -> int:
+    """Exact byte counter; buckets created before accounting only have used_gb"""
+    if "used_bytes" not in bucket:
+        bucket["used_bytes"] = int(bucket.get("used_gb", 0) * BYTES_PER_GB)
+    return bucket["used_bytes"]
+
+def _set_used(bucket: Dict, used_bytes: int):
+    bucket["used_bytes"] = max(used_bytes, 0)
+    bucket["used_gb"] = round(bucket["used_bytes"] / BYTES_PER_GB, 3)
+
+def bucket_tier(bucket: Dict) -> str:
+    """"hot" buckets take uploads; "archive" buckets hold compressed videos nobody has watched for a while"""
+    return bucket.get("tier", "hot")
+
+def free_bytes(bucket: Dict) -> int:
+    return bucket["size_gb"] * BYTES_PER_GB - _used_bytes(bucket)
+
+class BucketQuota:
+    def __init__(self, storage_file: str):
+        self.storage_file = storage_file
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.storage_file, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def reserve(self, size_bytes: int, tier: str = "hot", force: bool = False) -> Tuple[Optional[str], Optional[str]]:
+        """Charge an upload to the active bucket of a tier with the most free space; returns (bucket name, error)
+
+        With force the bucket is charged even past its quota, for bytes that are already stored somewhere.
+        """
+        # Without any active bucket uploads are neither placed nor limited
+        with file_lock(self.storage_file):
+            data = self._load()
+            buckets = [b for b in data.get("buckets", [])
+                       if b.get("status") == "active" and bucket_tier(b) == tier]
+            if not buckets:
+                return None, None
+            bucket = max(buckets, key=free_bytes)
+            if free_bytes(bucket) < size_bytes and not force:
+                metrics.inc("pickleball_storage_rejections_total")
+                return None, f"Storage quota exceeded: {size_bytes} bytes do not fit in any bucket"
+            _set_used(bucket, _used_bytes(bucket) + size_bytes)
+            bucket["video_count"] = bucket.get("video_count", 0) + 1
+            atomic_write_json(self.storage_file, data)
+        return bucket["name"], None
+
+    def release(self, bytes_by_bucket: Dict[str, int], videos_by_bucket: Optional[Dict[str, int]] = None):
+        """Give bytes (and video counts) back to their buckets in one write"""
+        if not bytes_by_bucket and not videos_by_bucket:
+            return
+        videos_by_bucket = videos_by_bucket or {}
+        with file_lock(self.storage_file):
+            data = self._load()
+            for bucket in data.get("buckets", []):
+                name = bucket["name"]
+                if name in bytes_by_bucket or name in videos_by_bucket:
+                    _set_used(bucket, _used_bytes(bucket) - bytes_by_bucket.get(name, 0))
+                    bucket["video_count"] = max(bucket.get("video_count", 0) - videos_by_bucket.get(name, 0), 0)
+            if data:
+                atomic_write_json(self.storage_file, data)
+
+    def release_deleted(self, tombstones: List[Dict]):
+        """Give back the space of deleted videos recorded in their tombstones, once per video however often retried"""
+        with file_lock(self.storage_file):
+            data = self._load()
+            released = set(data.get("released_videos", []))
+            fresh = [t for t in tombstones if t.get("bucket") and t["video_id"] not in released]
+            if not fresh:
+                return
+            buckets = {bucket["name"]: bucket for bucket in data.get("buckets", [])}
+            for tombstone in fresh:
+                bucket = buckets.get(tombstone["bucket"])
+                if bucket is not None:
+                    _set_used(bucket, _used_bytes(bucket) - tombstone.get("bytes", 0))
+                    bucket["video_count"] = max(bucket.get("video_count", 0) - 1, 0)
+            data["released_videos"] = sorted(released | {t["video_id"] for t in fresh})
+            atomic_write_json(self.storage_file, data)
+
+    def forget_released(self, video_ids: Iterable[str]):
+        """Drop release markers once the tombstones they guard are gone"""
+        forgotten = set(video_ids)
+        with file_lock(self.storage_file):
+            data = self._load()
+            released = data.get("released_videos", [])
+            kept = [video_id for video_id in released if video_id not in forgotten]
+            if len(kept) != len(released):
+                data["released_videos"] = kept
+                atomic_write_json(self.storage_file, data)
+
+    def bucket_path(self, name: str) -> str:
+        """Directory holding a bucket's objects"""
+        for bucket in self._load().get("buckets", []):
+            if bucket["name"] == name and bucket.get("path"):
+                return bucket["path"]
+        return os.path.join(BUCKET_ROOT, name)
+
+    def usage(self) -> Dict:
+        """Per-bucket and total usage from the counters; no walk of the videos directory"""
+        buckets = []
+        for bucket in self._load().get("buckets", []):
+            used = _used_bytes(bucket)
+            size = bucket["size_gb"] * BYTES_PER_GB
+            buckets.append({
+                "name": bucket["name"],
+                "purpose": bucket.get("purpose"),
+                "status": bucket.get("status"),
+                "tier": bucket_tier(bucket),
+                "size_gb": bucket["size_gb"],
+                "used_gb": round(used / BYTES_PER_GB, 3),
+                "free_gb": round(max(size - used, 0) / BYTES_PER_GB, 3),
+                "used_percent": round(100 * used / size, 1) if size else 0,
+                "video_count": bucket.get("video_count", 0)
+            })
+        size_gb = sum(b["size_gb"] for b in buckets)
+        used_gb = round(sum(b["used_gb"] for b in buckets), 3)
+        return {
+            "buckets": buckets,
+            "total": {
+                "size_gb": size_gb,
+                "used_gb": used_gb,
+                "free_gb": round(sum(b["free_gb"] for b in buckets), 3),
+                "used_percent": round(100 * used_gb / size_gb, 1) if size_gb else 0,
+                "video_count": sum(b["video_count"] for b in buckets)
+            }
+        }
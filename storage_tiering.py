@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+PickleballAI Storage Tiering
+Moves videos nobody has watched for a while to a compressed archive bucket and recalls them on access
+"""
+
+import gzip
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from data_store import atomic_write_json, file_lock
+from metrics_system import metrics
+
+ARCHIVE_AFTER_DAYS = float(os.environ.get("PICKLEBALL_ARCHIVE_AFTER_DAYS", 90))
+ACCESS_FLUSH_SECONDS = 60
+TIERING_INTERVAL_SECONDS = 3600
+# Videos compressed per pass
+ARCHIVE_BATCH_SIZE = 50
+
+metrics.describe("pickleball_videos_archived_total", "Videos moved to the archive tier")
+metrics.describe("pickleball_videos_recalled_total", "Archived videos restored to the hot tier on access")
+
+logger = logging.getLogger(__name__)
+
+class AccessLog:
+    def __init__(self, access_file: str, flush_seconds: float = ACCESS_FLUSH_SECONDS):
+        """Last access per video; touches stay in memory and are merged into the file at most once per flush_seconds"""
+        self.access_file = access_file
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._pending: Dict[str, str] = {}
+        self._last_flush = time.monotonic()
+
+    def touch(self, video_id: str, when: Optional[datetime] = None):
+        with self._lock:
+            self._pending[video_id] = (when or datetime.now()).isoformat()
+            due = time.monotonic() - self._last_flush >= self.flush_seconds
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        with file_lock(self.access_file):
+            data = self._load()
+            accessed = data.setdefault("accessed", {})
+            # Other processes flush too; the latest access wins
+            for video_id, when in pending.items():
+                if when > accessed.get(video_id, ""):
+                    accessed[video_id] = when
+            atomic_write_json(self.access_file, data, indent=None)
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.access_file, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def last_accessed(self) -> Dict[str, str]:
+        """Flushed and pending accesses of every video"""
+        accessed = self._load().get("accessed", {})
+        with self._lock:
+            for video_id, when in self._pending.items():
+                if when > accessed.get(video_id, ""):
+                    accessed[video_id] = when
+        return accessed
+
+class StorageTiering:
+    def __init__(self, video_permissions, archive_after_days: float = ARCHIVE_AFTER_DAYS,
+                 interval_seconds: float = TIERING_INTERVAL_SECONDS, batch_size: int = ARCHIVE_BATCH_SIZE):
+        """video_permissions is the VideoPermissionSystem whose videos and buckets are tiered"""
+        self.video_permissions = video_permissions
+        self.quota = video_permissions.quota
+        self.access_log = AccessLog(os.path.join(video_permissions.data_dir, "video_access.json"))
+        self.archive_after_days = archive_after_days
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._thread = None
+        self._stop = threading.Event()
+
+    def archive_cold(self, now: Optional[datetime] = None) -> Dict:
+        """Compress up to batch_size videos not accessed for archive_after_days into an archive bucket"""
+        now = now or datetime.now()
+        cutoff = (now - timedelta(days=self.archive_after_days)).isoformat()
+        self.access_log.flush()
+        accessed = self.access_log.last_accessed()
+        videos_file = self.video_permissions.videos_file
+        blobs = self.video_permissions.blobs
+        tombstones = self.video_permissions.tombstones
+
+        # Pick candidates under the lock; compressing them happens outside it
+        candidates = []
+        with file_lock(videos_file):
+            for video in self.video_permissions._load_data(videos_file).get("videos", []):
+                if len(candidates) >= self.batch_size:
+                    break
+                if video.get("tier") == "archive" or accessed.get(video["id"], video["uploaded_at"]) > cutoff:
+                    continue
+                # Deleted videos stay charged to the bucket their tombstone names until collected
+                if tombstones.contains(video["id"]):
+                    continue
+                key = self.video_permissions.blob_key(video)
+                if key and blobs.stat(key) is not None:
+                    candidates.append(video)
+
+        compressed = []
+        for video in candidates:
+            # Reserve the uncompressed size, then refund what compression saved
+            bucket, error = self.quota.reserve(video.get("size_bytes", 0), tier="archive")
+            if error or not bucket:
+                logger.warning(f"No archive bucket has room; {video['id']} stays hot")
+                break
+            archive_path = os.path.join(self.quota.bucket_path(bucket), f"{video['id']}.gz")
+            temp_path = f"{archive_path}.{os.getpid()}.{threading.get_ident()}.archive"
+            os.makedirs(os.path.dirname(archive_path), exist_ok=True)
+            with gzip.open(temp_path, 'wb') as dst:
+                for chunk in blobs.iter_range(self.video_permissions.blob_key(video)):
+                    dst.write(chunk)
+            compressed.append((video, bucket, archive_path, temp_path))
+
+        # Flip the records that did not change meanwhile; a stream or an edit keeps the video hot
+        archived, abandoned = [], []
+        freed, freed_videos, overcharged = {}, {}, {}
+        if compressed:
+            with file_lock(videos_file):
+                data = self.video_permissions._load_data(videos_file)
+                current = {video["id"]: video for video in data.get("videos", [])}
+                accessed = self.access_log.last_accessed()
+                for snapshot, bucket, archive_path, temp_path in compressed:
+                    video = current.get(snapshot["id"])
+                    if (video != snapshot or accessed.get(video["id"], video["uploaded_at"]) > cutoff
+                            or tombstones.contains(video["id"])):
+                        abandoned.append((snapshot, bucket, temp_path))
+                        continue
+                    os.replace(temp_path, archive_path)
+                    stored_bytes = os.path.getsize(archive_path)
+                    overcharged[bucket] = overcharged.get(bucket, 0) + video.get("size_bytes", 0) - stored_bytes
+                    if video.get("bucket"):
+                        freed[video["bucket"]] = freed.get(video["bucket"], 0) + video.get("size_bytes", 0)
+                        freed_videos[video["bucket"]] = freed_videos.get(video["bucket"], 0) + 1
+                    video.update(tier="archive", archive_path=archive_path, bucket=bucket,
+                                 stored_bytes=stored_bytes, archived_at=now.isoformat())
+                    archived.append((video["id"], self.video_permissions.blob_key(snapshot)))
+                if archived:
+                    self.video_permissions._save_data(videos_file, data)
+                    # Only now that the record points at the archive; still under the lock so a recall
+                    # cannot restore the blob in between
+                    for _, key in archived:
+                        blobs.delete(key)
+
+        # Abandoned archives give back their whole reservation
+        for snapshot, bucket, temp_path in abandoned:
+            os.remove(temp_path)
+            overcharged[bucket] = overcharged.get(bucket, 0) + snapshot.get("size_bytes", 0)
+            freed_videos[bucket] = freed_videos.get(bucket, 0) + 1
+        self.quota.release(freed, freed_videos)
+        self.quota.release(overcharged)
+        if archived:
+            metrics.inc("pickleball_videos_archived_total", len(archived))
+            logger.info(f"Archived {len(archived)} videos not accessed since {cutoff[:10]}")
+        return {"archived": len(archived), "video_ids": [video_id for video_id, _ in archived]}
+
+    def open_video(self, video_id: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """A video ready to stream, recalled from the archive first; returns (video, error)"""
+        video = self.video_permissions.get_video(video_id)
+        if not video:
+            return None, "Video not found"
+        self.access_log.touch(video_id)
+        if video.get("tier") == "archive":
+            return self.recall(video_id)
+        return video, None
+
+    def recall(self, video_id: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """Decompress an archived video back into the hot tier"""
+        videos_file = self.video_permissions.videos_file
+        blobs = self.video_permissions.blobs
+        with file_lock(videos_file):
+            snapshot = next((v for v in self.video_permissions._load_data(videos_file).get("videos", [])
+                             if v["id"] == video_id), None)
+        if snapshot is None:
+            return None, "Video not found"
+        if snapshot.get("tier") != "archive":
+            return snapshot, None
+
+        # Recall never fails on quota: the video is already paid for in the archive
+        size_bytes = snapshot.get("size_bytes", 0)
+        hot_bucket, _ = self.quota.reserve(size_bytes, force=True)
+        hot_charge = ({hot_bucket: size_bytes}, {hot_bucket: 1}) if hot_bucket else ({}, {})
+        archive_path, key = snapshot["archive_path"], self.video_permissions.blob_key(snapshot)
+
+        # Decompress next to the archive, then hand the file to the blob store (a parallel upload on S3);
+        # neither holds the videos lock, so other requests are not stalled behind a large recall
+        temp_path = f"{archive_path}.{os.getpid()}.{threading.get_ident()}.recall"
+        try:
+            with gzip.open(archive_path, 'rb') as src, open(temp_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            blobs.put_file(key, temp_path)
+        except Exception as e:
+            self.quota.release(*hot_charge)
+            logger.error(f"Recalling {video_id} failed: {e}")
+            return None, "The video could not be restored from the archive"
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        # Flip the record unless another request recalled or removed the video meanwhile
+        with file_lock(videos_file):
+            data = self.video_permissions._load_data(videos_file)
+            video = next((v for v in data.get("videos", []) if v["id"] == video_id), None)
+            if video is not None and self.video_permissions.tombstones.contains(video_id):
+                video = None
+            if video is None or video.get("tier") != "archive" or video["archive_path"] != archive_path:
+                if video is None:
+                    blobs.delete(key)
+                recalled = False
+            else:
+                archive_bucket = video["bucket"]
+                self.quota.release({archive_bucket: video.get("stored_bytes", 0)}, {archive_bucket: 1})
+                for field in ("archive_path", "stored_bytes", "archived_at"):
+                    video.pop(field, None)
+                video.update(tier="hot", bucket=hot_bucket, recalled_at=datetime.now().isoformat())
+                self.video_permissions._save_data(videos_file, data)
+                recalled = True
+
+        if not recalled:
+            self.quota.release(*hot_charge)
+            return (video, None) if video is not None else (None, "Video not found")
+        os.remove(archive_path)
+
+        metrics.inc("pickleball_videos_recalled_total")
+        logger.info(f"Recalled {video_id} from the archive tier")
+        return video, None
+
+    def start(self):
+        """Archive cold videos on a background thread every interval_seconds"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run_loop, name="storage-tiering", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.access_log.flush()
+
+    def _run_loop(self):
+        while not self._stop.is_set():
+            try:
+                # Full batches mean more cold videos are waiting
+                while self.archive_cold()["archived"] == self.batch_size and not self._stop.is_set():
+                    pass
+            except Exception as e:
+                logger.error(f"Storage tiering failed: {e}")
+            self._stop.wait(self.interval_seconds)
+
+def main():
+    """Run the archive pass as its own worker process"""
+    from video_permission_system import VideoPermissionSystem
+
+    tiering = StorageTiering(VideoPermissionSystem())
+    tiering.start()
+    print(f"🧊 Archiving videos idle for {tiering.archive_after_days} days; press Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        tiering.stop()
+
+if __name__ == "__main__":
+    main()
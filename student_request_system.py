@@ -6,18 +6,34 @@ Handles student requests for coach annotations
 
 from flask import Flask, render_template, request, jsonify, session, redirect, url_for
 from flask_cors import CORS
-import json
 import os
 from datetime import datetime
 from typing import Dict, List, Optional
 import secrets
 
+import api_response
+import http_cache
+import metrics_system
+import profiling_system
+from api_response import select_fields
+from blob_store import send_blob
+from data_store import atomic_write_json, file_lock, load_json
+from http_cache import PRIVATE_MEDIA_CACHE, conditional
+from id_allocator import new_id
+from metrics_system import timed
+
 # Import the notification system
 from coach_notification_system import CoachNotificationSystem
+from media_pipeline import CLIP_PADDING_SECONDS, clip_key
+from storage_tiering import StorageTiering
 
 app = Flask(__name__)
 app.secret_key = secrets.token_hex(16)
 CORS(app)
+metrics_system.init_app(app, "student_requests")
+http_cache.init_app(app)
+api_response.init_app(app)
+profiling_system.init_app(app, "student_requests")
 
 class StudentRequestSystem:
     def __init__(self):
@@ -25,6 +41,9 @@ class StudentRequestSystem:
         self.data_dir = "data"
         self.users_file = os.path.join(self.data_dir, "users.json")
         self.coaches_file = os.path.join(self.data_dir, "coaches.json")
+        self.coach_index = self.notification_system.scheduler.coach_index
+        # Archived videos are recalled when streamed
+        self.tiering = StorageTiering(self.notification_system.video_permissions)
         
         # Ensure directories exist
         os.makedirs(self.data_dir, exist_ok=True)
@@ -33,17 +52,13 @@ class StudentRequestSystem:
     
     def _load_data(self, file_path: str) -> Dict:
         """Load data from JSON file"""
-        try:
-            with open(file_path, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
+        return load_json(file_path)
     
     def _save_data(self, file_path: str, data: Dict):
         """Save data to JSON file"""
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        atomic_write_json(file_path, data)
     
+    @timed
     def authenticate_user(self, email: str, password: str) -> Optional[Dict]:
         """Authenticate user login"""
         data = self._load_data(self.users_file)
@@ -54,27 +69,34 @@ class StudentRequestSystem:
         
         return None
     
+    @timed
     def get_available_coaches(self) -> List[Dict]:
         """Get list of available coaches"""
         data = self._load_data(self.coaches_file)
         return [coach for coach in data.get("coaches", []) if coach["status"] == "active"]
     
+    @timed
     def get_user_requests(self, user_email: str) -> List[Dict]:
         """Get all requests for a specific user"""
         data = self._load_data(self.notification_system.requests_file)
         requests = data.get("requests", [])
         return [req for req in requests if req.get("student_email") == user_email]
     
+    @timed
     def submit_annotation_request(self, student_email: str, student_name: str,
                                 coach_email: str, video_filename: str, 
-                                message: str = "") -> Dict:
+                                message: str = "", priority: str = "normal",
+                                auto_assign: bool = False, idempotency_key: str = None) -> Dict:
         """Submit a new annotation request"""
         return self.notification_system.process_annotation_request(
             student_email=student_email,
             student_name=student_name,
             coach_email=coach_email,
             video_filename=video_filename,
-            message=message
+            message=message,
+            priority=priority,
+            auto_assign=auto_assign,
+            idempotency_key=idempotency_key
         )
 
 # Initialize the system
@@ -111,27 +133,28 @@ def signup():
         name = request.form.get('name')
         password = request.form.get('password')
         
-        # Check if user already exists
-        data = system._load_data(system.users_file)
-        for user in data.get("users", []):
-            if user["email"] == email:
-                return render_template('student_signup.html', error='User with this email already exists')
-        
-        # Create new user
-        user = {
-            "id": f"user_{len(data.get('users', [])) + 1}",
-            "email": email,
-            "name": name,
-            "password": password,  # In production, hash the password
-            "role": "student",
-            "status": "active",
-            "created_at": datetime.now().isoformat(),
-            "total_spent": 0.0,
-            "total_sessions": 0
-        }
-        
-        data.setdefault("users", []).append(user)
-        system._save_data(system.users_file, data)
+        with file_lock(system.users_file):
+            # Check if user already exists
+            data = system._load_data(system.users_file)
+            for user in data.get("users", []):
+                if user["email"] == email:
+                    return render_template('student_signup.html', error='User with this email already exists')
+            
+            # Create new user
+            user = {
+                "id": new_id("user"),
+                "email": email,
+                "name": name,
+                "password": password,  # In production, hash the password
+                "role": "student",
+                "status": "active",
+                "created_at": datetime.now().isoformat(),
+                "total_spent": 0.0,
+                "total_sessions": 0
+            }
+            
+            data.setdefault("users", []).append(user)
+            system._save_data(system.users_file, data)
         
         # Auto-login
         session['user_email'] = email
@@ -173,7 +196,10 @@ def submit_request():
             student_name=session['user_name'],
             coach_email=coach_email,
             video_filename=video_filename,
-            message=message
+            message=message,
+            priority=request.form.get('priority', 'normal'),
+            auto_assign=request.form.get('auto_assign') in ('on', 'true', '1'),
+            idempotency_key=request.form.get('idempotency_key')
         )
         
         if result['success']:
@@ -186,6 +212,37 @@ def submit_request():
     return render_template('submit_request.html', 
                          coaches=system.get_available_coaches())
 
+@app.route('/videos/<video_id>/stream')
+def stream_video(video_id):
+    if 'user_email' not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    
+    video_permissions = system.notification_system.video_permissions
+    if not video_permissions.check_permissions(video_id, session['user_email'], "read"):
+        return jsonify({"error": "Access denied to this video"}), 403
+    
+    video, error = system.tiering.open_video(video_id)
+    if error:
+        return jsonify({"error": error}), 404
+    # Range requests let the player seek without downloading the whole file
+    return send_blob(video_permissions.blobs, video_permissions.blob_key(video))
+
+@app.route('/videos/<video_id>/clips/<clip_id>')
+def video_clip(video_id, clip_id):
+    if 'user_email' not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    
+    video_permissions = system.notification_system.video_permissions
+    result = video_permissions.get_video_clips(video_id, session['user_email'])
+    if not result["success"]:
+        return jsonify({"error": result["error"]}), 403
+    if not any(c["id"] == clip_id and c["status"] == "completed" for c in result["clips"]):
+        return jsonify({"error": "Clip not found"}), 404
+    response = send_blob(video_permissions.blobs, clip_key(video_id, clip_id))
+    # A clip id names its time window, so its bytes never change
+    response.headers["Cache-Control"] = PRIVATE_MEDIA_CACHE
+    return response
+
 @app.route('/logout')
 def logout():
     session.clear()
@@ -193,11 +250,23 @@ def logout():
 
 # API Routes
 @app.route('/api/coaches')
+@conditional(system.coaches_file)
 def api_coaches():
     coaches = system.get_available_coaches()
-    return jsonify({"success": True, "coaches": coaches})
+    return jsonify({"success": True, "coaches": select_fields(coaches)})
+
+@app.route('/api/coaches/recommend')
+def api_recommend_coaches():
+    coaches = system.coach_index.search(
+        specialization=request.args.get('specialization', ''),
+        min_rate=request.args.get('min_rate', type=float),
+        max_rate=request.args.get('max_rate', type=float),
+        k=min(max(request.args.get('k', 5, type=int), 1), 50)
+    )
+    return jsonify({"success": True, "coaches": select_fields(coaches)})
 
 @app.route('/api/requests')
+@conditional(system.notification_system.requests_file)
 def api_requests():
     if 'user_email' not in session:
         return jsonify({"error": "Not authenticated"}), 401
@@ -205,7 +274,7 @@ def api_requests():
     user_email = session['user_email']
     requests = system.get_user_requests(user_email)
     
-    return jsonify({"success": True, "requests": requests})
+    return jsonify({"success": True, "requests": select_fields(requests)})
 
 @app.route('/api/submit-request', methods=['POST'])
 def api_submit_request():
@@ -219,10 +288,70 @@ def api_submit_request():
         student_name=session['user_name'],
         coach_email=data['coach_email'],
         video_filename=data['video_filename'],
-        message=data.get('message', '')
+        message=data.get('message', ''),
+        priority=data.get('priority', 'normal'),
+        auto_assign=bool(data.get('auto_assign', False)),
+        # Retries with the same key return the original result instead of a duplicate request
+        idempotency_key=request.headers.get('Idempotency-Key')
     )
     
     return jsonify(result)
 
+@app.route('/api/permissions/grant', methods=['POST'])
+def api_grant_permissions():
+    if 'user_email' not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    
+    data = request.json or {}
+    result = system.notification_system.video_permissions.grant_many(
+        data.get('grants', []), granted_by=session['user_email'])
+    return jsonify(result)
+
+@app.route('/api/permissions/revoke', methods=['POST'])
+def api_revoke_permissions():
+    if 'user_email' not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    
+    data = request.json or {}
+    result = system.notification_system.video_permissions.revoke_many(
+        data.get('revocations', []), revoked_by=session['user_email'])
+    return jsonify(result)
+
+@app.route('/api/permissions/transfer', methods=['POST'])
+def api_transfer_permissions():
+    if 'user_email' not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    
+    data = request.json or {}
+    from_coach, to_coach = data.get('from_coach'), data.get('to_coach')
+    if not isinstance(from_coach, str) or not isinstance(to_coach, str):
+        return jsonify({"success": False, "error": "from_coach and to_coach are required"}), 400
+    coach = system.notification_system.get_coach_by_email(to_coach)
+    if not coach or coach.get("status") != "active":
+        return jsonify({"success": False, "error": f"{to_coach} is not an active coach"}), 400
+    
+    result = system.notification_system.video_permissions.transfer_coach_access(
+        session['user_email'], from_coach, to_coach)
+    return jsonify(result)
+
+@app.route('/api/videos/<video_id>/clips', methods=['GET', 'POST'])
+def api_video_clips(video_id):
+    if 'user_email' not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    
+    video_permissions = system.notification_system.video_permissions
+    if request.method == 'GET':
+        # Highlights: a few short clips instead of the whole match
+        return jsonify(video_permissions.get_video_clips(video_id, session['user_email']))
+    
+    data = request.json or {}
+    try:
+        padding = float(data.get('padding', CLIP_PADDING_SECONDS))
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "padding must be a number of seconds"}), 400
+    result = video_permissions.request_clips(
+        video_id, session['user_email'], annotation_ids=data.get('annotation_ids'), padding=padding)
+    return jsonify(result)
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5002) 
\ No newline at end of file
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test Analysis Engine
+Verifies batched per-frame analysis on a process pool and how requested analyses are recorded on the video
+"""
+
+import json
+
+import pytest
+
+from analysis_engine import FRAME_HEIGHT, FRAME_WIDTH, AnalysisEngine, np
+
+class StubEngine:
+    """Stands in for the engine where numpy is missing: three frames, one with the ball"""
+    model_name = "stub"
+    fps = 5.0
+
+    def analyze(self, source):
+        for frame in range(3):
+            yield {"frame": frame, "time": frame / self.fps, "motion": 0.1 * frame,
+                   "ball": {"x": 0.5, "y": 0.5, "pixels": 4} if frame == 1 else None}
+
+def _frames(count: int):
+    """Black frames with a 4x4 pickleball-yellow square moving right by 8 pixels per frame"""
+    for index in range(count):
+        frame = np.zeros((FRAME_HEIGHT, FRAME_WIDTH, 3), dtype=np.uint8)
+        x = 8 * index
+        frame[88:92, x:x + 4] = (230, 230, 60)
+        yield frame.tobytes()
+
+@pytest.mark.skipif(np is None, reason="numpy not installed")
+def test_heuristic_model_on_process_pool():
+    # Batches straddle workers, yet results come back in frame order and match a single worker
+    results = list(AnalysisEngine(model_spec="heuristic", workers=2, batch_size=4).analyze(None, _frames(10)))
+    assert [r["frame"] for r in results] == list(range(10))
+    assert results[3]["time"] == 0.6
+    xs = [r["ball"]["x"] for r in results]
+    assert xs == sorted(xs) and all(r["ball"]["pixels"] == 16 for r in results)
+    # Movement is measured against the previous frame, also across batch boundaries
+    assert results[0]["motion"] == 0 and results[4]["motion"] == results[5]["motion"] > 0
+    single = list(AnalysisEngine(model_spec="heuristic", workers=1, batch_size=10).analyze(None, _frames(10)))
+    assert single == results
+
+def test_requested_analysis_is_recorded(dashboard):
+    from coach_dashboard import app
+    from media_pipeline import MediaPipeline, analysis_key
+    from video_gc import VideoGarbageCollector
+    video_permissions = dashboard.video_permissions
+    with open("match.mp4", "wb") as f:
+        f.write(b"rally " * 1000)
+    video = video_permissions.upload_video("student@example.com", "match.mp4", "match.mp4")["video"]
+    video_permissions.assign_coach_permissions(video["id"], "coach@example.com", "req_1")
+    assert video["analysis_status"] == "pending"
+
+    # Coaches with edit access queue it; the engine only picks up requested analyses
+    pipeline = MediaPipeline(video_permissions, ffmpeg="ffmpeg", engine=StubEngine())
+    assert "analysis" not in pipeline._due_stages(video_permissions.get_video(video["id"]))
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['coach_email'] = "coach@example.com"
+    response = client.post(f"/api/videos/{video['id']}/analysis/run").get_json()
+    assert response == {"success": True, "video_id": video["id"], "analysis_status": "queued"}
+    assert "analysis" in pipeline._due_stages(video_permissions.get_video(video["id"]))
+    assert not video_permissions.request_video_analysis(video["id"], "other@example.com")["success"]
+
+    # Per-frame results go to the blob store, a summary to analysis_data
+    result = pipeline.analyze(video["id"])
+    assert result["success"] and result["frames"] == 3
+    stored = video_permissions.get_video(video["id"])
+    assert stored["analysis_status"] == "completed" and stored["analysis_updated_by"] == "analysis_engine"
+    analysis = stored["analysis_data"]
+    assert analysis["model"] == "stub" and analysis["ball_visible_ratio"] == 0.333
+    assert analysis["peak_motion_times"] == [0.4, 0.2, 0.0]
+    lines = video_permissions.blobs.get_range(analysis_key(video["id"])).decode().splitlines()
+    assert [json.loads(line)["frame"] for line in lines] == [0, 1, 2]
+
+    # Results go with the video
+    video_permissions.delete_video(video["id"], "student@example.com")
+    VideoGarbageCollector(video_permissions).collect_all()
+    assert video_permissions.blobs.stat(analysis_key(video["id"])) is None
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(["-q", __file__]))
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Test API Response
+Verifies compression negotiation, ETags on compressed bodies, field projection and the JSON encoder
+"""
+
+import gzip
+import json
+
+import pytest
+
+from api_response import FastJSONProvider
+
+def test_compression_and_field_projection(console):
+    from web_root_console import app
+
+    for i in range(20):
+        console.create_coach(f"coach{i}@example.com", f"Coach {i}", "Serves and volleys", 60.0)
+    client = app.test_client()
+
+    plain = client.get('/api/coaches')
+    assert 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['Vary']
+
+    compressed = client.get('/api/coaches', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert len(compressed.data) < len(plain.data)
+    assert json.loads(gzip.decompress(compressed.data)) == plain.json
+    assert compressed.headers['ETag'] == plain.headers['ETag'][:-1] + '-gzip"'
+
+    # The compressed validator revalidates like the plain one
+    cached = client.get('/api/coaches', headers={
+        'Accept-Encoding': 'gzip', 'If-None-Match': compressed.headers['ETag']})
+    assert cached.status_code == 304
+
+    projected = client.get('/api/coaches?fields=email,status')
+    assert projected.json['coaches'][0] == {"email": "coach0@example.com", "status": "active"}
+    assert projected.headers['ETag'] != plain.headers['ETag']
+
+    # Small bodies are left alone
+    small = client.get('/api/storage', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in small.headers
+
+def test_json_provider_matches_stdlib():
+    from flask import Flask
+
+    provider = FastJSONProvider(Flask(__name__))
+    payload = {"b": [1, 2.5, None, True], "a": {"nested": "é"}, "c": 2 ** 70}
+    assert json.loads(provider.dumps(payload)) == payload
+    assert provider.dumps({"b": 1, "a": 2}) == '{"a":2,"b":1}'
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(["-q", __file__]))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test Bulk Annotation Ingest
+Verifies validation, single-write commits and collision-free IDs under concurrent writers
+"""
+
+import threading
+
+import pytest
+
+from video_permission_system import VideoPermissionSystem
+
+def _setup():
+    video_permissions = VideoPermissionSystem()
+    video_id = video_permissions.upload_video("student@example.com", "match.mp4")["video_id"]
+    video_permissions.assign_coach_permissions(video_id, "coach@example.com", "req_1")
+    return video_permissions, video_id
+
+def test_bulk_annotations_validation(workdir):
+    video_permissions, video_id = _setup()
+    batch = [{"text": f"note {i}", "type": "technique", "timestamp": str(i)} for i in range(1000)]
+
+    # One invalid row rejects the whole batch by default
+    result = video_permissions.add_video_annotations_bulk(
+        video_id, batch + [{"text": "", "timestamp": 3}], "coach@example.com")
+    assert not result["success"]
+    assert result["rejected"] == [{"index": 1000, "error": "Missing annotation text"}]
+    assert video_permissions.get_video(video_id).get("annotations") is None
+
+    # Partial mode commits the valid rows
+    result = video_permissions.add_video_annotations_bulk(
+        video_id, iter(batch + [{"text": "bad", "timestamp": -1}, {"text": "bad", "timestamp": "nan"},
+                                {"text": "bad", "timestamp": float("inf")}]), "coach@example.com",
+        allow_partial=True)
+    assert result["success"]
+    assert result["annotations_added"] == 1000
+    assert result["rejected_count"] == 3
+    assert result["rejected"][1] == {"index": 1001, "error": "Timestamp must be a finite number"}
+
+    annotations = video_permissions.get_video(video_id)["annotations"]
+    assert len(annotations) == 1000
+    assert annotations[0]["timestamp"] == 0.0
+    assert annotations[-1]["annotation_id"] == "ann_1000"
+
+    # Students cannot annotate
+    result = video_permissions.add_video_annotations_bulk(video_id, batch, "other@example.com")
+    assert not result["success"]
+
+def test_concurrent_annotation_ids_are_unique(workdir):
+    video_permissions, video_id = _setup()
+
+    def writer(n):
+        for i in range(10):
+            video_permissions.add_video_annotations(
+                video_id, [{"text": f"writer {n} note {i}"}], "coach@example.com")
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    annotations = video_permissions.get_video(video_id)["annotations"]
+    ids = [a["annotation_id"] for a in annotations]
+    assert len(annotations) == 80
+    assert len(set(ids)) == 80
+
+def test_malformed_csv_upload_is_rejected(dashboard):
+    from coach_dashboard import app
+
+    video_permissions = dashboard.video_permissions
+    video_id = video_permissions.upload_video("student@example.com", "match.mp4")["video_id"]
+    video_permissions.assign_coach_permissions(video_id, "coach@example.com", "req_1")
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['coach_email'] = "coach@example.com"
+
+    def upload(body):
+        return client.post(f'/api/videos/{video_id}/annotations/bulk', data=body, content_type='text/csv')
+
+    assert upload(b"text,type,timestamp\nGood serve,technique,4\n").json["annotations_added"] == 1
+    not_utf8 = upload(b"text,type,timestamp\nok,technique,1\n\xff\xfe,technique,2\n")
+    assert not_utf8.status_code == 400 and not_utf8.json["error"].startswith("Line 3:")
+    too_long = upload(b"text,type,timestamp\n\"" + b"x" * 200000 + b"\",technique,1\n")
+    assert too_long.status_code == 400 and too_long.json["error"].startswith("Line 2:")
+    assert len(video_permissions.get_video(video_id)["annotations"]) == 1
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(["-q", __file__]))
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test Bulk Permissions
+Verifies batched grants and revocations, per-item results and coach transfers
+"""
+
+
+import pytest
+
+from video_permission_system import VideoPermissionSystem
+
+def test_grant_and_revoke_many(workdir):
+    video_permissions = VideoPermissionSystem()
+    owner = "student@example.com"
+    video_ids = [video_permissions.upload_video(owner, f"rally{i}.mp4")["video_id"] for i in range(20)]
+    other_video = video_permissions.upload_video("other@example.com", "serve.mp4")["video_id"]
+
+    result = video_permissions.grant_many(
+        [{"video_id": v, "user_email": "ace@example.com"} for v in video_ids] +
+        [{"video_id": other_video, "user_email": "ace@example.com"},
+         {"video_id": video_ids[0], "user_email": owner},
+         {"video_id": video_ids[0], "user_email": "bo@example.com", "permissions": ["delete"]},
+         {"video_id": "missing", "user_email": "bo@example.com"}],
+        granted_by=owner)
+    assert result["granted"] == 20 and not result["success"]
+    assert [r["index"] for r in result["results"] if not r["success"]] == [20, 21, 22, 23]
+    assert all(video_permissions.check_permissions(v, "ace@example.com", "edit") for v in video_ids)
+    assert not video_permissions.check_permissions(other_video, "ace@example.com", "read")
+    assert video_permissions.check_permissions(video_ids[0], owner, "delete")
+
+    # Regranting replaces the existing row instead of adding another
+    video_permissions.grant_many([{"video_id": video_ids[0], "user_email": "ace@example.com",
+                                   "permissions": ["read"]}], granted_by=owner)
+    assert video_permissions.get_user_permissions(video_ids[0], "ace@example.com") == ["read"]
+    assert len(video_permissions._load_data(video_permissions.permissions_file)["permissions"]) == 41
+
+    # A coach leaving the platform: one revocation covers every video, owners keep theirs
+    result = video_permissions.revoke_many([{"user_email": "ace@example.com"},
+                                            {"user_email": owner},
+                                            {"video_id": video_ids[0], "user_email": "nobody@example.com"}])
+    assert result["revoked"] == 20
+    assert [r["success"] for r in result["results"]] == [True, False, False]
+    assert not any(video_permissions.check_permissions(v, "ace@example.com", "read") for v in video_ids)
+    assert all(video_permissions.check_permissions(v, owner, "delete") for v in video_ids)
+
+def test_transfer_coach_access(workdir):
+    video_permissions = VideoPermissionSystem()
+    owner = "student@example.com"
+    video_ids = [video_permissions.upload_video(owner, f"rally{i}.mp4")["video_id"] for i in range(3)]
+    other_video = video_permissions.upload_video("other@example.com", "serve.mp4")["video_id"]
+    for video_id in video_ids:
+        video_permissions.assign_coach_permissions(video_id, "ace@example.com", "req_1",
+                                                   scope={"annotations_only": True})
+    video_permissions.assign_coach_permissions(other_video, "ace@example.com", "req_2")
+
+    result = video_permissions.transfer_coach_access(owner, "ace@example.com", "bo@example.com")
+    assert result["success"] and result["transferred"] == 3
+    assert all(video_permissions.get_user_permissions(v, "bo@example.com") == ["read", "annotate"]
+               for v in video_ids)
+    assert not any(video_permissions.check_permissions(v, "ace@example.com", "read") for v in video_ids)
+    # Access granted by other owners is left alone
+    assert video_permissions.check_permissions(other_video, "ace@example.com", "edit")
+    assert not video_permissions.transfer_coach_access(owner, "ace@example.com", "cy@example.com")["success"]
+
+def test_invalid_grant_items_are_rejected_per_item(workdir):
+    video_permissions = VideoPermissionSystem()
+    owner = "student@example.com"
+    video_id = video_permissions.upload_video(owner, "rally.mp4")["video_id"]
+    coach = "ace@example.com"
+
+    invalid = [
+        {"video_id": video_id, "user_email": coach, "permissions": "read"},
+        {"video_id": video_id, "user_email": coach, "permissions": [1]},
+        {"video_id": video_id, "user_email": coach, "permissions": 7},
+        {"video_id": [video_id], "user_email": coach},
+        {"video_id": video_id, "user_email": coach, "scope": "intro"},
+        {"video_id": video_id, "user_email": coach, "scope": {"start_seconds": "ten"}},
+        {"video_id": video_id, "user_email": coach, "scope": {"start_seconds": 30, "end_seconds": 10}},
+        {"video_id": video_id, "user_email": coach, "scope": {"start_seconds": -1}},
+        {"video_id": video_id, "user_email": coach, "scope": {"end_seconds": float("nan")}},
+        {"video_id": video_id, "user_email": coach, "scope": {"annotations_only": "yes"}},
+    ]
+    result = video_permissions.grant_many(invalid + [
+        {"video_id": video_id, "user_email": coach, "scope": {"start_seconds": 10, "end_seconds": 30}}
+    ], granted_by=owner)
+    assert result["granted"] == 1
+    assert [r["success"] for r in result["results"]] == [False] * len(invalid) + [True]
+    assert video_permissions.check_permissions(video_id, coach, "edit", 20)
+    assert not video_permissions.check_permissions(video_id, coach, "edit", 40)
+
+    # The single-grant path shares the same scope checks
+    assert not video_permissions.assign_coach_permissions(
+        video_id, coach, "req_1", scope={"start_seconds": "0"})["success"]
+
+def test_transfer_route_validates_input(student_system, console):
+    from student_request_system import app
+
+    video_permissions = student_system.notification_system.video_permissions
+    owner = "student@example.com"
+    video_id = video_permissions.upload_video(owner, "rally.mp4")["video_id"]
+    video_permissions.assign_coach_permissions(video_id, "ace@example.com", "req_1")
+    console.create_coach("bo@example.com", "Bo", "Volleys", 50.0)
+    console.create_coach("cy@example.com", "Cy", "Dinks", 50.0)
+    console.block_coach("cy@example.com")
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_email'] = owner
+
+    assert client.post('/api/permissions/transfer', json={"from_coach": "ace@example.com"}).status_code == 400
+    assert client.post('/api/permissions/transfer', json={}).status_code == 400
+    for to_coach in ("nobody@example.com", "cy@example.com"):
+        response = client.post('/api/permissions/transfer',
+                               json={"from_coach": "ace@example.com", "to_coach": to_coach})
+        assert response.status_code == 400
+    assert video_permissions.check_permissions(video_id, "ace@example.com", "edit")
+
+    response = client.post('/api/permissions/transfer',
+                           json={"from_coach": "ace@example.com", "to_coach": "bo@example.com"})
+    assert response.status_code == 200 and response.json["transferred"] == 1
+    assert video_permissions.check_permissions(video_id, "bo@example.com", "edit")
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(["-q", __file__]))
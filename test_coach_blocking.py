@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test Coach Blocking
+Verifies that blocked coaches are denied at once and that their grants are suspended and restored
+"""
+
+
+import pytest
+
+from data_store import atomic_write_json
+from video_permission_system import VideoPermissionSystem
+
+def test_block_denies_and_suspends_grants(console):
+    video_permissions = VideoPermissionSystem()
+    atomic_write_json(console.coaches_file, {"coaches": [
+        {"email": "ace@example.com", "name": "Ace", "status": "active"}
+    ]})
+    video_ids = [video_permissions.upload_video("student@example.com", f"rally{i}.mp4")["video_id"]
+                 for i in range(10)]
+    for video_id in video_ids:
+        video_permissions.assign_coach_permissions(video_id, "ace@example.com", "req_1")
+    group = video_permissions.create_group("Staff", "team", ["ace@example.com"])["group"]
+    collection = video_permissions.create_collection("Library", video_ids)["collection"]
+    video_permissions.grant_group_access(group["id"], collection["id"], ["read"])
+
+    # Blocking alone keeps the rows but denies every grant, group grants included
+    assert console.block_coach("ace@example.com")["success"]
+    assert not any(video_permissions.check_permissions(v, "ace@example.com", "read") for v in video_ids)
+    assert video_permissions.get_user_permissions(video_ids[0], "ace@example.com") == []
+    assert "ace@example.com" not in video_permissions.permission_index.holders(video_ids[0], "read")
+    assert video_permissions.check_permissions(video_ids[0], "student@example.com", "delete")
+
+    # Suspending moves only that coach's rows aside
+    assert console.unblock_coach("ace@example.com")["success"]
+    assert video_permissions.check_permissions(video_ids[0], "ace@example.com", "edit")
+    result = console.block_coach("ace@example.com", revoke_grants=True)
+    assert "10 video grants suspended" in result["message"]
+    stored = video_permissions._load_data(video_permissions.permissions_file)
+    assert {p["user_email"] for p in stored["permissions"]} == {"student@example.com"}
+    assert len(stored["suspended"]["ace@example.com"]) == 10
+
+    # A grant made while suspended wins over the suspended one
+    video_permissions.grant_many([{"video_id": video_ids[0], "user_email": "ace@example.com",
+                                   "permissions": ["read"]}])
+    result = console.unblock_coach("ace@example.com")
+    assert "9 video grants restored" in result["message"]
+    assert video_permissions.get_user_permissions(video_ids[0], "ace@example.com") == ["read"]
+    assert all(video_permissions.check_permissions(v, "ace@example.com", "edit") for v in video_ids[1:])
+    assert not video_permissions._load_data(video_permissions.permissions_file)["suspended"]
+    assert not console.block_coach("nobody@example.com")["success"]
+
+def test_blocked_coach_is_denied_over_http(dashboard, console):
+    from coach_dashboard import app
+
+    system = dashboard.notification_system
+    system._send_email = lambda **kwargs: True
+    atomic_write_json(console.coaches_file, {"coaches": [
+        {"email": "ace@example.com", "name": "Ace", "password": "secret", "specialization": "Serves",
+         "hourly_rate": 50, "status": "active"}
+    ]})
+    submitted = system.process_annotation_request("student@example.com", "Stu", "ace@example.com", "rally.mp4")
+    request_id, video_id = submitted["request_id"], submitted["video_id"]
+
+    client = app.test_client()
+    response = client.post('/login', data={"email": "ace@example.com", "password": "secret"})
+    assert response.status_code == 302 and response.headers['Location'].endswith('/dashboard')
+    assert client.get('/api/requests').json["requests"][0]["video_info"]["id"] == video_id
+    # Requests only carry the video for coaches who may still read it
+    dashboard.video_permissions.revoke_many([{"video_id": video_id, "user_email": "ace@example.com"}])
+    assert "video_info" not in client.get('/api/requests').json["requests"][0]
+
+    assert console.block_coach("ace@example.com")["success"]
+    assert client.get('/api/requests').status_code == 403
+    # The block ended the session, so later calls are not authenticated at all
+    assert client.get('/api/stats').status_code == 401
+    assert client.get('/dashboard').status_code == 302
+
+    # A blocked coach cannot log back in
+    response = client.post('/login', data={"email": "ace@example.com", "password": "secret"})
+    assert response.status_code == 200 and b"Invalid credentials" in response.data
+
+    # Sessions that were already open are refused everywhere, request actions included
+    def blocked_session():
+        with client.session_transaction() as session:
+            session['coach_email'] = "ace@example.com"
+            session['coach_name'] = "Ace"
+        return client
+
+    for path in ('/api/requests', '/api/stats', '/api/videos', f'/api/videos/{video_id}/annotations'):
+        assert blocked_session().get(path).status_code == 403
+    assert blocked_session().post(f'/api/requests/{request_id}/decline', json={}).status_code == 403
+    assert system.get_pending_requests("ace@example.com")[0]["id"] == request_id
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(["-q", __file__]))
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Test Coach Matching
+Verifies ranking by specialization, budget and load, and incremental updates from request events
+"""
+
+import time
+
+import pytest
+
+from coach_matching import CoachMatchingIndex
+from data_store import atomic_write_json
+
+def _wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_ranking_and_incremental_updates(workdir):
+    from coach_notification_system import CoachNotificationSystem
+
+    system = CoachNotificationSystem()
+    system._send_email = lambda *args, **kwargs: True
+    atomic_write_json(system.coaches_file, {"coaches": [
+        {"email": "dinks@example.com", "name": "Dee", "specialization": "Dinking and third shot drops",
+         "hourly_rate": 40, "status": "active"},
+        {"email": "serves@example.com", "name": "Sam", "specialization": "Serves and returns",
+         "hourly_rate": 80, "status": "active"},
+        {"email": "busy@example.com", "name": "Bo", "specialization": "Serve technique",
+         "hourly_rate": 80, "status": "active"},
+        {"email": "blocked@example.com", "name": "Bea", "specialization": "Serves",
+         "hourly_rate": 10, "status": "blocked"}
+    ]})
+    system.create_coach_request("s@example.com", "S", "busy@example.com", "Bo", "a.mp4")
+
+    index = CoachMatchingIndex(system.coaches_file, system.requests_file)
+    results = index.search("serve")
+    assert [c["email"] for c in results] == ["serves@example.com", "busy@example.com"]
+    assert results[1]["pending_requests"] == 1
+
+    assert index.search("serve", max_rate=50) == []
+    assert index.search("drop shots")[0]["email"] == "dinks@example.com"
+    assert len(index.search("", k=2)) == 2
+
+    # New requests and answers reach the index through the event stream
+    request = system.create_coach_request("s@example.com", "S", "serves@example.com", "Sam", "b.mp4")
+    system.create_coach_request("s@example.com", "S", "serves@example.com", "Sam", "c.mp4")
+    assert _wait_for(lambda: index.get_coach_stats("serves@example.com")["pending_requests"] == 2)
+    assert index.search("serve")[0]["email"] == "busy@example.com"
+
+    system.update_request_status(request["id"], "accepted")
+    assert _wait_for(lambda: index.get_coach_stats("serves@example.com")["pending_requests"] == 1)
+    assert index.get_coach_stats("serves@example.com")["avg_response_hours"] is not None
+    index.close()
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(["-q", __file__]))
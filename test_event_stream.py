@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test Event Stream
+Verifies that write paths publish events and that only the addressed users receive them
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+
+import event_stream as event_stream_module
+from event_stream import EventStream
+
+def _collect(stream, user_email, count, results, last_event_id=None):
+    """Read SSE messages for a user until count events (not keepalives) have arrived"""
+    for message in stream.sse_stream(user_email, last_event_id, heartbeat_seconds=0.05):
+        if message.startswith("id:") or message.startswith("event:"):
+            results.append(message)
+            if len(results) == count:
+                return
+
+def test_events_reach_only_their_audience():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        stream = EventStream(os.path.join(tmp_dir, "events.jsonl"), poll_interval=0.01)
+        try:
+            coach_messages = []
+            other_messages = []
+            coach = threading.Thread(target=_collect, args=(stream, "coach@example.com", 2, coach_messages))
+            other = threading.Thread(target=_collect, args=(stream, "other@example.com", 1, other_messages))
+            coach.start()
+            other.start()
+            while stream._subscriber_count < 2:
+                time.sleep(0.01)
+
+            stream.publish("request_created", ["coach@example.com", "student@example.com"], {"id": "req_1"})
+            stream.publish("request_status", ["coach@example.com"], {"id": "req_1", "status": "accepted"})
+            coach.join(timeout=5)
+
+            assert len(coach_messages) == 2
+            assert "event: request_created" in coach_messages[0]
+            assert '"status":"accepted"' in coach_messages[1]
+            assert other_messages == []
+            assert "audience" not in coach_messages[0]
+
+            # A reconnecting client gets what it missed; an unknown cursor asks for a resync
+            first_id = coach_messages[0].split("\n")[0][len("id: "):]
+            missed = stream.events_since("coach@example.com", first_id)
+            assert [e["type"] for e in missed] == ["request_status"]
+            assert stream.events_since("coach@example.com", "evt_unknown") is None
+        finally:
+            stream.stop()
+
+def test_write_paths_publish_events(workdir):
+    from coach_notification_system import CoachNotificationSystem
+
+    stream = event_stream_module.event_stream
+    coach_messages = []
+    listener = threading.Thread(target=_collect, args=(stream, "coach@example.com", 3, coach_messages))
+    listener.start()
+    while stream._subscriber_count < 1:
+        time.sleep(0.01)
+
+    system = CoachNotificationSystem()
+    system._send_email = lambda *args, **kwargs: True
+    request = system.create_coach_request(
+        "student@example.com", "Student", "coach@example.com", "Coach", "match.mp4")
+    system.update_request_status(request["id"], "accepted")
+
+    video_id = system.video_permissions.upload_video("student@example.com", "match.mp4")["video_id"]
+    system.video_permissions.assign_coach_permissions(video_id, "coach@example.com", request["id"])
+    system.video_permissions.add_video_annotations(
+        video_id, [{"text": "Good serve"}], "coach@example.com")
+    listener.join(timeout=5)
+
+    assert [m.split("\n")[1] for m in coach_messages] == [
+        "event: request_created", "event: request_status", "event: annotations_added"]
+    assert "Good serve" in coach_messages[2]
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(["-q", __file__]))
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test HTTP Cache
+Verifies ETags, 304 answers that skip the data layer, and static asset cache headers
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from data_store import atomic_write_json
+
+def test_conditional_get_and_static_headers(console):
+    from web_root_console import app
+
+    client = app.test_client()
+    first = client.get('/api/coaches')
+    etag = first.headers['ETag']
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+
+    # A matching If-None-Match is answered without loading the coaches file
+    get_coaches = console.get_coaches
+    console.get_coaches = lambda: (_ for _ in ()).throw(AssertionError("data loaded"))
+    try:
+        cached = client.get('/api/coaches', headers={'If-None-Match': etag})
+    finally:
+        console.get_coaches = get_coaches
+    assert cached.status_code == 304
+    assert cached.headers['ETag'] == etag
+    assert cached.data == b''
+
+    # Any write to the collection changes the ETag
+    console.create_coach("coach@example.com", "Coach", "Serves", 60.0)
+    changed = client.get('/api/coaches', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert changed.json['coaches'][0]['email'] == "coach@example.com"
+
+    # Other collections and sessions get their own ETags
+    assert client.get('/api/users').headers['ETag'] != changed.headers['ETag']
+    with client.session_transaction() as session:
+        session['authenticated'] = True
+    assert client.get('/api/coaches').headers['ETag'] != changed.headers['ETag']
+
+    versioned = client.get('/static/js/dashboard.js?v=abc')
+    assert 'immutable' in versioned.headers['Cache-Control']
+    versioned.close()
+    plain = client.get('/static/js/dashboard.js')
+    assert 'must-revalidate' in plain.headers['Cache-Control']
+    plain.close()
+
+def test_coach_video_etags_follow_grants(dashboard):
+    from coach_dashboard import app
+
+    video_permissions = dashboard.video_permissions
+    video_id = video_permissions.upload_video("student@example.com", "match.mp4")["video_id"]
+    video_permissions.assign_coach_permissions(
+        video_id, "coach@example.com", "req_1", expires_at=datetime.now() + timedelta(seconds=0.5))
+    client = app.test_client()
+    # A wildcard If-None-Match never stands in for the session check
+    assert client.get('/api/videos', headers={'If-None-Match': '*'}).status_code == 401
+    with client.session_transaction() as session:
+        session['coach_email'] = "coach@example.com"
+    assert client.get('/api/videos', headers={'If-None-Match': '*'}).status_code == 200
+
+    def get_videos(etag=None):
+        return client.get('/api/videos', headers={'If-None-Match': etag} if etag else {})
+
+    first = get_videos()
+    assert [v["id"] for v in first.json["videos"]] == [video_id]
+    assert get_videos(first.headers['ETag']).status_code == 304
+
+    # A lapsed grant changes no file, yet the cached list must not outlive it
+    time.sleep(0.6)
+    lapsed = get_videos(first.headers['ETag'])
+    assert lapsed.status_code == 200 and lapsed.json["videos"] == []
+
+    # Joining a group with a collection grant only writes the groups file
+    group = video_permissions.create_group("Club Staff", "team")["group"]
+    collection = video_permissions.create_collection("Club Library", [video_id])["collection"]
+    video_permissions.grant_group_access(group["id"], collection["id"], ["read"])
+    before_joining = get_videos()
+    video_permissions.update_group_members(group["id"], add=["coach@example.com"])
+    joined = get_videos(before_joining.headers['ETag'])
+    assert joined.status_code == 200 and [v["id"] for v in joined.json["videos"]] == [video_id]
+
+    # Blocking writes only the coaches file; a blocked coach gets no cached answers at all
+    cached_annotations = client.get(f'/api/videos/{video_id}/annotations').headers['ETag']
+    atomic_write_json(video_permissions.coaches_file, {"coaches": [
+        {"email": "coach@example.com", "name": "Coach", "status": "blocked"}]})
+    blocked = get_videos(joined.headers['ETag'])
+    assert blocked.status_code == 403 and 'ETag' not in blocked.headers
+    annotations = client.get(f'/api/videos/{video_id}/annotations', headers={'If-None-Match': cached_annotations})
+    assert annotations.status_code == 401
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(["-q", __file__]))
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test ID Allocator
+Verifies that record IDs are unique, monotonic and usable for time range scans
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from data_store import atomic_write_json
+from id_allocator import IdAllocator, id_range_bounds, id_timestamp, ids_in_range
+
+def test_ids_are_unique_and_monotonic():
+    allocator = IdAllocator()
+    ids = [allocator.new_id("req") for _ in range(10000)]
+
+    assert len(set(ids)) == len(ids)
+    assert ids == sorted(ids)
+    assert all(i.startswith("req_") and len(i) == 30 for i in ids)
+
+def test_concurrent_allocation_has_no_collisions():
+    allocator = IdAllocator()
+    results = []
+
+    def worker():
+        results.extend(allocator.new_id("video") for _ in range(2000))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(results)) == 16000
+
+def test_creation_time_is_encoded():
+    allocator = IdAllocator()
+    before = datetime.now() - timedelta(seconds=1)
+    ids = [allocator.new_id("req") for _ in range(100)]
+    after = datetime.now() + timedelta(seconds=1)
+
+    assert before <= id_timestamp(ids[0]) <= id_timestamp(ids[-1]) <= after
+    assert id_timestamp("req_12") is None
+
+def test_range_scan_by_creation_time():
+    allocator = IdAllocator()
+    before = datetime.now() - timedelta(seconds=1)
+    ids = [allocator.new_id("req") for _ in range(100)]
+    after = datetime.now() + timedelta(seconds=1)
+
+    low, high = id_range_bounds("req", before, after)
+    assert low < ids[0] and ids[-1] < high
+    assert ids_in_range(ids, "req", before, after) == ids
+    assert ids_in_range(ids, "req", after, after + timedelta(days=1)) == []
+    assert ids_in_range(ids, "req", before - timedelta(days=1), before) == []
+    middle = id_timestamp(ids[50])
+    assert ids_in_range(ids, "req", middle, after) == [i for i in ids if id_timestamp(i) >= middle]
+
+def test_requests_created_between(workdir):
+    from coach_notification_system import CoachNotificationSystem
+
+    system = CoachNotificationSystem()
+    allocator = IdAllocator()
+    now = datetime.now()
+    recent = [allocator.new_id("req") for _ in range(3)]
+    atomic_write_json(system.requests_file, {"requests": [
+        {"id": "req_12", "created_at": (now - timedelta(days=3)).isoformat()},
+        {"id": "req_13", "created_at": now.isoformat()},
+    ] + [{"id": request_id} for request_id in recent]})
+
+    found = system.get_requests_created_between(now - timedelta(minutes=1), now + timedelta(minutes=1))
+    assert [r["id"] for r in found] == ["req_13"] + recent
+    found = system.get_requests_created_between(now - timedelta(days=4), now - timedelta(days=2))
+    assert [r["id"] for r in found] == ["req_12"]
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(["-q", __file__]))
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Test Media Pipeline
+Verifies that uploads get HLS renditions and sprite-sheet previews, served to coaches and purged with the video
+"""
+
+import os
+import stat
+import sys
+import time
+
+import pytest
+
+# Stands in for ffmpeg: one segment and playlist per rendition, 150 thumbnails tiled 100 to a sheet,
+# clips that name their window, no stream copy of "nocopy" sources and a failure on "corrupt" ones
+FAKE_FFMPEG = """#!{python}
+import os, sys
+args = sys.argv[1:]
+source = args[args.index("-i") + 1]
+if "%" not in source and b"corrupt" in open(source, "rb").read():
+    sys.stderr.write("Invalid data found when processing input\\n")
+    sys.exit(1)
+if "-ss" in args:
+    if "copy" in args and b"nocopy" in open(source, "rb").read():
+        sys.exit(1)
+    open(args[-1], "w").write("clip %s+%s" % (args[args.index("-ss") + 1], args[args.index("-t") + 1]))
+elif "-hls_segment_filename" in args:
+    for i, arg in enumerate(args):
+        if arg == "-hls_segment_filename":
+            segment, playlist = args[i + 1] % 0, args[i + 2]
+            open(segment, "wb").write(b"segment")
+            open(playlist, "w").write("#EXTM3U\\n#EXTINF:4.0,\\n" + os.path.basename(segment) + "\\n#EXT-X-ENDLIST\\n")
+elif "%" in source:
+    thumbs = len(os.listdir(os.path.dirname(source)))
+    for sheet in range((thumbs + 99) // 100):
+        open(args[-1] % sheet, "wb").write(b"sprite")
+else:
+    for thumb in range(1, 151):
+        open(args[-1] % thumb, "wb").write(b"thumb")
+"""
+
+# Its ffprobe reports a 480p source, below the top rendition
+FAKE_FFPROBE = """#!{python}
+print("854x480")
+"""
+
+def _fake_ffmpeg(tmp_dir: str) -> str:
+    """Fake ffmpeg with its ffprobe alongside, where MediaPipeline looks for it"""
+    for name, script in (("ffmpeg", FAKE_FFMPEG), ("ffprobe", FAKE_FFPROBE)):
+        path = os.path.join(tmp_dir, name)
+        with open(path, "w") as f:
+            f.write(script.format(python=sys.executable))
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    return os.path.join(tmp_dir, "ffmpeg")
+
+def _wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+def test_transcode_serve_and_purge(workdir, dashboard):
+    from coach_dashboard import app
+    from media_pipeline import MediaPipeline, RENDITIONS, SEGMENT_SECONDS, ffmpeg_command, hls_key, master_playlist
+    from video_gc import VideoGarbageCollector
+    video_permissions = dashboard.video_permissions
+    ffmpeg = _fake_ffmpeg(workdir)
+    with open("match.mp4", "wb") as f:
+        f.write(b"rally " * 1000)
+    with open("broken.mp4", "wb") as f:
+        f.write(b"corrupt")
+
+    pipeline = MediaPipeline(video_permissions, ffmpeg=ffmpeg, workers=1)
+    video = video_permissions.upload_video("student@example.com", "match.mp4", "match.mp4")["video"]
+    assert video["transcode_status"] == "pending"
+    demo = video_permissions.upload_video("student@example.com", "demo.mp4")["video"]
+    assert "transcode_status" not in demo
+
+    # Every rendition plus the master playlist is stored next to the original
+    result = pipeline.transcode(video["id"])
+    assert result["success"] and result["files"] == 2 * len(RENDITIONS) + 1
+    stored = video_permissions.get_video(video["id"])
+    assert stored["transcode_status"] == "completed" and stored["hls_manifest"] == "master.m3u8"
+    assert [r["name"] for r in stored["renditions"]] == ["360p", "540p", "720p"]
+    master = video_permissions.blobs.get_range(hls_key(video["id"], "master.m3u8")).decode()
+    assert "BANDWIDTH=896000,RESOLUTION=640x360\n360p.m3u8" in master
+    # Renditions above the probed source height are encoded at the source height, and advertised so
+    assert "BANDWIDTH=1696000,RESOLUTION=854x480\n540p.m3u8" in master
+    assert "BANDWIDTH=3128000,RESOLUTION=854x480\n720p.m3u8" in master
+    assert "RESOLUTION" not in master_playlist(RENDITIONS)
+    # Keyframes land on segment boundaries by time, not by an assumed frame rate
+    command = ffmpeg_command("ffmpeg", "match.mp4", "hls")
+    assert command.count(f"expr:gte(t,n_forced*{SEGMENT_SECONDS})") == len(RENDITIONS) and "-g" not in command
+
+    # ffmpeg errors surface on the record
+    broken = video_permissions.upload_video("student@example.com", "broken.mp4", "broken.mp4")["video"]
+    assert not pipeline.transcode(broken["id"])["success"]
+    failed = video_permissions.get_video(broken["id"])
+    assert failed["transcode_status"] == "failed" and "Invalid data" in failed["transcode_error"]
+
+    # Coaches with read access get the playlists and segments, nothing else
+    video_permissions.assign_coach_permissions(video["id"], "coach@example.com", "req_1")
+    client = app.test_client()
+    assert client.get(f"/videos/{video['id']}/hls/master.m3u8").status_code == 401
+    with client.session_transaction() as session:
+        session['coach_email'] = "coach@example.com"
+    response = client.get(f"/videos/{video['id']}/hls/master.m3u8")
+    assert response.status_code == 200 and response.mimetype == "application/vnd.apple.mpegurl"
+    response.close()
+    response = client.get(f"/videos/{video['id']}/hls/360p_000.ts")
+    assert response.status_code == 200 and response.data == b"segment"
+    response.close()
+    assert client.get(f"/videos/{video['id']}/hls/..%2Fmatch.mp4").status_code == 404
+    assert client.get(f"/videos/{broken['id']}/hls/master.m3u8").status_code == 403
+    assert b"hls.min.js" in client.get(f"/video/{video['id']}").data
+
+    # Started, the pipeline follows uploads from any app through the event stream
+    assert pipeline.start()
+    queued = video_permissions.upload_video("student@example.com", "later.mp4", "match.mp4")["video"]
+    assert _wait_for(lambda: video_permissions.get_video(queued["id"])["transcode_status"] == "completed")
+    pipeline.stop()
+    pipeline.ffmpeg = None
+    assert not pipeline.start()
+
+    # Purging a video removes its renditions too
+    video_permissions.delete_video(video["id"], "student@example.com")
+    VideoGarbageCollector(video_permissions).collect_all()
+    assert video_permissions.blobs.stat(hls_key(video["id"], "master.m3u8")) is None
+    assert video_permissions.blobs.stat(hls_key(queued["id"], "master.m3u8")) is not None
+
+def test_sprite_previews(workdir, dashboard):
+    from coach_dashboard import app
+    from http_cache import PRIVATE_MEDIA_CACHE
+    from media_pipeline import MediaPipeline, preview_key
+    from video_gc import VideoGarbageCollector
+    video_permissions = dashboard.video_permissions
+    with open("match.mp4", "wb") as f:
+        f.write(b"rally " * 1000)
+
+    pipeline = MediaPipeline(video_permissions, ffmpeg=_fake_ffmpeg(workdir), workers=1)
+    video = video_permissions.upload_video("student@example.com", "match.mp4", "match.mp4")["video"]
+    assert video["preview_status"] == "pending"
+
+    # 150 thumbnails fill one sheet and half of a second; every cue points at its tile
+    result = pipeline.generate_previews(video["id"])
+    assert result["success"] and result["thumbnails"] == 150
+    stored = video_permissions.get_video(video["id"])
+    assert stored["preview_status"] == "completed" and stored["transcode_status"] == "pending"
+    assert stored["preview_files"] == ["sprite_000.jpg", "sprite_001.jpg", "thumbnails.vtt"]
+    track = video_permissions.blobs.get_range(preview_key(video["id"], "thumbnails.vtt")).decode()
+    assert track.startswith("WEBVTT\n")
+    assert "00:00:00.000 --> 00:00:05.000\nsprite_000.jpg#xywh=0,0,160,90\n" in track
+    assert "00:00:55.000 --> 00:01:00.000\nsprite_000.jpg#xywh=160,90,160,90\n" in track
+    assert "00:12:25.000 --> 00:12:30.000\nsprite_001.jpg#xywh=1440,360,160,90\n" in track
+
+    # Sheets are served with long-lived cache headers to coaches who can read the video
+    video_permissions.assign_coach_permissions(video["id"], "coach@example.com", "req_1")
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['coach_email'] = "coach@example.com"
+    response = client.get(f"/videos/{video['id']}/previews/sprite_001.jpg")
+    assert response.status_code == 200 and response.mimetype == "image/jpeg"
+    assert response.headers["Cache-Control"] == PRIVATE_MEDIA_CACHE
+    response.close()
+    response = client.get(f"/videos/{video['id']}/previews/thumbnails.vtt")
+    assert response.status_code == 200 and response.mimetype == "text/vtt"
+    response.close()
+    assert client.get(f"/videos/{video['id']}/previews/sprite_002.jpg").status_code == 404
+    assert b'id="scrubber"' in client.get(f"/video/{video['id']}").data
+
+    # Sheets go with the video
+    video_permissions.delete_video(video["id"], "student@example.com")
+    VideoGarbageCollector(video_permissions).collect_all()
+    assert video_permissions.blobs.stat(preview_key(video["id"], "sprite_000.jpg")) is None
+
+def test_annotation_clips(workdir, dashboard, student_system):
+    from coach_dashboard import app
+    from http_cache import PRIVATE_MEDIA_CACHE
+    from media_pipeline import MediaPipeline, clip_key
+    import student_request_system
+    from video_gc import VideoGarbageCollector
+    video_permissions = dashboard.video_permissions
+    with open("match.mp4", "wb") as f:
+        f.write(b"rally " * 1000)
+    with open("odd.mp4", "wb") as f:
+        f.write(b"nocopy")
+
+    pipeline = MediaPipeline(video_permissions, ffmpeg=_fake_ffmpeg(workdir), workers=1)
+    video = video_permissions.upload_video("student@example.com", "match.mp4", "match.mp4")["video"]
+    video_permissions.assign_coach_permissions(video["id"], "coach@example.com", "req_1")
+    video_permissions.add_video_annotations(video["id"], [
+        {"text": "Late split step", "timestamp": 12.3},
+        {"text": "Same rally", "timestamp": 12.7},
+        {"text": "Serve", "timestamp": 3},
+        {"text": "General note"}
+    ], "coach@example.com")
+    # Older data may hold timestamps that are not finite
+    with video_permissions._edit_data(video_permissions.videos_file) as data:
+        data["videos"][0]["annotations"] += [{"text": "Broken", "timestamp": float("nan"), "annotation_id": "ann_5"},
+                                             {"text": "Broken", "timestamp": "inf", "annotation_id": "ann_6"}]
+
+    # Moments with the same whole-second window share a clip; notes without a usable timestamp get none
+    result = video_permissions.request_clips(video["id"], "coach@example.com")
+    assert result["success"]
+    assert [(c["id"], c["annotation_ids"]) for c in result["clips"]] == [
+        ("clip_7_18", ["ann_1", "ann_2"]), ("clip_0_8", ["ann_3"])]
+    again = video_permissions.request_clips(video["id"], "coach@example.com", annotation_ids=["ann_2"])
+    assert [c["id"] for c in again["clips"]] == ["clip_7_18"]
+    assert len(video_permissions.get_video(video["id"])["clips"]) == 2
+    assert not video_permissions.request_clips(video["id"], "other@example.com")["success"]
+    assert not video_permissions.request_clips(video["id"], "coach@example.com", padding=600)["success"]
+
+    # Cut by stream copy from the keyframe before the window
+    assert pipeline.cut_clips(video["id"]) == {"success": True, "clips": 2, "failed": 0}
+    clips = {c["id"]: c for c in video_permissions.get_video(video["id"])["clips"]}
+    assert clips["clip_7_18"]["status"] == "completed" and not clips["clip_7_18"]["reencoded"]
+    assert video_permissions.blobs.get_range(clip_key(video["id"], "clip_7_18")) == b"clip 7+11"
+
+    # Coaches and the student fetch finished clips; unknown ones are 404
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['coach_email'] = "coach@example.com"
+    listing = client.get(f"/api/videos/{video['id']}/clips").get_json()
+    assert [c["status"] for c in listing["clips"]] == ["completed", "completed"]
+    response = client.get(f"/videos/{video['id']}/clips/clip_0_8")
+    assert response.status_code == 200 and response.data == b"clip 0+8"
+    assert response.headers["Cache-Control"] == PRIVATE_MEDIA_CACHE
+    response.close()
+    assert client.get(f"/videos/{video['id']}/clips/clip_1_2").status_code == 404
+    student = student_request_system.app.test_client()
+    with student.session_transaction() as session:
+        session['user_email'] = "student@example.com"
+    assert len(student.get(f"/api/videos/{video['id']}/clips").get_json()["clips"]) == 2
+    response = student.get(f"/videos/{video['id']}/clips/clip_7_18")
+    assert response.status_code == 200
+    response.close()
+
+    # Sources that cannot be stream-copied are re-encoded
+    odd = video_permissions.upload_video("student@example.com", "odd.mp4", "odd.mp4")["video"]
+    video_permissions.assign_coach_permissions(odd["id"], "coach@example.com", "req_2")
+    video_permissions.add_video_annotations(odd["id"], [{"text": "Dink", "timestamp": 30}], "coach@example.com")
+    video_permissions.request_clips(odd["id"], "coach@example.com")
+    pipeline.cut_clips(odd["id"])
+    assert video_permissions.get_video(odd["id"])["clips"][0]["reencoded"]
+
+    # Started, the pipeline cuts clips requested from any app
+    assert pipeline.start()
+    student.post(f"/api/videos/{video['id']}/clips", json={"padding": 2})
+    assert _wait_for(lambda: all(c["status"] == "completed"
+                                 for c in video_permissions.get_video(video["id"])["clips"]))
+    assert len(video_permissions.get_video(video["id"])["clips"]) == 4
+    pipeline.stop()
+
+    # Clips go with the video
+    video_permissions.delete_video(video["id"], "student@example.com")
+    VideoGarbageCollector(video_permissions).collect_all()
+    assert video_permissions.blobs.stat(clip_key(video["id"], "clip_7_18")) is None
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(["-q", __file__]))
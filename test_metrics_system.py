@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test Metrics System
+Verifies histogram quantiles, data file read accounting and the /metrics endpoint
+"""
+
+import json
+import os
+
+import pytest
+from flask import Flask
+
+import metrics_system
+from data_store import load_json
+from metrics_system import Histogram, MetricsRegistry, metrics
+
+def test_histogram_quantiles():
+    histogram = Histogram(buckets=(1.0, 2.0, 4.0))
+    assert histogram.quantile(0.5) == 0.0
+
+    for value in (0.5, 1.5, 1.5, 3.0):
+        histogram.observe(value)
+    assert histogram.count == 4
+    assert histogram.sum == 6.5
+    assert histogram.counts == [1, 2, 1, 0]
+    assert histogram.quantile(0.5) == 1.5
+    assert histogram.quantile(0.99) == pytest.approx(3.92)
+
+    # Values past the last bound are reported at that bound
+    histogram.observe(100.0)
+    assert histogram.quantile(1.0) == 4.0
+
+    registry = MetricsRegistry()
+    registry.observe("latency", 0.5, route="/a")
+    registry.inc("hits", route="/a")
+    registry.inc("hits", 2, route="/a")
+    text = registry.render_prometheus()
+    assert 'hits{route="/a"} 3' in text
+    assert 'latency_count{route="/a"} 1' in text
+    assert registry.get_quantiles("latency")[0]["count"] == 1
+
+def test_load_json_counts_bytes(workdir):
+    metrics.reset()
+    path = os.path.join(workdir, "coaches.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"c@example.com": {"name": "Zoë Müller"}}, f, ensure_ascii=False)
+
+    assert load_json(path)["c@example.com"]["name"] == "Zoë Müller"
+    assert load_json(os.path.join(workdir, "missing.json")) == {}
+
+    text = metrics.render_prometheus()
+    assert 'pickleball_file_reads_total{file="coaches.json"} 1' in text
+    assert (f'pickleball_file_bytes_parsed_total{{file="coaches.json"}} '
+            f'{os.path.getsize(path)}') in text
+    assert 'file="missing.json"' not in text
+
+def test_metrics_endpoint_counts_failed_requests():
+    metrics.reset()
+    app = Flask(__name__)
+
+    @app.route('/ok')
+    def ok():
+        return "ok"
+
+    @app.route('/boom')
+    def boom():
+        raise RuntimeError("boom")
+
+    metrics_system.init_app(app, "test_app")
+    client = app.test_client()
+    assert client.get('/ok').status_code == 200
+    assert client.get('/boom').status_code == 500
+    # Propagated exceptions skip after_request handlers but are still counted
+    app.testing = True
+    with pytest.raises(RuntimeError):
+        client.get('/boom')
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+    assert ('pickleball_http_requests_total{app="test_app",method="GET",'
+            'route="/ok",status="200"} 1') in text
+    assert ('pickleball_http_requests_total{app="test_app",method="GET",'
+            'route="/boom",status="500"} 2') in text
+    assert ('pickleball_http_request_duration_seconds_count{app="test_app",'
+            'method="GET",route="/boom"} 2') in text
+    # Scrapes are not themselves recorded
+    assert 'route="/metrics"' not in text
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(["-q", __file__]))
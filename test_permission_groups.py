@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test Permission Groups
+Verifies group and collection grants, their materialized effective permissions and expiry
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from video_permission_system import VideoPermissionSystem
+
+def test_group_grants_cover_members_and_collection(workdir):
+    video_permissions = VideoPermissionSystem()
+    video_ids = [video_permissions.upload_video(f"student{i % 7}@example.com", f"rally{i}.mp4")["video_id"]
+                 for i in range(60)]
+    staff = ["ace@example.com", "bo@example.com"]
+
+    group = video_permissions.create_group("Club Staff", "team", staff)["group"]
+    collection = video_permissions.create_collection("Club Library", video_ids[:50])["collection"]
+    rows_before = len(video_permissions._load_data(video_permissions.permissions_file)["permissions"])
+
+    # One stored grant covers every member and video
+    grant = video_permissions.grant_group_access(group["id"], collection["id"], ["read", "annotate"])["grant"]
+    stored = video_permissions._load_data(video_permissions.permissions_file)
+    assert len(stored["permissions"]) == rows_before and len(stored["group_grants"]) == 1
+    assert all(video_permissions.check_permissions(v, email, "annotate")
+               for v in video_ids[:50] for email in staff)
+    assert not video_permissions.check_permissions(video_ids[0], "ace@example.com", "edit")
+    assert not video_permissions.check_permissions(video_ids[55], "ace@example.com", "read")
+    assert "ace@example.com" in video_permissions.permission_index.holders(video_ids[0], "read")
+    assert not video_permissions.grant_group_access(group["id"], collection["id"], ["delete"])["success"]
+
+    # Direct grants combine with group grants
+    video_permissions.assign_coach_permissions(video_ids[0], "ace@example.com", "req_1")
+    assert video_permissions.get_user_permissions(video_ids[0], "ace@example.com") == ["read", "edit", "annotate"]
+
+    # Membership and collection changes apply without touching the grant
+    video_permissions.update_group_members(group["id"], add=["cy@example.com"], remove=["bo@example.com"])
+    video_permissions.add_to_collection(collection["id"], video_ids[50:])
+    assert video_permissions.check_permissions(video_ids[55], "cy@example.com", "read")
+    assert not video_permissions.check_permissions(video_ids[1], "bo@example.com", "read")
+
+    assert video_permissions.revoke_group_access(grant["id"])["success"]
+    assert not video_permissions.check_permissions(video_ids[1], "cy@example.com", "read")
+
+    # Expired group grants stop applying and are purged from the heap
+    video_permissions.grant_group_access(group["id"], collection["id"], ["read"],
+                                         expires_at=datetime.now() - timedelta(seconds=1))
+    assert not video_permissions.check_permissions(video_ids[1], "cy@example.com", "read")
+    assert video_permissions.expire_permissions() == 1
+    assert video_permissions._load_data(video_permissions.permissions_file)["group_grants"] == []
+
+def test_writes_refresh_the_index_incrementally(workdir):
+    video_permissions = VideoPermissionSystem()
+    index = video_permissions.permission_index
+    video_ids = [video_permissions.upload_video("student@example.com", f"rally{i}.mp4")["video_id"]
+                 for i in range(5)]
+    group = video_permissions.create_group("Club Staff", "team", ["ace@example.com"])["group"]
+    collection = video_permissions.create_collection("Club Library", video_ids[:3])["collection"]
+    video_permissions.grant_group_access(group["id"], collection["id"], ["read"])
+    assert index.candidate_videos("ace@example.com") == set(video_ids[:3])
+    group_layer, direct_layer = index._group, index._direct
+
+    # Uploads only append owner rows: neither the group expansion nor the direct grants are rebuilt
+    uploaded = video_permissions.upload_video("student@example.com", "late.mp4")["video_id"]
+    assert "delete" in index.permissions(uploaded, "student@example.com")
+    assert index._group is group_layer and index._direct is direct_layer
+    assert index.user_rows("student@example.com") == list(range(6))
+
+    # A time-boxed grant is appended too, and its expiry joins the heap
+    video_permissions.assign_coach_permissions(video_ids[4], "ace@example.com", "req_1")
+    assert index._direct is direct_layer and index.next_expiry() is not None
+    assert [v["id"] for v in video_permissions.get_user_videos("ace@example.com")] == \
+        video_ids[:3] + [video_ids[4]]
+
+    # Replacing a row rebuilds the direct grants only; changing a group rebuilds only the expansion
+    video_permissions.grant_many([{"video_id": video_ids[4], "user_email": "ace@example.com",
+                                   "permissions": ["read"]}])
+    assert index.permissions(video_ids[4], "ace@example.com") == ["read"]
+    assert index._direct is not direct_layer and index._group is group_layer
+    video_permissions.update_group_members(group["id"], remove=["ace@example.com"])
+    assert index.candidate_videos("ace@example.com") == {video_ids[4]}
+    assert index._group is not group_layer
+    assert [v["id"] for v in video_permissions.get_user_videos("ace@example.com")] == [video_ids[4]]
+    assert video_permissions.get_user_videos("nobody@example.com") == []
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(["-q", __file__]))
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Test Permission Index
+Verifies time-boxed and scoped coach grants, cached checks and expiry from the heap
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from video_permission_system import VideoPermissionSystem
+
+def test_grant_expiry_and_scope(workdir):
+    video_permissions = VideoPermissionSystem()
+    video_id = video_permissions.upload_video("student@example.com", "match.mp4")["video_id"]
+
+    # Default coach grants are time-boxed
+    result = video_permissions.assign_coach_permissions(video_id, "coach@example.com", "req_1")
+    assert datetime.fromisoformat(result["expires_at"]) > datetime.now() + timedelta(days=29)
+    assert video_permissions.check_permissions(video_id, "coach@example.com", "edit")
+
+    # Annotation-only access to the first minute of the video
+    video_permissions.assign_coach_permissions(
+        video_id, "helper@example.com", "req_2",
+        scope={"annotations_only": True, "start_seconds": 0, "end_seconds": 60})
+    assert video_permissions.get_user_permissions(video_id, "helper@example.com") == ["read", "annotate"]
+    assert not video_permissions.check_permissions(video_id, "helper@example.com", "edit")
+    assert not video_permissions.update_video_analysis(video_id, {}, "helper@example.com")["success"]
+    assert video_permissions.add_video_annotations(
+        video_id, [{"text": "good split step", "timestamp": 12}], "helper@example.com")["success"]
+    assert not video_permissions.add_video_annotations(
+        video_id, [{"text": "late", "timestamp": 90}], "helper@example.com")["success"]
+    # Positions that cannot be checked against the scope are refused, not waved through
+    for timestamp in ("3600abc", None, "nan"):
+        assert not video_permissions.add_video_annotations(
+            video_id, [{"text": "where?", "timestamp": timestamp}], "helper@example.com")["success"]
+    assert video_permissions.add_video_annotations(
+        video_id, [{"text": "overall", "timestamp": None}], "coach@example.com")["success"]
+    bulk = video_permissions.add_video_annotations_bulk(
+        video_id, [{"text": "a", "timestamp": 5}, {"text": "b", "timestamp": 61}, {"text": "c"}],
+        "helper@example.com", allow_partial=True)
+    assert bulk["annotations_added"] == 1 and bulk["rejected_count"] == 2
+    assert not video_permissions.assign_coach_permissions(
+        video_id, "helper@example.com", "req_2", scope={"start_seconds": 30, "end_seconds": 10})["success"]
+
+    # A lapsed grant stops working at once and is removed from the file on the next write
+    video_permissions.assign_coach_permissions(
+        video_id, "short@example.com", "req_3", expires_at=datetime.now() - timedelta(seconds=1))
+    assert not video_permissions.check_permissions(video_id, "short@example.com", "read")
+    assert "short@example.com" not in video_permissions.permission_index.holders(video_id, "read")
+    assert video_permissions.expire_permissions() == 1
+    assert video_permissions.expire_permissions() == 0
+    emails = {p["user_email"] for p in
+              video_permissions._load_data(video_permissions.permissions_file)["permissions"]}
+    assert emails == {"student@example.com", "coach@example.com", "helper@example.com"}
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(["-q", __file__]))
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Test Request Scheduler
+Verifies capacity limits, least-loaded rerouting and priority order of the overflow queue
+"""
+
+import pytest
+
+from data_store import atomic_write_json
+from metrics_system import metrics
+
+def test_capacity_routing_and_overflow_queue(workdir):
+    from coach_notification_system import CoachNotificationSystem
+
+    system = CoachNotificationSystem()
+    system._send_email = lambda *args, **kwargs: True
+    atomic_write_json(system.coaches_file, {"coaches": [
+        {"email": "ace@example.com", "name": "Ace", "specialization": "Serves",
+         "hourly_rate": 50, "status": "active", "max_pending": 1},
+        {"email": "bo@example.com", "name": "Bo", "specialization": "Serves and returns",
+         "hourly_rate": 50, "status": "active", "max_pending": 2},
+        {"email": "cy@example.com", "name": "Cy", "specialization": "Dinks",
+         "hourly_rate": 50, "status": "active"}
+    ]})
+
+    def submit(**kwargs):
+        return system.process_annotation_request(
+            "student@example.com", "Student", "ace@example.com", "match.mp4", **kwargs)
+
+    first = submit()
+    assert first["assigned_coach_email"] == "ace@example.com"
+
+    # Ace is full: a plain request waits, an opted-in one goes to the least-loaded similar coach
+    waiting = submit()
+    assert waiting["queued"]
+    rerouted = submit(auto_assign=True)
+    assert rerouted["assigned_coach_email"] == "bo@example.com"
+    assert rerouted["rerouted"]
+    urgent = submit(priority="urgent")
+    assert urgent["queued"]
+    assert system.scheduler.queue_depth() == 2
+    assert not submit(priority="asap")["success"]
+
+    # Freeing Ace's slot hands over the urgent request first, with video access
+    system.update_request_status(first["request_id"], "declined")
+    requests = {r["id"]: r for r in system._load_data(system.requests_file)["requests"]}
+    assert requests[urgent["request_id"]]["status"] == "pending"
+    assert requests[urgent["request_id"]]["coach_email"] == "ace@example.com"
+    assert requests[waiting["request_id"]]["status"] == "queued"
+    assert system.video_permissions.check_permissions(urgent["video_id"], "ace@example.com", "edit")
+    assert system.scheduler.queue_depth() == 1
+    assert 'pickleball_request_queue_depth{priority="normal"} 1' in metrics.render_prometheus()
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(["-q", __file__]))
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test SLA Timer
+Verifies reminders, escalation to the root console and expiry or reassignment of unanswered requests
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from data_store import atomic_write_json
+from event_stream import REQUEST_CREATED
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+def test_reminder_escalation_and_expiry(console):
+    from coach_notification_system import CoachNotificationSystem
+
+    system = CoachNotificationSystem()
+    sent = []
+    system._send_email = lambda to_email, to_name, subject, **kwargs: sent.append((to_email, subject)) or True
+    atomic_write_json(system.coaches_file, {"coaches": [
+        {"email": "ace@example.com", "name": "Ace", "specialization": "Serves",
+         "hourly_rate": 50, "status": "active"},
+        {"email": "bo@example.com", "name": "Bo", "specialization": "Serves and returns",
+         "hourly_rate": 40, "status": "active"}
+    ]})
+
+    def submit(**kwargs):
+        return system.process_annotation_request(
+            "student@example.com", "Student", "ace@example.com", "match.mp4", **kwargs)["request_id"]
+
+    flexible = submit(auto_assign=True)
+    strict = submit()
+    answered = submit()
+    system.update_request_status(answered, "accepted")
+
+    timer = system.sla_timer
+    timer.sla_hours = {"reminder": 1, "escalate": 2, "expire": 3}
+    timer.load()
+    assert set(timer._armed) == {flexible, strict}
+    now = datetime.now()
+
+    # Each step fires once, in order, and only for requests still pending
+    assert timer.fire_due(now + timedelta(minutes=30)) == 0
+    sent.clear()
+    assert timer.fire_due(now + timedelta(hours=1.5)) == 2
+    assert [subject.startswith("Reminder") for _, subject in sent] == [True, True]
+    assert not system.send_request_reminder(answered)
+
+    assert timer.fire_due(now + timedelta(hours=2.5)) == 2
+    escalations = console.get_escalations("open")
+    assert {e["request_id"] for e in escalations} == {flexible, strict}
+
+    # Expiry reassigns the request that allows it and expires the other
+    assert timer.fire_due(now + timedelta(hours=3.5)) == 2
+    requests = {r["id"]: r for r in system._load_data(system.requests_file)["requests"]}
+    assert requests[flexible]["coach_email"] == "bo@example.com"
+    assert requests[flexible]["reassigned_from"] == "ace@example.com"
+    assert requests[flexible]["status"] == "pending"
+    assert requests[strict]["status"] == "expired"
+    assert system.video_permissions.check_permissions(
+        requests[flexible]["video_id"], "bo@example.com", "edit")
+    assert not system.video_permissions.check_permissions(
+        requests[flexible]["video_id"], "ace@example.com", "read")
+    # The expired request's coach loses access too
+    assert not system.video_permissions.check_permissions(
+        requests[strict]["video_id"], "ace@example.com", "read")
+    assert system.video_permissions.check_permissions(
+        requests[strict]["video_id"], "student@example.com", "delete")
+    assert system.scheduler.coach_index.pending_count("ace@example.com") == 0
+    assert system.scheduler.coach_index.pending_count("bo@example.com") == 1
+
+    # The reassignment event restarts the clock for the new coach; an answer disarms it
+    assert wait_for(lambda: flexible in timer._armed)
+    assert timer.fire_due(now + timedelta(minutes=30)) == 0
+    system.update_request_status(flexible, "accepted")
+    assert wait_for(lambda: not timer._armed)
+
+    result = console.resolve_escalation(escalations[0]["id"], "Spoke to the coach")
+    assert result["success"]
+    assert len(console.get_escalations("open")) == 1
+
+def test_failed_action_is_retried_with_backoff(workdir):
+    from sla_timer import RETRY_BACKOFF_SECONDS, SlaTimer
+
+    class FlakyHandler:
+        def __init__(self):
+            self.calls = 0
+
+        def send_request_reminder(self, request_id):
+            self.calls += 1
+            if self.calls <= 2:
+                raise OSError("mail server down")
+            return True
+
+        escalate_request = expire_request = send_request_reminder
+
+    handler = FlakyHandler()
+    timer = SlaTimer("requests.json", handler, sla_hours={"reminder": 1, "escalate": 2, "expire": 3})
+    timer._loaded = True
+    created = datetime.now()
+    timer.apply_event({"type": REQUEST_CREATED, "data": {"id": "req_1", "status": "pending",
+                                                         "created_at": created.isoformat()}})
+
+    # The first failure retries after the base delay, the second after twice that
+    due = created + timedelta(hours=1)
+    assert timer.fire_due(due) == 1 and "req_1" in timer._armed
+    assert timer.fire_due(due + timedelta(seconds=RETRY_BACKOFF_SECONDS - 1)) == 0
+    retry = due + timedelta(seconds=RETRY_BACKOFF_SECONDS)
+    assert timer.fire_due(retry) == 1 and "req_1" in timer._armed
+    assert timer.fire_due(retry + timedelta(seconds=2 * RETRY_BACKOFF_SECONDS - 1)) == 0
+    assert timer.fire_due(retry + timedelta(seconds=2 * RETRY_BACKOFF_SECONDS)) == 1
+    assert handler.calls == 3 and timer._heap[0][3] == "escalate" and not timer._failures
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(["-q", __file__]))
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Test Storage Quota
+Verifies bucket placement, quota enforcement before copying and usage counters
+"""
+
+import os
+
+import pytest
+
+from data_store import atomic_write_json
+from storage_quota import BYTES_PER_GB
+from video_gc import VideoGarbageCollector
+from video_permission_system import VideoPermissionSystem
+
+def test_uploads_are_placed_and_limited(workdir):
+    video_permissions = VideoPermissionSystem()
+    # Buckets from before accounting only have used_gb
+    atomic_write_json(video_permissions.storage_file, {"buckets": [
+        {"name": "main", "purpose": "videos", "size_gb": 1, "used_gb": 0.5, "status": "active"},
+        {"name": "overflow", "purpose": "videos", "size_gb": 1, "used_gb": 0, "status": "active"},
+        {"name": "retired", "purpose": "videos", "size_gb": 100, "used_gb": 0, "status": "inactive"}
+    ]})
+    with open("small.mp4", "wb") as f:
+        f.write(b"\0" * 1000)
+
+    # The bucket with the most room takes the upload and its counters move at once
+    first = video_permissions.upload_video("student@example.com", "a.mp4", "small.mp4")
+    assert first["video"]["bucket"] == "overflow" and first["video"]["size_bytes"] == 1000
+    usage = video_permissions.quota.usage()
+    overflow = next(b for b in usage["buckets"] if b["name"] == "overflow")
+    assert overflow["video_count"] == 1 and usage["total"]["video_count"] == 1
+    assert usage["total"]["size_gb"] == 102
+
+    # An upload that fits nowhere is refused before any bytes are copied
+    with open("huge.mp4", "wb") as f:
+        f.truncate(BYTES_PER_GB)
+    refused = video_permissions.upload_video("student@example.com", "b.mp4", "huge.mp4")
+    assert not refused["success"] and "quota" in refused["error"]
+    assert len(os.listdir(video_permissions.videos_dir)) == 1
+    assert video_permissions.quota.usage()["total"]["video_count"] == 1
+
+    # Deleting and collecting gives the space back
+    video_permissions.delete_video(first["video_id"], "student@example.com")
+    VideoGarbageCollector(video_permissions).collect()
+    stored = video_permissions._load_data(video_permissions.storage_file)["buckets"]
+    assert stored[1]["used_bytes"] == 0 and stored[1]["video_count"] == 0
+    assert stored[0]["used_bytes"] == BYTES_PER_GB // 2
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(["-q", __file__]))
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test Storage Tiering
+Verifies that idle videos move to a compressed archive bucket and are recalled when streamed
+"""
+
+import gzip
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from data_store import atomic_write_json
+
+def test_archive_and_recall_on_stream(workdir, dashboard):
+    from coach_dashboard import app
+    video_permissions = dashboard.video_permissions
+    atomic_write_json(video_permissions.storage_file, {"buckets": [
+        {"name": "hot", "size_gb": 1, "used_gb": 0, "status": "active"},
+        {"name": "cold", "size_gb": 1, "used_gb": 0, "status": "active", "tier": "archive",
+         "path": os.path.join(workdir, "archive")}
+    ]})
+    content = b"rally " * 20000
+    with open("match.mp4", "wb") as f:
+        f.write(content)
+
+    idle = video_permissions.upload_video("student@example.com", "idle.mp4", "match.mp4")["video"]
+    recent = video_permissions.upload_video("student@example.com", "recent.mp4", "match.mp4")["video"]
+    video_permissions.assign_coach_permissions(idle["id"], "coach@example.com", "req_1")
+    tiering = dashboard.tiering
+    tiering.access_log.touch(recent["id"], datetime.now() + timedelta(days=89))
+
+    # A record that changes while its copy is being compressed stays hot, and the reservation is refunded
+    iter_range = video_permissions.blobs.iter_range
+    def edit_during_compression(key, *args, **kwargs):
+        video_permissions.add_video_annotations(idle["id"], [{"text": "Deep serve", "timestamp": 3}],
+                                                "coach@example.com")
+        return iter_range(key, *args, **kwargs)
+    video_permissions.blobs.iter_range = edit_during_compression
+    assert tiering.archive_cold(now=datetime.now() + timedelta(days=91))["archived"] == 0
+    video_permissions.blobs.iter_range = iter_range
+    assert video_permissions.get_video(idle["id"]).get("tier") != "archive" and os.path.exists(idle["local_path"])
+    assert os.listdir(os.path.join(workdir, "archive")) == []
+    cold = video_permissions._load_data(video_permissions.storage_file)["buckets"][1]
+    assert cold["used_bytes"] == 0 and cold["video_count"] == 0
+
+    # Only the video nobody opened for 90 days moves, compressed, to the archive bucket
+    result = tiering.archive_cold(now=datetime.now() + timedelta(days=91))
+    assert result["video_ids"] == [idle["id"]]
+    archived = video_permissions._load_data(video_permissions.videos_file)["videos"][0]
+    assert archived["tier"] == "archive" and archived["bucket"] == "cold"
+    assert not os.path.exists(idle["local_path"]) and os.path.exists(recent["local_path"])
+    with gzip.open(archived["archive_path"]) as f:
+        assert f.read() == content
+    buckets = {b["name"]: b for b in video_permissions.quota.usage()["buckets"]}
+    assert buckets["hot"]["video_count"] == 1 and buckets["cold"]["video_count"] == 1
+    stored = video_permissions._load_data(video_permissions.storage_file)["buckets"]
+    assert stored[1]["used_bytes"] == archived["stored_bytes"] < len(content)
+
+    # Streaming recalls it transparently; range requests work
+    client = app.test_client()
+    assert client.get(f"/videos/{idle['id']}/stream").status_code == 401
+    with client.session_transaction() as session:
+        session['coach_email'] = "coach@example.com"
+    assert client.get(f"/videos/{recent['id']}/stream").status_code == 403
+    response = client.get(f"/videos/{idle['id']}/stream", headers={"Range": "bytes=0-9"})
+    assert response.status_code == 206 and response.data == content[:10]
+    response.close()
+    recalled = video_permissions.get_video(idle["id"])
+    assert recalled["tier"] == "hot" and recalled["bucket"] == "hot"
+    assert not os.path.exists(archived["archive_path"])
+    stored = video_permissions._load_data(video_permissions.storage_file)["buckets"]
+    assert stored[0]["used_bytes"] == 2 * len(content) and stored[1]["used_bytes"] == 0
+
+    # The stream recorded the access, which keeps the video hot for another 90 days
+    assert idle["id"] in tiering.access_log.last_accessed()
+    assert tiering.archive_cold(now=datetime.now() + timedelta(days=89))["archived"] == 0
+
+def test_recall_failure_and_full_hot_tier(workdir, dashboard):
+    video_permissions = dashboard.video_permissions
+    atomic_write_json(video_permissions.storage_file, {"buckets": [
+        {"name": "hot", "size_gb": 1, "used_gb": 0, "status": "active"},
+        {"name": "cold", "size_gb": 1, "used_gb": 0, "status": "active", "tier": "archive",
+         "path": os.path.join(workdir, "archive")}
+    ]})
+    content = b"dink " * 20000
+    with open("match.mp4", "wb") as f:
+        f.write(content)
+    video = video_permissions.upload_video("student@example.com", "idle.mp4", "match.mp4")["video"]
+    tiering = dashboard.tiering
+    assert tiering.archive_cold(now=datetime.now() + timedelta(days=91))["archived"] == 1
+
+    def hot_used():
+        return video_permissions._load_data(video_permissions.storage_file)["buckets"][0]["used_bytes"]
+
+    # A failed upload to the blob store gives the hot reservation back and leaves the archive in place
+    put_file = video_permissions.blobs.put_file
+    def failing_put(*args, **kwargs):
+        raise OSError("disk full")
+    video_permissions.blobs.put_file = failing_put
+    recalled, error = tiering.recall(video["id"])
+    video_permissions.blobs.put_file = put_file
+    assert recalled is None and error
+    assert hot_used() == 0
+    archived = video_permissions.get_video(video["id"])
+    assert archived["tier"] == "archive" and os.path.exists(archived["archive_path"])
+    assert not [name for name in os.listdir(os.path.join(workdir, "archive")) if name.endswith(".recall")]
+
+    # A full hot tier is charged anyway instead of losing track of the bytes
+    data = video_permissions._load_data(video_permissions.storage_file)
+    data["buckets"][0]["used_bytes"] = 1024 ** 3 - 10
+    atomic_write_json(video_permissions.storage_file, data)
+    recalled, error = tiering.recall(video["id"])
+    assert error is None and recalled["tier"] == "hot" and recalled["bucket"] == "hot"
+    assert hot_used() == 1024 ** 3 - 10 + len(content)
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(["-q", __file__]))
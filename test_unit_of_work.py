@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test Unit of Work
+Verifies all-or-nothing request submission, idempotent retries and journal recovery
+"""
+
+import json
+import os
+import tempfile
+
+import pytest
+
+from data_store import UnitOfWork, atomic_write_json, collection_version, recover_journal
+
+def test_submission_is_atomic_and_idempotent(workdir):
+    from coach_notification_system import CoachNotificationSystem
+
+    system = CoachNotificationSystem()
+    sent = []
+    system._send_email = lambda to_email, *args, **kwargs: sent.append(to_email) or True
+    atomic_write_json(system.coaches_file, {"coaches": [
+        {"email": "ace@example.com", "name": "Ace", "specialization": "Serves",
+         "hourly_rate": 50, "status": "active"}
+    ]})
+    videos = system.video_permissions
+
+    def counts():
+        return (len(system._load_data(system.requests_file)["requests"]),
+                len(system._load_data(videos.videos_file)["videos"]),
+                len(system._load_data(videos.permissions_file)["permissions"]))
+
+    def submit(key, message=""):
+        return system.process_annotation_request(
+            "student@example.com", "Student", "ace@example.com", "match.mp4",
+            message=message, idempotency_key=key)
+
+    first = submit("retry-1")
+    assert first["success"] and first["notification_sent"]
+    assert counts() == (1, 1, 2)
+
+    # A retry returns the stored result and writes nothing, sends nothing
+    sent.clear()
+    retry = submit("retry-1")
+    assert retry["replayed"] and retry["request_id"] == first["request_id"]
+    assert counts() == (1, 1, 2) and not sent
+    assert not submit("retry-1", message="different")["success"]
+
+    # A failure after the video is staged leaves no orphan video or permission
+    def fail(*args, **kwargs):
+        raise RuntimeError("disk full")
+    system.video_permissions.assign_coach_permissions = fail
+    with pytest.raises(RuntimeError):
+        submit("retry-2")
+    assert counts() == (1, 1, 2)
+    assert "student@example.com:retry-2" not in system._load_data(system.idempotency_file)["keys"]
+
+def test_journal_rolls_forward_after_crash():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        a, b = os.path.join(tmp_dir, "a.json"), os.path.join(tmp_dir, "b.json")
+        journal = os.path.join(tmp_dir, "journal.json")
+        atomic_write_json(a, {"value": 1})
+        atomic_write_json(b, {"value": 1})
+
+        # Abandoned units of work write nothing
+        with UnitOfWork(journal, [a, b]) as uow:
+            uow.load(a)["value"] = 2
+        assert UnitOfWork(journal, [a]).loader(a) == {"value": 1}
+
+        # A process that died after its journal write is finished by the next one
+        atomic_write_json(journal, {"files": {a: {"value": 3}, b: {"value": 3}}})
+        recover_journal(journal)
+        assert not os.path.exists(journal)
+        with UnitOfWork(journal, [a, b]) as uow:
+            assert uow.load(a) == uow.load(b) == {"value": 3}
+
+def test_commit_journals_only_changed_files(tmp_path, monkeypatch):
+    import data_store
+
+    a, b, journal = (str(tmp_path / name) for name in ("a.json", "b.json", "journal.json"))
+    atomic_write_json(a, {"value": 1})
+    atomic_write_json(b, {"value": 1})
+    unchanged = collection_version(b)
+
+    journals, synced = [], []
+    write_text, fsync = data_store._write_text, os.fsync
+    def record_journal(file_path, text, durable=False):
+        if file_path == journal:
+            journals.append(json.loads(text))
+        write_text(file_path, text, durable)
+    monkeypatch.setattr(data_store, "_write_text", record_journal)
+    monkeypatch.setattr(os, "fsync", lambda fd: synced.append(fd) or fsync(fd))
+
+    with UnitOfWork(journal, [a, b]) as uow:
+        uow.load(a)["value"] = 2
+        assert uow.load(b) == {"value": 1}
+        uow.commit()
+    assert journals == [{"files": {a: {"value": 2}}}]
+    assert collection_version(b) == unchanged and not os.path.exists(journal)
+    # Journal and file contents plus their directory entries
+    assert len(synced) == 4
+
+    # Nothing changed: no journal, no writes
+    with UnitOfWork(journal, [a, b]) as uow:
+        uow.load(a)
+        uow.commit()
+    assert len(journals) == 1
+
+def test_startup_recovers_journal_before_reading(workdir):
+    from video_permission_system import VideoPermissionSystem
+
+    os.makedirs("data")
+    grant = {"video_id": "vid_1", "user_email": "coach@example.com", "permissions": ["read"]}
+    atomic_write_json(os.path.join("data", "write_journal.json"), {"files": {
+        os.path.join("data", "video_permissions.json"): {"permissions": [grant]}}})
+
+    # The permission index is built from the rolled-forward files
+    videos = VideoPermissionSystem()
+    assert not os.path.exists(videos.journal_file)
+    assert videos.check_permissions("vid_1", "coach@example.com", "read")
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(["-q", __file__]))
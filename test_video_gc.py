@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Test Video GC
+Verifies that deleted videos are hidden at once and purged in batches, reclaiming files and bucket space
+"""
+
+import os
+
+import pytest
+
+from data_store import atomic_write_json
+from storage_quota import BYTES_PER_GB
+from video_gc import VideoGarbageCollector
+from video_permission_system import VideoPermissionSystem
+
+def test_soft_delete_and_collect(workdir):
+    video_permissions = VideoPermissionSystem()
+    storage_file = os.path.join("data", "storage.json")
+    atomic_write_json(storage_file, {"buckets": [
+        {"name": "videos", "size_gb": 10, "used_gb": 1.0, "status": "active"}
+    ]})
+    with open("source.mp4", "wb") as f:
+        f.write(b"\0" * 4096)
+
+    video_ids = []
+    for i in range(5):
+        video_id = video_permissions.upload_video("student@example.com", f"rally{i}.mp4", "source.mp4")["video_id"]
+        video_permissions.assign_coach_permissions(video_id, "coach@example.com", "req_1")
+        video_ids.append(video_id)
+    collection = video_permissions.create_collection("Library", video_ids)["collection"]
+    paths = [video_permissions.get_video(v)["local_path"] for v in video_ids]
+    videos_version = os.stat(video_permissions.videos_file).st_mtime_ns
+
+    # Deleting only appends a tombstone, and the video disappears at once
+    assert not video_permissions.delete_video(video_ids[0], "coach@example.com")["success"]
+    for video_id in video_ids[:3]:
+        assert video_permissions.delete_video(video_id, "student@example.com")["success"]
+    assert os.stat(video_permissions.videos_file).st_mtime_ns == videos_version
+    assert video_permissions.get_video(video_ids[0]) is None
+    assert not video_permissions.check_permissions(video_ids[0], "student@example.com", "read")
+    assert len(video_permissions.get_user_videos("coach@example.com")) == 2
+    assert not video_permissions.delete_video(video_ids[0], "student@example.com")["success"]
+
+    # The collector purges records, grants, collection entries and files in batches
+    collector = VideoGarbageCollector(video_permissions, storage_file, batch_size=2)
+    result = collector.collect()
+    assert result["videos"] == 2 and result["permissions"] == 4 and result["remaining"] == 1
+    assert collector.collect_all() == 1
+    assert collector.collect()["videos"] == 0
+    assert not any(os.path.exists(path) for path in paths[:3]) and os.path.exists(paths[3])
+    stored = video_permissions._load_data(video_permissions.videos_file)["videos"]
+    assert [v["id"] for v in stored] == video_ids[3:]
+    rows = video_permissions._load_data(video_permissions.permissions_file)["permissions"]
+    assert {p["video_id"] for p in rows} == set(video_ids[3:])
+    groups = video_permissions._load_data(video_permissions.groups_file)
+    assert groups["collections"][0]["id"] == collection["id"]
+    assert groups["collections"][0]["video_ids"] == video_ids[3:]
+    bucket = video_permissions._load_data(storage_file)["buckets"][0]
+    assert bucket["used_bytes"] == BYTES_PER_GB + 2 * 4096 and bucket["video_count"] == 2
+    assert video_permissions.tombstones.entries() == []
+
+def test_collect_releases_space_exactly_once(workdir):
+    video_permissions = VideoPermissionSystem()
+    storage_file = video_permissions.storage_file
+    atomic_write_json(storage_file, {"buckets": [
+        {"name": "videos", "size_gb": 10, "used_gb": 0, "status": "active"}
+    ]})
+    with open("source.mp4", "wb") as f:
+        f.write(b"\0" * 4096)
+    video_ids = [video_permissions.upload_video("student@example.com", f"rally{i}.mp4", "source.mp4")["video_id"]
+                 for i in range(3)]
+    for video_id in video_ids:
+        video_permissions.delete_video(video_id, "student@example.com")
+    assert video_permissions.tombstones.entries()[0]["bucket"] == "videos"
+    assert video_permissions.tombstones.entries()[0]["bytes"] == 4096
+    collector = VideoGarbageCollector(video_permissions)
+
+    def used():
+        bucket = video_permissions._load_data(storage_file)["buckets"][0]
+        return bucket["used_bytes"], bucket["video_count"]
+
+    # A crash between the purge and the quota release: the next pass still releases the space
+    video_permissions.purge_videos([video_ids[0]])
+    assert used() == (3 * 4096, 3)
+
+    # A crash after the release but before the tombstones go: the next pass does not release it again
+    remove = video_permissions.tombstones.remove
+    video_permissions.tombstones.remove = lambda video_ids: (_ for _ in ()).throw(RuntimeError("crash"))
+    with pytest.raises(RuntimeError):
+        collector.collect()
+    video_permissions.tombstones.remove = remove
+    assert used() == (0, 0)
+    assert collector.collect()["videos"] == 0
+    assert used() == (0, 0)
+    assert video_permissions.tombstones.entries() == []
+    assert video_permissions._load_data(storage_file)["released_videos"] == []
+
+def test_failed_file_deletes_are_retried(workdir):
+    video_permissions = VideoPermissionSystem()
+    atomic_write_json(video_permissions.storage_file, {"buckets": [
+        {"name": "videos", "size_gb": 10, "used_gb": 0, "status": "active"}
+    ]})
+    with open("source.mp4", "wb") as f:
+        f.write(b"\0" * 4096)
+    video_ids = [video_permissions.upload_video("student@example.com", f"rally{i}.mp4", "source.mp4")["video_id"]
+                 for i in range(2)]
+    for video_id in video_ids:
+        video_permissions.delete_video(video_id, "student@example.com")
+
+    stuck = video_permissions.blob_key(video_permissions._load_data(video_permissions.videos_file)["videos"][0])
+    delete = video_permissions.blobs.delete
+    def failing_delete(key):
+        if key == stuck:
+            raise OSError("device busy")
+        return delete(key)
+    video_permissions.blobs.delete = failing_delete
+    collector = VideoGarbageCollector(video_permissions)
+    result = collector.collect()
+    assert result["videos"] == 1 and result["failed"] == 1 and result["remaining"] == 1
+    # The stuck video keeps its record and tombstone, and its bytes stay charged until its file is gone
+    assert [v["id"] for v in video_permissions._load_data(video_permissions.videos_file)["videos"]] == video_ids[:1]
+    bucket = video_permissions._load_data(video_permissions.storage_file)["buckets"][0]
+    assert bucket["used_bytes"] == 4096 and bucket["video_count"] == 1
+
+    video_permissions.blobs.delete = delete
+    assert collector.collect_all() == 1
+    bucket = video_permissions._load_data(video_permissions.storage_file)["buckets"][0]
+    assert bucket["used_bytes"] == 0 and bucket["video_count"] == 0
+    assert video_permissions.tombstones.entries() == []
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(["-q", __file__]))
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+PickleballAI Video Garbage Collector
+Append-only tombstones for deleted videos and a background collector that purges them in batches
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from data_store import file_lock
+from metrics_system import metrics
+from storage_quota import BucketQuota
+
+GC_INTERVAL_SECONDS = 300
+GC_BATCH_SIZE = 500
+
+metrics.describe("pickleball_video_tombstones", "Deleted videos waiting for garbage collection")
+metrics.describe("pickleball_videos_collected_total", "Deleted videos purged by the garbage collector")
+metrics.describe("pickleball_video_bytes_reclaimed_total", "Bytes of video files reclaimed by the garbage collector")
+
+logger = logging.getLogger(__name__)
+
+class TombstoneLog:
+    def __init__(self, log_file: str):
+        """JSON lines of {"video_id", "deleted_by", "deleted_at", "bucket", "bytes"}; deleting a video is one appended line"""
+        self.log_file = log_file
+        self._lock = threading.RLock()
+        self._version = None
+        self._inode = None
+        self._offset = 0
+        self._entries: Dict[str, Dict] = {}
+
+    def _ensure_current(self):
+        """One stat() per lookup; new lines are read from the last offset instead of re-reading the log"""
+        try:
+            st = os.stat(self.log_file)
+        except FileNotFoundError:
+            with self._lock:
+                self._entries, self._inode, self._offset, self._version = {}, None, 0, None
+            return
+        version = (st.st_ino, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            if version == self._version:
+                return
+            # Compaction swaps in a new file; start over
+            if st.st_ino != self._inode or st.st_size < self._offset:
+                self._entries, self._offset = {}, 0
+            with open(self.log_file, 'rb') as f:
+                f.seek(self._offset)
+                chunk = f.read()
+            # Only whole lines; a half-written append is picked up on the next lookup
+            end = chunk.rfind(b"\n") + 1
+            for line in chunk[:end].splitlines():
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries[entry["video_id"]] = entry
+            self._offset += end
+            self._inode = st.st_ino
+            self._version = version if end == len(chunk) else None
+
+    def append(self, video_id: str, deleted_by: str, bucket: Optional[str] = None, num_bytes: int = 0):
+        """Tombstone a video; bucket and num_bytes are what the collector gives back to the quota"""
+        line = json.dumps({"video_id": video_id, "deleted_by": deleted_by,
+                           "deleted_at": datetime.now().isoformat(), "bucket": bucket, "bytes": num_bytes})
+        with file_lock(self.log_file):
+            with open(self.log_file, 'a') as f:
+                f.write(line + "\n")
+        metrics.set_gauge("pickleball_video_tombstones", len(self.entries()))
+
+    def contains(self, video_id: str) -> bool:
+        self._ensure_current()
+        with self._lock:
+            return video_id in self._entries
+
+    def entries(self) -> List[Dict]:
+        """Tombstones in deletion order"""
+        self._ensure_current()
+        with self._lock:
+            return list(self._entries.values())
+
+    def remove(self, video_ids: Iterable[str]):
+        """Drop tombstones once their videos have been purged"""
+        collected = set(video_ids)
+        with file_lock(self.log_file):
+            self._ensure_current()
+            with self._lock:
+                kept = [entry for entry in self._entries.values() if entry["video_id"] not in collected]
+            temp_path = f"{self.log_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'w') as f:
+                f.writelines(json.dumps(entry) + "\n" for entry in kept)
+            os.replace(temp_path, self.log_file)
+        metrics.set_gauge("pickleball_video_tombstones", len(kept))
+
+class VideoGarbageCollector:
+    def __init__(self, video_permissions, storage_file: Optional[str] = None,
+                 interval_seconds: float = GC_INTERVAL_SECONDS, batch_size: int = GC_BATCH_SIZE):
+        """video_permissions is the VideoPermissionSystem whose tombstones are collected"""
+        self.video_permissions = video_permissions
+        self.quota = BucketQuota(storage_file) if storage_file else video_permissions.quota
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._thread = None
+        self._stop = threading.Event()
+
+    def collect(self) -> Dict:
+        """Purge one batch of deleted videos and give their space back to the buckets"""
+        pending = self.video_permissions.tombstones.entries()[:self.batch_size]
+        if not pending:
+            return {"videos": 0, "permissions": 0, "files": 0, "bytes_freed": 0, "failed": 0, "remaining": 0}
+
+        result = self.video_permissions.purge_videos(entry["video_id"] for entry in pending)
+        # Videos whose files could not be deleted keep their tombstones and are retried next pass
+        purged = set(result["purged"])
+        collected = [entry for entry in pending if entry["video_id"] in purged]
+        # The space comes from the tombstones, so a crash after the purge still releases it on the next pass;
+        # the quota file remembers what it released, so a crash before the tombstones go never releases it twice
+        self.quota.release_deleted(collected)
+        self.video_permissions.tombstones.remove(purged)
+        self.quota.forget_released(purged)
+
+        metrics.inc("pickleball_videos_collected_total", len(collected))
+        metrics.inc("pickleball_video_bytes_reclaimed_total", result["bytes_freed"])
+        logger.info(f"Video GC: purged {result['videos']} videos, {result['files']} files, "
+                    f"{result['bytes_freed']} bytes; {len(result['failed'])} to retry")
+        return {
+            "videos": result["videos"],
+            "permissions": result["permissions"],
+            "files": result["files"],
+            "bytes_freed": result["bytes_freed"],
+            "failed": len(result["failed"]),
+            "remaining": len(self.video_permissions.tombstones.entries())
+        }
+
+    def collect_all(self) -> int:
+        """Collect batches until no tombstones are left; returns the number of videos purged"""
+        purged = 0
+        while True:
+            result = self.collect()
+            purged += result["videos"]
+            if not result["remaining"] or not result["videos"]:
+                return purged
+
+    def start(self):
+        """Collect on a background thread every interval_seconds"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run_loop, name="video-gc", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.collect_all()
+            except Exception as e:
+                logger.error(f"Video GC failed: {e}")
+            self._stop.wait(self.interval_seconds)
+
+def main():
+    """Run the video garbage collector as its own worker process"""
+    from video_permission_system import VideoPermissionSystem
+
+    collector = VideoGarbageCollector(VideoPermissionSystem())
+    collector.start()
+    print(f"🗑️  Video GC running every {collector.interval_seconds}s; press Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        collector.stop()
+
+if __name__ == "__main__":
+    main()
@@ -5,18 +5,47 @@ Controls coach access to submitted videos with read-only and edit permissions
 """
 
 import json
+import math
 import os
-import shutil
-from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
 import logging
 
+from blob_store import get_blob_store
+from data_store import UnitOfWork, atomic_write_json, file_lock, load_json, recover_journal
+from event_stream import ANALYSIS_REQUESTED, ANNOTATIONS_ADDED, CLIPS_REQUESTED, VIDEO_UPLOADED, event_stream
+from id_allocator import new_id
+from media_pipeline import (CLIP_PADDING_SECONDS, MAX_CLIP_PADDING_SECONDS, analysis_key, clip_key, clip_window,
+                            hls_key, preview_key)
+from metrics_system import timed
+from permission_index import ANY_POSITION, PermissionIndex, expiry_key
+from storage_quota import BucketQuota
+from video_gc import TombstoneLog
+
+# Limits for bulk annotation ingest
+MAX_BULK_ANNOTATIONS = 50000
+MAX_ANNOTATION_TEXT = 5000
+MAX_REPORTED_ERRORS = 100
+MAX_EVENT_ANNOTATIONS = 20
+# Coach access lapses unless the grant is renewed
+DEFAULT_COACH_GRANT_DAYS = 30
+# Group grants never include delete, which stays with the video owner
+GROUP_PERMISSIONS = ("read", "annotate", "edit")
+MAX_BULK_PERMISSION_ITEMS = 10000
+
 class VideoPermissionSystem:
     def __init__(self):
         self.data_dir = "data"
         self.videos_dir = "videos"
         self.permissions_file = os.path.join(self.data_dir, "video_permissions.json")
         self.videos_file = os.path.join(self.data_dir, "videos.json")
+        self.groups_file = os.path.join(self.data_dir, "groups.json")
+        self.coaches_file = os.path.join(self.data_dir, "coaches.json")
+        self.tombstones_file = os.path.join(self.data_dir, "video_tombstones.jsonl")
+        self.storage_file = os.path.join(self.data_dir, "storage.json")
+        # Shared with the notification system's unit of work, which also writes videos and permissions
+        self.journal_file = os.path.join(self.data_dir, "write_journal.json")
         self.logs_dir = "logs"
         
         # Ensure directories exist
@@ -26,6 +55,21 @@ class VideoPermissionSystem:
         
         # Initialize data files
         self._init_data_files()
+        # Finish an interrupted unit of work before the permission index is built from these files
+        recover_journal(self.journal_file)
+        
+        # Video files live in a blob store (a local directory, or S3 shared by several nodes)
+        self.blobs = get_blob_store(self.videos_dir)
+        
+        # Uploads are charged to storage buckets before they are copied
+        self.quota = BucketQuota(self.storage_file)
+        
+        # Deleted videos stay on disk until video_gc collects them
+        self.tombstones = TombstoneLog(self.tombstones_file)
+        
+        # Cached grants for permission checks, with an expiry heap, blocked coaches and deleted videos
+        self.permission_index = PermissionIndex(self.permissions_file, self.groups_file, self.coaches_file,
+                                                self.tombstones)
         
         # Setup logging
         self._setup_logging()
@@ -34,7 +78,8 @@ class VideoPermissionSystem:
         """Initialize data files if they don't exist"""
         files_to_init = {
             self.permissions_file: {"permissions": []},
-            self.videos_file: {"videos": []}
+            self.videos_file: {"videos": []},
+            self.groups_file: {"groups": [], "collections": []}
         }
         
         for file_path, default_data in files_to_init.items():
@@ -59,23 +104,30 @@ class VideoPermissionSystem:
     
     def _load_data(self, file_path: str) -> Dict:
         """Load data from JSON file"""
-        try:
-            with open(file_path, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
+        return load_json(file_path)
     
     def _save_data(self, file_path: str, data: Dict):
         """Save data to JSON file"""
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        atomic_write_json(file_path, data)
+    
+    @contextmanager
+    def _edit_data(self, file_path: str, uow: Optional[UnitOfWork] = None):
+        """Yield a data file to modify; saved now, or by the unit of work's commit"""
+        if uow is not None:
+            yield uow.load(file_path)
+            return
+        with file_lock(file_path):
+            data = self._load_data(file_path)
+            yield data
+            self._save_data(file_path, data)
     
+    @timed
     def upload_video(self, student_email: str, video_filename: str, 
-                    original_path: str = None) -> Dict:
+                    original_path: str = None, uow: Optional[UnitOfWork] = None) -> Dict:
         """Upload and register a new video with student ownership"""
         
-        # Generate unique video ID
-        video_id = f"video_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{student_email.split('@')[0]}"
+        # Generate unique, time-sortable video ID
+        video_id = new_id("video")
         
         # Create video record
         video = {
@@ -91,70 +143,113 @@ class VideoPermissionSystem:
             "analysis_status": "pending"
         }
         
-        # If original file exists, copy it to videos directory
-        if original_path and os.path.exists(original_path):
-            video_path = os.path.join(self.videos_dir, f"{video_id}_{video_filename}")
+        # Place the video in a bucket before copying, so an upload over quota never writes a byte
+        has_file = bool(original_path) and os.path.exists(original_path)
+        size_bytes = os.path.getsize(original_path) if has_file else 0
+        bucket, error = self.quota.reserve(size_bytes)
+        if error:
+            self.logger.warning(f"Upload refused for {student_email}: {error}")
+            return {"success": False, "error": error}
+        release = lambda: self.quota.release({bucket: size_bytes}, {bucket: 1})
+        if bucket:
+            video["bucket"] = bucket
+            if uow is not None:
+                uow.on_abort(release)
+        
+        # If original file exists, store it in the blob store
+        if has_file:
+            blob_key = f"{video_id}_{video_filename}"
             try:
-                shutil.copy2(original_path, video_path)
-                video["size_bytes"] = os.path.getsize(video_path)
-                video["local_path"] = video_path
-                self.logger.info(f"Video copied: {original_path} -> {video_path}")
+                self.blobs.put_file(blob_key, original_path)
+                video["size_bytes"] = size_bytes
+                video["blob_key"] = blob_key
+                video["local_path"] = self.blobs.local_path(blob_key)
+                # Renditions for adaptive playback and scrubbing previews are produced by the media pipeline
+                video["transcode_status"] = "pending"
+                video["preview_status"] = "pending"
+                if uow is not None:
+                    uow.on_abort(lambda: self.blobs.delete(blob_key))
+                self.logger.info(f"Video stored: {original_path} -> {blob_key}")
             except Exception as e:
                 self.logger.error(f"Error copying video: {str(e)}")
+                if bucket and uow is None:
+                    release()
                 return {"success": False, "error": f"Failed to copy video: {str(e)}"}
         else:
             # Just register the video without copying (for demo purposes)
             video["local_path"] = f"demo_path/{video_filename}"
         
         # Save video record
-        data = self._load_data(self.videos_file)
-        data.setdefault("videos", []).append(video)
-        self._save_data(self.videos_file, data)
+        with self._edit_data(self.videos_file, uow) as data:
+            data.setdefault("videos", []).append(video)
         
         # Create initial permissions (student has full access)
-        self._create_permissions(video_id, student_email, ["read", "write", "delete"])
+        self._create_permissions(video_id, student_email, ["read", "write", "delete"], uow)
+        
+        if has_file:
+            uploaded = lambda: event_stream.publish(VIDEO_UPLOADED, [student_email], {"video_id": video_id})
+            if uow is not None:
+                uow.on_commit(uploaded)
+            else:
+                uploaded()
         
         self.logger.info(f"Video uploaded: {video_id} by {student_email}")
         return {"success": True, "video_id": video_id, "video": video}
     
-    def _create_permissions(self, video_id: str, user_email: str, permissions: List[str]):
+    def _create_permissions(self, video_id: str, user_email: str, permissions: List[str],
+                            uow: Optional[UnitOfWork] = None, expires_at: Optional[datetime] = None,
+                            scope: Optional[Dict] = None):
         """Create or update permissions for a user on a video"""
-        data = self._load_data(self.permissions_file)
-        
-        # Remove existing permissions for this user on this video
-        data["permissions"] = [
-            p for p in data.get("permissions", [])
-            if not (p["video_id"] == video_id and p["user_email"] == user_email)
-        ]
-        
-        # Add new permissions
-        permission = {
-            "video_id": video_id,
-            "user_email": user_email,
-            "permissions": permissions,
-            "granted_at": datetime.now().isoformat(),
-            "granted_by": "system"
-        }
-        
-        data.setdefault("permissions", []).append(permission)
-        self._save_data(self.permissions_file, data)
+        with self._edit_data(self.permissions_file, uow) as data:
+            # The file is being rewritten anyway, so lapsed grants are dropped with it
+            self._drop_expired(data)
+            
+            # Remove existing permissions for this user on this video
+            data["permissions"] = [
+                p for p in data.get("permissions", [])
+                if not (p["video_id"] == video_id and p["user_email"] == user_email)
+            ]
+            
+            # Add new permissions
+            permission = {
+                "video_id": video_id,
+                "user_email": user_email,
+                "permissions": permissions,
+                "granted_at": datetime.now().isoformat(),
+                "granted_by": "system",
+                "expires_at": expires_at.isoformat() if expires_at else None,
+                "scope": scope
+            }
+            
+            data.setdefault("permissions", []).append(permission)
         
         self.logger.info(f"Permissions created: {user_email} -> {video_id} ({permissions})")
     
     def assign_coach_permissions(self, video_id: str, coach_email: str, 
-                               request_id: str) -> Dict:
-        """Assign read and edit permissions to coach for a video"""
+                               request_id: str, uow: Optional[UnitOfWork] = None,
+                               expires_at: Optional[datetime] = None,
+                               scope: Optional[Dict] = None) -> Dict:
+        """Assign time-boxed read and edit permissions to coach for a video"""
+        # scope: "annotations_only" grants annotate instead of edit; "start_seconds"/"end_seconds"
+        # limit annotations to that part of the video
+        scope, error = self._validate_scope(scope)
+        if error:
+            return {"success": False, "error": error}
+        expires_at = expires_at or datetime.now() + timedelta(days=DEFAULT_COACH_GRANT_DAYS)
         
-        # Verify video exists
-        video = self.get_video(video_id)
+        # Verify video exists (within a unit of work it may not be saved yet)
+        if uow is not None:
+            video = next((v for v in uow.load(self.videos_file).get("videos", []) if v["id"] == video_id), None)
+        else:
+            video = self.get_video(video_id)
         if not video:
             return {"success": False, "error": "Video not found"}
         
-        # Coach gets read and edit permissions (no delete)
-        permissions = ["read", "edit"]
+        # Coach gets read and edit permissions (no delete), or read and annotate when scoped to annotations
+        permissions = ["read", "annotate"] if scope and scope.get("annotations_only") else ["read", "edit"]
         
         # Create coach permissions
-        self._create_permissions(video_id, coach_email, permissions)
+        self._create_permissions(video_id, coach_email, permissions, uow, expires_at, scope)
         
         # Log the permission assignment
         self.logger.info(f"Coach permissions assigned: {coach_email} -> {video_id} for request {request_id}")
@@ -164,35 +259,165 @@ class VideoPermissionSystem:
             "video_id": video_id,
             "coach_email": coach_email,
             "permissions": permissions,
-            "message": f"Coach {coach_email} can now read and edit video {video_id}"
+            "expires_at": expires_at.isoformat(),
+            "scope": scope,
+            "message": f"Coach {coach_email} can now {' and '.join(permissions)} video {video_id} until {expires_at:%Y-%m-%d %H:%M}"
         }
     
     def check_permissions(self, video_id: str, user_email: str, 
-                         required_permission: str) -> bool:
-        """Check if user has required permission on video"""
-        data = self._load_data(self.permissions_file)
-        
-        for permission in data.get("permissions", []):
-            if (permission["video_id"] == video_id and 
-                permission["user_email"] == user_email and
-                required_permission in permission["permissions"]):
-                return True
-        
-        return False
+                         required_permission: str, timestamp: Optional[float] = ANY_POSITION) -> bool:
+        """Check if user has required permission on video (at a position, for time-scoped grants)"""
+        return self.permission_index.allows(video_id, user_email, required_permission, timestamp)
     
     def get_user_permissions(self, video_id: str, user_email: str) -> List[str]:
         """Get all permissions for a user on a video"""
-        data = self._load_data(self.permissions_file)
+        return self.permission_index.permissions(video_id, user_email)
+    
+    def _drop_expired(self, data: Dict) -> int:
+        """Remove grants popped from the expiry heap; caller holds the permissions file"""
+        # Writers use the heap as last loaded rather than re-reading the file they are about to replace
+        expired = self.permission_index.pop_expired()
+        if not expired:
+            return 0
+        now = datetime.now()
+        removed = 0
+        for key in ("permissions", "group_grants"):
+            if key not in data:
+                continue
+            kept = [
+                grant for grant in data[key]
+                if expiry_key(grant) not in expired
+                or not grant.get("expires_at") or datetime.fromisoformat(grant["expires_at"]) > now
+            ]
+            removed += len(data[key]) - len(kept)
+            data[key] = kept
+        return removed
+    
+    @timed
+    def expire_permissions(self) -> int:
+        """Delete lapsed grants; only the front of the expiry heap is examined"""
+        next_expiry = self.permission_index.next_expiry()
+        if next_expiry is None or next_expiry > datetime.now():
+            return 0
+        with file_lock(self.permissions_file):
+            data = self._load_data(self.permissions_file)
+            removed = self._drop_expired(data)
+            if removed:
+                self._save_data(self.permissions_file, data)
+                self.logger.info(f"Expired {removed} video permission grants")
+        return removed
+    
+    @timed
+    def create_group(self, name: str, kind: str = "team", members: Iterable[str] = (),
+                     created_by: str = "system") -> Dict:
+        """Create a group of users (a club or coaching team) that can be granted access together"""
+        group = {
+            "id": new_id("grp"),
+            "name": name,
+            "kind": kind,
+            "members": sorted(set(members)),
+            "created_by": created_by,
+            "created_at": datetime.now().isoformat()
+        }
+        with self._edit_data(self.groups_file) as data:
+            data.setdefault("groups", []).append(group)
         
-        for permission in data.get("permissions", []):
-            if (permission["video_id"] == video_id and 
-                permission["user_email"] == user_email):
-                return permission["permissions"]
+        self.logger.info(f"Group created: {group['id']} ({name}, {len(group['members'])} members)")
+        return {"success": True, "group": group}
+    
+    @timed
+    def update_group_members(self, group_id: str, add: Iterable[str] = (), remove: Iterable[str] = ()) -> Dict:
+        """Add and remove group members in one write; their access follows immediately"""
+        with self._edit_data(self.groups_file) as data:
+            for group in data.get("groups", []):
+                if group["id"] == group_id:
+                    group["members"] = sorted((set(group["members"]) | set(add)) - set(remove))
+                    break
+            else:
+                return {"success": False, "error": "Group not found"}
         
-        return []
+        self.logger.info(f"Group members updated: {group_id} ({len(group['members'])} members)")
+        return {"success": True, "group": group}
     
+    @timed
+    def create_collection(self, name: str, video_ids: Iterable[str] = (), created_by: str = "system") -> Dict:
+        """Create a named set of videos (e.g. a club's library) for group grants"""
+        collection = {
+            "id": new_id("col"),
+            "name": name,
+            "video_ids": list(dict.fromkeys(video_ids)),
+            "created_by": created_by,
+            "created_at": datetime.now().isoformat()
+        }
+        with self._edit_data(self.groups_file) as data:
+            data.setdefault("collections", []).append(collection)
+        
+        self.logger.info(f"Collection created: {collection['id']} ({name}, {len(collection['video_ids'])} videos)")
+        return {"success": True, "collection": collection}
+    
+    @timed
+    def add_to_collection(self, collection_id: str, video_ids: Iterable[str]) -> Dict:
+        """Add videos to a collection in one write; existing group grants cover them at once"""
+        with self._edit_data(self.groups_file) as data:
+            for collection in data.get("collections", []):
+                if collection["id"] == collection_id:
+                    collection["video_ids"] = list(dict.fromkeys(collection["video_ids"] + list(video_ids)))
+                    break
+            else:
+                return {"success": False, "error": "Collection not found"}
+        
+        return {"success": True, "collection_id": collection_id, "video_count": len(collection["video_ids"])}
+    
+    @timed
+    def grant_group_access(self, group_id: str, collection_id: str,
+                           permissions: Iterable[str] = ("read", "edit"),
+                           expires_at: Optional[datetime] = None, scope: Optional[Dict] = None,
+                           granted_by: str = "system") -> Dict:
+        """Give every member of a group access to every video of a collection with one stored grant"""
+        permissions = list(permissions)
+        if not permissions or any(p not in GROUP_PERMISSIONS for p in permissions):
+            return {"success": False, "error": f"Group permissions must be among {', '.join(GROUP_PERMISSIONS)}"}
+        
+        groups = self._load_data(self.groups_file)
+        if not any(g["id"] == group_id for g in groups.get("groups", [])):
+            return {"success": False, "error": "Group not found"}
+        if not any(c["id"] == collection_id for c in groups.get("collections", [])):
+            return {"success": False, "error": "Collection not found"}
+        
+        grant = {
+            "id": new_id("grant"),
+            "group_id": group_id,
+            "collection_id": collection_id,
+            "permissions": permissions,
+            "granted_at": datetime.now().isoformat(),
+            "granted_by": granted_by,
+            "expires_at": expires_at.isoformat() if expires_at else None,
+            "scope": scope or None
+        }
+        with self._edit_data(self.permissions_file) as data:
+            self._drop_expired(data)
+            data.setdefault("group_grants", []).append(grant)
+        
+        self.logger.info(f"Group grant {grant['id']}: {group_id} -> {collection_id} ({permissions})")
+        return {"success": True, "grant": grant}
+    
+    @timed
+    def revoke_group_access(self, grant_id: str) -> Dict:
+        """Remove a group grant"""
+        with self._edit_data(self.permissions_file) as data:
+            grants = data.get("group_grants", [])
+            data["group_grants"] = [g for g in grants if g["id"] != grant_id]
+            if len(data["group_grants"]) == len(grants):
+                return {"success": False, "error": "Group grant not found"}
+        
+        self.logger.info(f"Group grant revoked: {grant_id}")
+        return {"success": True, "grant_id": grant_id}
+    
+    @timed
     def get_video(self, video_id: str) -> Optional[Dict]:
-        """Get video information by ID"""
+        """Get video information by ID; deleted videos are not returned"""
+        if self.tombstones.contains(video_id):
+            return None
         data = self._load_data(self.videos_file)
         
         for video in data.get("videos", []):
@@ -201,19 +426,29 @@ class VideoPermissionSystem:
         
         return None
     
+    def blob_key(self, video: Dict) -> str:
+        """Blob holding a video's file; records from before the blob store only have local_path"""
+        return video.get("blob_key") or os.path.basename(video.get("local_path") or "")
+    
+    @timed
     def get_user_videos(self, user_email: str) -> List[Dict]:
         """Get all videos a user has access to"""
+        # Only the videos the index holds grants for are checked, not every video
+        candidates = self.permission_index.candidate_videos(user_email)
+        if not candidates:
+            return []
         data = self._load_data(self.videos_file)
         user_videos = []
         
         for video in data.get("videos", []):
-            if self.check_permissions(video["id"], user_email, "read"):
+            if video["id"] in candidates and self.check_permissions(video["id"], user_email, "read"):
                 # Add permission info to video
                 video["user_permissions"] = self.get_user_permissions(video["id"], user_email)
                 user_videos.append(video)
         
         return user_videos
     
+    @timed
     def update_video_analysis(self, video_id: str, analysis_data: Dict, 
                             updated_by: str) -> Dict:
         """Update video with analysis data (requires edit permission)"""
@@ -221,55 +456,235 @@ class VideoPermissionSystem:
         if not self.check_permissions(video_id, updated_by, "edit"):
             return {"success": False, "error": "No edit permission on this video"}
         
-        data = self._load_data(self.videos_file)
+        return self.record_analysis(video_id, analysis_data, updated_by)
+    
+    def record_analysis(self, video_id: str, analysis_data: Dict, updated_by: str) -> Dict:
+        """Store analysis data from a coach or the analysis engine; callers check permissions"""
         
-        for video in data.get("videos", []):
-            if video["id"] == video_id:
-                # Update analysis data
-                video["analysis_data"] = analysis_data
-                video["analysis_updated_at"] = datetime.now().isoformat()
-                video["analysis_updated_by"] = updated_by
-                video["analysis_status"] = "completed"
-                
-                self._save_data(self.videos_file, data)
-                
-                self.logger.info(f"Video analysis updated: {video_id} by {updated_by}")
-                return {"success": True, "video_id": video_id}
+        with file_lock(self.videos_file):
+            data = self._load_data(self.videos_file)
+            
+            for video in data.get("videos", []):
+                if video["id"] == video_id:
+                    # Update analysis data
+                    video["analysis_data"] = analysis_data
+                    video["analysis_updated_at"] = datetime.now().isoformat()
+                    video["analysis_updated_by"] = updated_by
+                    video["analysis_status"] = "completed"
+                    video.pop("analysis_error", None)
+                    
+                    self._save_data(self.videos_file, data)
+                    
+                    self.logger.info(f"Video analysis updated: {video_id} by {updated_by}")
+                    return {"success": True, "video_id": video_id}
         
         return {"success": False, "error": "Video not found"}
     
+    def request_video_analysis(self, video_id: str, requested_by: str) -> Dict:
+        """Queue the video for the analysis engine (requires edit permission)"""
+        
+        if not self.check_permissions(video_id, requested_by, "edit"):
+            return {"success": False, "error": "No edit permission on this video"}
+        
+        with file_lock(self.videos_file):
+            data = self._load_data(self.videos_file)
+            video = next((v for v in data.get("videos", []) if v["id"] == video_id), None)
+            if video is None or self.tombstones.contains(video_id):
+                return {"success": False, "error": "Video not found"}
+            if not self.blob_key(video):
+                return {"success": False, "error": "Video file not available for analysis"}
+            # Asking again while it runs does not start a second run
+            if video.get("analysis_status") in ("queued", "processing"):
+                return {"success": True, "video_id": video_id, "analysis_status": video["analysis_status"]}
+            video["analysis_status"] = "queued"
+            video["analysis_requested_by"] = requested_by
+            video["analysis_requested_at"] = datetime.now().isoformat()
+            self._save_data(self.videos_file, data)
+        
+        # The media pipeline runs the engine in the background, wherever it runs
+        event_stream.publish(ANALYSIS_REQUESTED, [requested_by], {"video_id": video_id})
+        self.logger.info(f"Video analysis requested: {video_id} by {requested_by}")
+        return {"success": True, "video_id": video_id, "analysis_status": "queued"}
+    
+    @timed
     def add_video_annotations(self, video_id: str, annotations: List[Dict], 
                             added_by: str) -> Dict:
-        """Add annotations to video (requires edit permission)"""
+        """Add annotations to video (requires edit or annotate permission)"""
         
-        if not self.check_permissions(video_id, added_by, "edit"):
+        if not self.check_permissions(video_id, added_by, "annotate"):
             return {"success": False, "error": "No edit permission on this video"}
         
-        data = self._load_data(self.videos_file)
+        validated = []
+        for raw in annotations:
+            annotation, error = self._validate_annotation(raw)
+            if error:
+                return {"success": False, "error": error}
+            position = annotation["timestamp"]
+            if not self.check_permissions(video_id, added_by, "annotate", position):
+                if position is None:
+                    return {"success": False, "error": "A timestamp is required within your granted time range"}
+                return {"success": False, "error": f"Timestamp {position} is outside your granted time range"}
+            validated.append(annotation)
+        annotations = validated
         
-        for video in data.get("videos", []):
-            if video["id"] == video_id:
-                # Initialize annotations if not exists
-                if "annotations" not in video:
-                    video["annotations"] = []
-                
-                # Add new annotations with metadata
-                for annotation in annotations:
-                    annotation["added_at"] = datetime.now().isoformat()
-                    annotation["added_by"] = added_by
-                    annotation["annotation_id"] = f"ann_{len(video['annotations']) + 1}"
-                
-                video["annotations"].extend(annotations)
-                video["last_annotated_at"] = datetime.now().isoformat()
-                video["last_annotated_by"] = added_by
-                
-                self._save_data(self.videos_file, data)
-                
-                self.logger.info(f"Annotations added: {video_id} by {added_by} ({len(annotations)} annotations)")
-                return {"success": True, "video_id": video_id, "annotations_added": len(annotations)}
+        with file_lock(self.videos_file):
+            data = self._load_data(self.videos_file)
+            
+            for video in data.get("videos", []):
+                if video["id"] == video_id:
+                    self._append_annotations(video, annotations, added_by)
+                    self._save_data(self.videos_file, data)
+                    
+                    self.logger.info(f"Annotations added: {video_id} by {added_by} ({len(annotations)} annotations)")
+                    self._publish_annotations(video_id, annotations, added_by)
+                    return {"success": True, "video_id": video_id, "annotations_added": len(annotations)}
         
         return {"success": False, "error": "Video not found"}
     
+    @timed
+    def add_video_annotations_bulk(self, video_id: str, annotations: Iterable, 
+                                   added_by: str, allow_partial: bool = False) -> Dict:
+        """Validate a stream of annotations and commit the batch in a single write"""
+        
+        if not self.check_permissions(video_id, added_by, "annotate"):
+            return {"success": False, "error": "No edit permission on this video"}
+        
+        # Validate everything before taking the lock so the write is short
+        accepted = []
+        rejected = []
+        for index, raw in enumerate(annotations):
+            if index >= MAX_BULK_ANNOTATIONS:
+                rejected.append({"index": index, "error": f"Batch exceeds {MAX_BULK_ANNOTATIONS} annotations"})
+                break
+            
+            annotation, error = self._validate_annotation(raw)
+            if not error and not self.check_permissions(video_id, added_by, "annotate", annotation["timestamp"]):
+                error = ("Timestamp is outside the granted time range" if annotation["timestamp"] is not None
+                         else "A timestamp is required within the granted time range")
+            if error:
+                rejected.append({"index": index, "error": error})
+            else:
+                accepted.append(annotation)
+        
+        if rejected and not allow_partial:
+            return {
+                "success": False,
+                "error": f"{len(rejected)} annotations failed validation; nothing was saved",
+                "rejected": rejected[:MAX_REPORTED_ERRORS]
+            }
+        
+        if not accepted:
+            return {"success": False, "error": "No valid annotations", "rejected": rejected[:MAX_REPORTED_ERRORS]}
+        
+        with file_lock(self.videos_file):
+            data = self._load_data(self.videos_file)
+            
+            for video in data.get("videos", []):
+                if video["id"] == video_id:
+                    self._append_annotations(video, accepted, added_by)
+                    self._save_data(self.videos_file, data)
+                    break
+            else:
+                return {"success": False, "error": "Video not found"}
+        
+        self.logger.info(f"Bulk annotations added: {video_id} by {added_by} "
+                         f"({len(accepted)} added, {len(rejected)} rejected)")
+        self._publish_annotations(video_id, accepted, added_by)
+        return {
+            "success": True,
+            "video_id": video_id,
+            "annotations_added": len(accepted),
+            "first_annotation_id": accepted[0]["annotation_id"],
+            "last_annotation_id": accepted[-1]["annotation_id"],
+            "rejected": rejected[:MAX_REPORTED_ERRORS],
+            "rejected_count": len(rejected)
+        }
+    
+    def _validate_annotation(self, raw) -> Tuple[Optional[Dict], Optional[str]]:
+        """Normalize one incoming annotation or explain why it is invalid"""
+        if isinstance(raw, Exception):
+            return None, str(raw)
+        if not isinstance(raw, dict):
+            return None, "Annotation must be an object"
+        
+        text = raw.get("text")
+        if not isinstance(text, str) or not text.strip():
+            return None, "Missing annotation text"
+        if len(text) > MAX_ANNOTATION_TEXT:
+            return None, f"Annotation text longer than {MAX_ANNOTATION_TEXT} characters"
+        
+        annotation_type = raw.get("type") or None
+        if annotation_type is not None and not isinstance(annotation_type, str):
+            return None, "Annotation type must be a string"
+        
+        timestamp = raw.get("timestamp")
+        if timestamp in (None, ""):
+            timestamp = None
+        else:
+            try:
+                timestamp = float(timestamp)
+            except (TypeError, ValueError):
+                return None, f"Invalid timestamp: {timestamp!r}"
+            if not math.isfinite(timestamp):
+                return None, "Timestamp must be a finite number"
+            if timestamp < 0:
+                return None, "Timestamp must not be negative"
+        
+        return {"text": text, "type": annotation_type, "timestamp": timestamp}, None
+    
+    def _validate_scope(self, scope) -> Tuple[Optional[Dict], Optional[str]]:
+        """Normalize a grant scope (None for the whole video) or explain why it is invalid"""
+        if not scope:
+            return None, None
+        if not isinstance(scope, dict):
+            return None, "Scope must be an object"
+        if not isinstance(scope.get("annotations_only", False), bool):
+            return None, "annotations_only must be true or false"
+        
+        bounds = {}
+        for key in ("start_seconds", "end_seconds"):
+            value = scope.get(key)
+            if value is None:
+                continue
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                return None, f"Invalid {key}: {value!r}"
+            bounds[key] = value
+        if bounds.get("start_seconds", 0) < 0 or bounds.get("end_seconds", math.inf) < bounds.get("start_seconds", 0):
+            return None, "Invalid time range"
+        
+        return dict(scope, **bounds), None
+    
+    def _append_annotations(self, video: Dict, annotations: List[Dict], added_by: str):
+        """Stamp and append annotations; caller must hold the videos file lock"""
+        now = datetime.now().isoformat()
+        existing = video.setdefault("annotations", [])
+        
+        # Sequence numbers are assigned under the lock, so concurrent writers never collide
+        next_seq = max(video.get("annotation_seq", 0), len(existing))
+        for annotation in annotations:
+            next_seq += 1
+            annotation["added_at"] = now
+            annotation["added_by"] = added_by
+            annotation["annotation_id"] = f"ann_{next_seq}"
+        
+        existing.extend(annotations)
+        video["annotation_seq"] = next_seq
+        video["last_annotated_at"] = now
+        video["last_annotated_by"] = added_by
+    
+    def _publish_annotations(self, video_id: str, annotations: List[Dict], added_by: str):
+        """Push an annotations_added event to everyone who can read the video"""
+        audience = self.permission_index.holders(video_id, "read")
+        
+        event_stream.publish(ANNOTATIONS_ADDED, audience, {
+            "video_id": video_id,
+            "added_by": added_by,
+            "count": len(annotations),
+            # Large imports only announce the count; clients fetch them if the video is open
+            "annotations": annotations if len(annotations) <= MAX_EVENT_ANNOTATIONS else []
+        })
+    
+    @timed
     def get_video_annotations(self, video_id: str, user_email: str) -> Dict:
         """Get video annotations (requires read permission)"""
         
@@ -287,35 +702,350 @@ class VideoPermissionSystem:
             "user_permissions": self.get_user_permissions(video_id, user_email)
         }
     
+    @timed
+    def request_clips(self, video_id: str, user_email: str, annotation_ids: Optional[List[str]] = None,
+                      padding: float = CLIP_PADDING_SECONDS) -> Dict:
+        """Queue clips around annotated moments (requires read permission); equal windows share one clip"""
+        
+        if not self.check_permissions(video_id, user_email, "read"):
+            return {"success": False, "error": "No read permission on this video"}
+        if not 0 < padding <= MAX_CLIP_PADDING_SECONDS:
+            return {"success": False, "error": f"padding must be between 0 and {MAX_CLIP_PADDING_SECONDS} seconds"}
+        
+        wanted = set(annotation_ids) if annotation_ids else None
+        queued = False
+        with file_lock(self.videos_file):
+            data = self._load_data(self.videos_file)
+            video = next((v for v in data.get("videos", []) if v["id"] == video_id), None)
+            if video is None or self.tombstones.contains(video_id):
+                return {"success": False, "error": "Video not found"}
+            if not self.blob_key(video):
+                return {"success": False, "error": "Video file not available for clips"}
+            
+            clips = video.setdefault("clips", [])
+            by_window = {(clip["start"], clip["end"]): clip for clip in clips}
+            requested = []
+            for annotation in video.get("annotations", []):
+                if wanted is not None and annotation.get("annotation_id") not in wanted:
+                    continue
+                try:
+                    timestamp = float(annotation["timestamp"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                # Stored before timestamps had to be finite
+                if not math.isfinite(timestamp):
+                    continue
+                # Scoped grants only reach clips inside the granted time range
+                if not self.check_permissions(video_id, user_email, "read", timestamp):
+                    continue
+                
+                start, end = clip_window(timestamp, padding)
+                clip = by_window.get((start, end))
+                if clip is None:
+                    clip = {"id": f"clip_{start}_{end}", "start": start, "end": end, "status": "pending",
+                            "annotation_ids": [], "requested_by": user_email,
+                            "requested_at": datetime.now().isoformat()}
+                    clips.append(clip)
+                    by_window[(start, end)] = clip
+                    queued = True
+                elif clip["status"] == "failed":
+                    clip["status"] = "pending"
+                    queued = True
+                if annotation.get("annotation_id") and annotation["annotation_id"] not in clip["annotation_ids"]:
+                    clip["annotation_ids"].append(annotation["annotation_id"])
+                if clip not in requested:
+                    requested.append(clip)
+            
+            if requested:
+                self._save_data(self.videos_file, data)
+        
+        # The media pipeline cuts them in the background, wherever it runs
+        if queued:
+            event_stream.publish(CLIPS_REQUESTED, [user_email], {"video_id": video_id})
+        self.logger.info(f"Clips requested on {video_id} by {user_email}: {len(requested)}")
+        return {"success": True, "video_id": video_id, "clips": requested}
+    
+    def get_video_clips(self, video_id: str, user_email: str) -> Dict:
+        """Clips of a video (requires read permission)"""
+        
+        if not self.check_permissions(video_id, user_email, "read"):
+            return {"success": False, "error": "No read permission on this video"}
+        
+        video = self.get_video(video_id)
+        if not video:
+            return {"success": False, "error": "Video not found"}
+        
+        return {"success": True, "video_id": video_id, "clips": video.get("clips", [])}
+    
+    @timed
     def delete_video(self, video_id: str, user_email: str) -> Dict:
         """Delete video (requires delete permission - only student can do this)"""
         
         if not self.check_permissions(video_id, user_email, "delete"):
             return {"success": False, "error": "No delete permission on this video"}
         
-        data = self._load_data(self.videos_file)
-        
-        # Remove video from videos list
-        data["videos"] = [v for v in data.get("videos", []) if v["id"] != video_id]
-        self._save_data(self.videos_file, data)
+        # A tombstone hides the video at once; video_gc removes the record, grants and file later.
+        # It records the bucket charged for the video, under the videos lock so tiering cannot move it meanwhile
+        with file_lock(self.videos_file):
+            video = self.get_video(video_id)
+            if not video:
+                return {"success": False, "error": "Video not found"}
+            self.tombstones.append(video_id, user_email, video.get("bucket"),
+                                   video.get("stored_bytes", video.get("size_bytes", 0)))
         
-        # Remove all permissions for this video
-        perm_data = self._load_data(self.permissions_file)
-        perm_data["permissions"] = [p for p in perm_data.get("permissions", []) if p["video_id"] != video_id]
-        self._save_data(self.permissions_file, perm_data)
+        self.logger.info(f"Video deleted: {video_id} by {user_email}")
+        return {"success": True, "video_id": video_id, "message": "Video deleted successfully"}
+    
+    @timed
+    def purge_videos(self, video_ids: Iterable[str]) -> Dict:
+        """Remove deleted videos for good: files, then records (with annotations), grants and collection entries
+
+        Returns the ids now gone; a video whose files could not be deleted keeps its record to be retried.
+        """
+        doomed = set(video_ids)
+        if not doomed:
+            return {"success": True, "videos": 0, "permissions": 0, "files": 0,
+                    "bytes_freed": 0, "purged": [], "failed": []}
         
-        # Delete actual file if it exists
-        video = self.get_video(video_id)
-        if video and "local_path" in video and os.path.exists(video["local_path"]):
+        # Files go first, so a crash leaves records whose files are already gone; purging them again is a no-op
+        doomed_videos = [v for v in self._load_data(self.videos_file).get("videos", []) if v["id"] in doomed]
+        files = 0
+        bytes_freed = 0
+        failed = set()
+        for video in doomed_videos:
             try:
-                os.remove(video["local_path"])
-                self.logger.info(f"Video file deleted: {video['local_path']}")
-            except Exception as e:
-                self.logger.error(f"Error deleting video file: {str(e)}")
+                # Archived videos live compressed in their archive bucket
+                if video.get("tier") == "archive":
+                    removed = os.path.exists(video["archive_path"])
+                    if removed:
+                        os.remove(video["archive_path"])
+                else:
+                    removed = self.blobs.delete(self.blob_key(video))
+                for name in video.get("hls_files", []):
+                    self.blobs.delete(hls_key(video["id"], name))
+                for name in video.get("preview_files", []):
+                    self.blobs.delete(preview_key(video["id"], name))
+                for clip in video.get("clips", []):
+                    self.blobs.delete(clip_key(video["id"], clip["id"]))
+                self.blobs.delete(analysis_key(video["id"]))
+            except OSError as e:
+                self.logger.error(f"Error deleting files of video {video['id']}, will retry: {str(e)}")
+                failed.add(video["id"])
+                continue
+            if removed:
+                files += 1
+                self.logger.info(f"Video file deleted: {video['id']}")
+            bytes_freed += video.get("stored_bytes", video.get("size_bytes", 0))
+        doomed -= failed
         
-        self.logger.info(f"Video deleted: {video_id} by {user_email}")
-        return {"success": True, "video_id": video_id, "message": "Video deleted successfully"}
+        # One write per data file for the whole batch
+        with self._edit_data(self.videos_file) as data:
+            count = len(data.get("videos", []))
+            data["videos"] = [v for v in data.get("videos", []) if v["id"] not in doomed]
+            removed_videos = count - len(data["videos"])
+        
+        with self._edit_data(self.permissions_file) as perm_data:
+            count = len(perm_data.get("permissions", []))
+            perm_data["permissions"] = [p for p in perm_data.get("permissions", []) if p["video_id"] not in doomed]
+            removed_permissions = count - len(perm_data["permissions"])
+            for user_email, rows in perm_data.get("suspended", {}).items():
+                perm_data["suspended"][user_email] = [p for p in rows if p["video_id"] not in doomed]
+        
+        # Take them out of collections so group grants stop covering them
+        with self._edit_data(self.groups_file) as groups:
+            for collection in groups.get("collections", []):
+                collection["video_ids"] = [v for v in collection["video_ids"] if v not in doomed]
+        
+        return {
+            "success": not failed,
+            "videos": removed_videos,
+            "permissions": removed_permissions,
+            "files": files,
+            "bytes_freed": bytes_freed,
+            "purged": sorted(doomed),
+            "failed": sorted(failed)
+        }
+    
+    def _parse_grant_item(self, item) -> Tuple[Optional[Dict], Optional[str]]:
+        """Normalize one bulk grant request or explain why it is invalid"""
+        if not isinstance(item, dict) or not item.get("video_id") or not item.get("user_email"):
+            return None, "Each grant needs video_id and user_email"
+        if not isinstance(item["video_id"], str) or not isinstance(item["user_email"], str):
+            return None, "video_id and user_email must be strings"
+        permissions = item.get("permissions") or ["read", "edit"]
+        if not isinstance(permissions, list) or not all(isinstance(p, str) for p in permissions):
+            return None, "Permissions must be a list of strings"
+        if any(p not in GROUP_PERMISSIONS for p in permissions):
+            return None, f"Permissions must be among {', '.join(GROUP_PERMISSIONS)}"
+        scope, error = self._validate_scope(item.get("scope"))
+        if error:
+            return None, error
+        try:
+            expires_at = datetime.fromisoformat(item["expires_at"]) if item.get("expires_at") else \
+                datetime.now() + timedelta(days=DEFAULT_COACH_GRANT_DAYS)
+        except (TypeError, ValueError):
+            return None, f"Invalid expires_at: {item.get('expires_at')!r}"
+        return {
+            "video_id": item["video_id"],
+            "user_email": item["user_email"],
+            "permissions": list(permissions),
+            "expires_at": expires_at.isoformat(),
+            "scope": scope
+        }, None
+    
+    def _apply_grants(self, data: Dict, items: List, granted_by: Optional[str]) -> List[Dict]:
+        """Insert or replace grants in a loaded permissions file; O(rows + items)"""
+        video_ids = {v["id"] for v in self._load_data(self.videos_file).get("videos", [])}
+        rows = data.setdefault("permissions", [])
+        position = {(p["video_id"], p["user_email"]): i for i, p in enumerate(rows)}
+        now = datetime.now().isoformat()
+        
+        results = []
+        for index, item in enumerate(items):
+            grant, error = self._parse_grant_item(item)
+            if not error and grant["video_id"] not in video_ids:
+                error = "Video not found"
+            if not error and granted_by and not self.check_permissions(grant["video_id"], granted_by, "delete"):
+                error = "Only the video owner can grant access"
+            if not error and "delete" in self.get_user_permissions(grant["video_id"], grant["user_email"]):
+                error = "The video owner's access cannot be changed"
+            if error:
+                results.append({"index": index, "success": False, "error": error})
+                continue
+            
+            grant.update(granted_at=now, granted_by=granted_by or "system")
+            key = (grant["video_id"], grant["user_email"])
+            if key in position:
+                rows[position[key]] = grant
+            else:
+                position[key] = len(rows)
+                rows.append(grant)
+            results.append({"index": index, "success": True, "video_id": grant["video_id"],
+                            "user_email": grant["user_email"], "expires_at": grant["expires_at"]})
+        return results
+    
+    def _apply_revocations(self, data: Dict, items: List, revoked_by: Optional[str]) -> List[Dict]:
+        """Remove grants from a loaded permissions file in one pass; owner rows are never removed"""
+        pairs = {}
+        whole_user = {}
+        results = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict) or not item.get("user_email"):
+                results.append({"index": index, "success": False, "error": "Each revocation needs user_email"})
+                continue
+            result = {"index": index, "success": True, "user_email": item["user_email"], "revoked": 0}
+            results.append(result)
+            if item.get("video_id"):
+                result["video_id"] = item["video_id"]
+                pairs[(item["video_id"], item["user_email"])] = result
+            else:
+                # No video_id: every video of this user (that revoked_by owns, when given)
+                whole_user[item["user_email"]] = result
+        
+        kept = []
+        for row in data.get("permissions", []):
+            result = pairs.get((row["video_id"], row["user_email"])) or whole_user.get(row["user_email"])
+            if (result is None or "delete" in row["permissions"]
+                    or (revoked_by and not self.check_permissions(row["video_id"], revoked_by, "delete"))):
+                kept.append(row)
+            else:
+                result["revoked"] += 1
+        data["permissions"] = kept
+        
+        for result in results:
+            if result["success"] and not result["revoked"]:
+                result.update(success=False, error="No permissions found to revoke")
+        return results
     
+    @timed
+    def grant_many(self, items: List[Dict], granted_by: Optional[str] = None) -> Dict:
+        """Grant or replace many (video, user) permissions with one load and one write of the file"""
+        if len(items) > MAX_BULK_PERMISSION_ITEMS:
+            return {"success": False, "error": f"Batch exceeds {MAX_BULK_PERMISSION_ITEMS} items"}
+        with self._edit_data(self.permissions_file) as data:
+            self._drop_expired(data)
+            results = self._apply_grants(data, items, granted_by)
+        
+        granted = sum(1 for r in results if r["success"])
+        self.logger.info(f"Bulk grant by {granted_by or 'system'}: {granted} of {len(results)} applied")
+        return {"success": granted == len(results), "granted": granted, "results": results}
+    
+    @timed
+    def revoke_many(self, items: List[Dict], revoked_by: Optional[str] = None,
+                    uow: Optional[UnitOfWork] = None) -> Dict:
+        """Revoke many grants in one pass over the file; an item without video_id covers all of that user's videos"""
+        if len(items) > MAX_BULK_PERMISSION_ITEMS:
+            return {"success": False, "error": f"Batch exceeds {MAX_BULK_PERMISSION_ITEMS} items"}
+        with self._edit_data(self.permissions_file, uow) as data:
+            self._drop_expired(data)
+            results = self._apply_revocations(data, items, revoked_by)
+        
+        revoked = sum(r.get("revoked", 0) for r in results)
+        self.logger.info(f"Bulk revoke by {revoked_by or 'system'}: {revoked} grants removed")
+        return {"success": all(r["success"] for r in results), "revoked": revoked, "results": results}
+    
+    @timed
+    def transfer_coach_access(self, owner_email: str, from_coach: str, to_coach: str) -> Dict:
+        """Move a coach's access on all of an owner's videos to another coach in one write"""
+        with self._edit_data(self.permissions_file) as data:
+            self._drop_expired(data)
+            moved = [dict(p, user_email=to_coach) for p in data.get("permissions", [])
+                     if p["user_email"] == from_coach and self.check_permissions(p["video_id"], owner_email, "delete")]
+            if not moved:
+                return {"success": False, "error": f"{from_coach} has no access to your videos"}
+            self._apply_revocations(data, [{"user_email": from_coach}], owner_email)
+            results = self._apply_grants(data, [
+                {"video_id": p["video_id"], "user_email": to_coach, "permissions": p["permissions"],
+                 "expires_at": p.get("expires_at"), "scope": p.get("scope")} for p in moved
+            ], owner_email)
+        
+        self.logger.info(f"Access transferred by {owner_email}: {from_coach} -> {to_coach} ({len(moved)} videos)")
+        return {"success": all(r["success"] for r in results), "transferred": len(moved), "results": results}
+    
+    @timed
+    def suspend_user_grants(self, user_email: str) -> Dict:
+        """Move a user's direct grants aside (e.g. a blocked coach), located through the per-user index"""
+        with file_lock(self.permissions_file):
+            # The index matches the file while its lock is held
+            positions = self.permission_index.user_rows(user_email)
+            if not positions:
+                return {"success": True, "suspended": 0}
+            data = self._load_data(self.permissions_file)
+            rows = data["permissions"]
+            suspended = [rows[i] for i in positions if "delete" not in rows[i]["permissions"]]
+            for i in reversed(positions):
+                if "delete" not in rows[i]["permissions"]:
+                    del rows[i]
+            data.setdefault("suspended", {}).setdefault(user_email, []).extend(suspended)
+            self._drop_expired(data)
+            self._save_data(self.permissions_file, data)
+        
+        self.logger.info(f"Suspended {len(suspended)} grants of {user_email}")
+        return {"success": True, "suspended": len(suspended)}
+    
+    @timed
+    def restore_user_grants(self, user_email: str) -> Dict:
+        """Reinstate a user's suspended grants that have not expired or been replaced meanwhile"""
+        with file_lock(self.permissions_file):
+            data = self._load_data(self.permissions_file)
+            suspended = data.get("suspended", {}).pop(user_email, [])
+            if not suspended:
+                return {"success": True, "restored": 0}
+            # Grants given to the user while suspended take precedence
+            current = {data["permissions"][i]["video_id"] for i in self.permission_index.user_rows(user_email)}
+            now = datetime.now()
+            restored = [
+                grant for grant in suspended
+                if grant["video_id"] not in current
+                and (not grant.get("expires_at") or datetime.fromisoformat(grant["expires_at"]) > now)
+            ]
+            data["permissions"].extend(restored)
+            self._save_data(self.permissions_file, data)
+        
+        self.logger.info(f"Restored {len(restored)} of {len(suspended)} suspended grants of {user_email}")
+        return {"success": True, "restored": len(restored)}
+    
+    @timed
     def revoke_coach_permissions(self, video_id: str, coach_email: str, 
                                 revoked_by: str) -> Dict:
         """Revoke coach permissions on video (only student can do this)"""
@@ -324,21 +1054,22 @@ class VideoPermissionSystem:
         if not self.check_permissions(video_id, revoked_by, "delete"):
             return {"success": False, "error": "Only video owner can revoke permissions"}
         
-        data = self._load_data(self.permissions_file)
-        
-        # Remove coach permissions
-        original_count = len(data.get("permissions", []))
-        data["permissions"] = [
-            p for p in data.get("permissions", [])
-            if not (p["video_id"] == video_id and p["user_email"] == coach_email)
-        ]
-        
-        if len(data["permissions"]) < original_count:
-            self._save_data(self.permissions_file, data)
-            self.logger.info(f"Coach permissions revoked: {coach_email} -> {video_id} by {revoked_by}")
-            return {"success": True, "message": f"Permissions revoked for {coach_email}"}
-        else:
-            return {"success": False, "error": "No permissions found to revoke"}
+        with file_lock(self.permissions_file):
+            data = self._load_data(self.permissions_file)
+            
+            # Remove coach permissions
+            original_count = len(data.get("permissions", []))
+            data["permissions"] = [
+                p for p in data.get("permissions", [])
+                if not (p["video_id"] == video_id and p["user_email"] == coach_email)
+            ]
+            
+            if len(data["permissions"]) < original_count:
+                self._save_data(self.permissions_file, data)
+                self.logger.info(f"Coach permissions revoked: {coach_email} -> {video_id} by {revoked_by}")
+                return {"success": True, "message": f"Permissions revoked for {coach_email}"}
+            else:
+                return {"success": False, "error": "No permissions found to revoke"}
 
 # Example usage
 if __name__ == "__main__":
@@ -12,9 +12,26 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import secrets
 
+import api_response
+import http_cache
+import metrics_system
+import profiling_system
+from api_response import select_fields
+from data_store import atomic_write_json, file_lock, load_json
+from http_cache import conditional
+from id_allocator import new_id
+from metrics_system import timed
+from profiling_system import RequestProfiler
+from storage_tiering import StorageTiering
+from video_gc import VideoGarbageCollector
+from video_permission_system import VideoPermissionSystem
+
 app = Flask(__name__)
 app.secret_key = secrets.token_hex(16)
 CORS(app)
+metrics_system.init_app(app, "root_console")
+http_cache.init_app(app)
+api_response.init_app(app)
 
 class WebRootConsole:
     def __init__(self):
@@ -23,6 +40,7 @@ class WebRootConsole:
         self.users_file = os.path.join(self.data_dir, "users.json")
         self.storage_file = os.path.join(self.data_dir, "storage.json")
         self.transactions_file = os.path.join(self.data_dir, "transactions.json")
+        self.escalations_file = os.path.join(self.data_dir, "escalations.json")
         self.logs_dir = "logs"
         
         # Ensure directories exist
@@ -33,6 +51,18 @@ class WebRootConsole:
         
         # Initialize data files
         self._init_data_files()
+        
+        # Request profiles are written by every app under logs/profiles
+        self.profiler = RequestProfiler(os.path.join(self.logs_dir, "profiles"))
+        
+        # Platform-wide permission changes (e.g. a coach leaving)
+        self.video_permissions = VideoPermissionSystem()
+        
+        # Purges deleted videos and reclaims their bucket space
+        self.video_gc = VideoGarbageCollector(self.video_permissions, self.storage_file)
+        
+        # Moves idle videos to archive buckets
+        self.tiering = StorageTiering(self.video_permissions)
     
     def _init_data_files(self):
         """Initialize data files with empty structures if they don't exist"""
@@ -40,7 +70,8 @@ class WebRootConsole:
             self.coaches_file: {"coaches": []},
             self.users_file: {"users": []},
             self.storage_file: {"buckets": []},
-            self.transactions_file: {"transactions": []}
+            self.transactions_file: {"transactions": []},
+            self.escalations_file: {"escalations": []}
         }
         
         for file_path, default_data in files_to_init.items():
@@ -61,123 +92,147 @@ class WebRootConsole:
     
     def _load_data(self, file_path: str) -> Dict:
         """Load data from JSON file"""
-        try:
-            with open(file_path, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
+        return load_json(file_path)
     
     def _save_data(self, file_path: str, data: Dict):
         """Save data to JSON file"""
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        atomic_write_json(file_path, data)
     
+    @timed
     def create_coach(self, email: str, name: str, specialization: str, hourly_rate: float):
         """Create a new coach account"""
-        data = self._load_data(self.coaches_file)
-        
-        # Check if coach already exists
-        for coach in data.get("coaches", []):
-            if coach["email"] == email:
-                return {"success": False, "message": f"Coach with email {email} already exists"}
-        
-        coach = {
-            "id": f"coach_{len(data.get('coaches', [])) + 1}",
-            "email": email,
-            "name": name,
-            "specialization": specialization,
-            "hourly_rate": hourly_rate,
-            "status": "active",
-            "created_at": datetime.now().isoformat(),
-            "total_earnings": 0.0,
-            "total_sessions": 0
-        }
-        
-        data.setdefault("coaches", []).append(coach)
-        self._save_data(self.coaches_file, data)
-        
-        self._log_action("CREATE_COACH", f"Created coach: {email} ({name})")
-        return {"success": True, "message": f"Coach {name} created successfully", "coach": coach}
+        with file_lock(self.coaches_file):
+            data = self._load_data(self.coaches_file)
+            
+            # Check if coach already exists
+            for coach in data.get("coaches", []):
+                if coach["email"] == email:
+                    return {"success": False, "message": f"Coach with email {email} already exists"}
+            
+            coach = {
+                "id": new_id("coach"),
+                "email": email,
+                "name": name,
+                "specialization": specialization,
+                "hourly_rate": hourly_rate,
+                "status": "active",
+                "created_at": datetime.now().isoformat(),
+                "total_earnings": 0.0,
+                "total_sessions": 0
+            }
+            
+            data.setdefault("coaches", []).append(coach)
+            self._save_data(self.coaches_file, data)
+            
+            self._log_action("CREATE_COACH", f"Created coach: {email} ({name})")
+            return {"success": True, "message": f"Coach {name} created successfully", "coach": coach}
     
-    def block_coach(self, email: str):
-        """Block a coach's access"""
-        data = self._load_data(self.coaches_file)
-        
-        for coach in data.get("coaches", []):
-            if coach["email"] == email:
-                coach["status"] = "blocked"
-                self._save_data(self.coaches_file, data)
-                
-                self._log_action("BLOCK_COACH", f"Blocked coach: {email}")
-                return {"success": True, "message": f"Coach {email} has been blocked"}
+    @timed
+    def block_coach(self, email: str, revoke_grants: bool = False):
+        """Block a coach's access; video permission checks deny a blocked coach at once"""
+        with file_lock(self.coaches_file):
+            data = self._load_data(self.coaches_file)
+            
+            for coach in data.get("coaches", []):
+                if coach["email"] == email:
+                    coach["status"] = "blocked"
+                    self._save_data(self.coaches_file, data)
+                    break
+            else:
+                return {"success": False, "message": f"Coach with email {email} not found"}
         
-        return {"success": False, "message": f"Coach with email {email} not found"}
+        message = f"Coach {email} has been blocked"
+        if revoke_grants:
+            suspended = self.video_permissions.suspend_user_grants(email)["suspended"]
+            message += f" and {suspended} video grants suspended"
+        self._log_action("BLOCK_COACH", f"Blocked coach: {email}")
+        return {"success": True, "message": message}
     
+    @timed
     def unblock_coach(self, email: str):
-        """Unblock a coach's access"""
-        data = self._load_data(self.coaches_file)
-        
-        for coach in data.get("coaches", []):
-            if coach["email"] == email:
-                coach["status"] = "active"
-                self._save_data(self.coaches_file, data)
-                
-                self._log_action("UNBLOCK_COACH", f"Unblocked coach: {email}")
-                return {"success": True, "message": f"Coach {email} has been unblocked"}
+        """Unblock a coach's access, reinstating any grants suspended when they were blocked"""
+        with file_lock(self.coaches_file):
+            data = self._load_data(self.coaches_file)
+            
+            for coach in data.get("coaches", []):
+                if coach["email"] == email:
+                    coach["status"] = "active"
+                    self._save_data(self.coaches_file, data)
+                    break
+            else:
+                return {"success": False, "message": f"Coach with email {email} not found"}
         
-        return {"success": False, "message": f"Coach with email {email} not found"}
+        message = f"Coach {email} has been unblocked"
+        restored = self.video_permissions.restore_user_grants(email)["restored"]
+        if restored:
+            message += f" and {restored} video grants restored"
+        self._log_action("UNBLOCK_COACH", f"Unblocked coach: {email}")
+        return {"success": True, "message": message}
     
+    @timed
     def create_user(self, email: str, name: str, role: str = "student"):
         """Create a new user account"""
-        data = self._load_data(self.users_file)
-        
-        # Check if user already exists
-        for user in data.get("users", []):
-            if user["email"] == email:
-                return {"success": False, "message": f"User with email {email} already exists"}
-        
-        user = {
-            "id": f"user_{len(data.get('users', [])) + 1}",
-            "email": email,
-            "name": name,
-            "role": role,
-            "status": "active",
-            "created_at": datetime.now().isoformat(),
-            "total_spent": 0.0,
-            "total_sessions": 0
-        }
-        
-        data.setdefault("users", []).append(user)
-        self._save_data(self.users_file, data)
-        
-        self._log_action("CREATE_USER", f"Created user: {email} ({name}) - Role: {role}")
-        return {"success": True, "message": f"User {name} created successfully", "user": user}
+        with file_lock(self.users_file):
+            data = self._load_data(self.users_file)
+            
+            # Check if user already exists
+            for user in data.get("users", []):
+                if user["email"] == email:
+                    return {"success": False, "message": f"User with email {email} already exists"}
+            
+            user = {
+                "id": new_id("user"),
+                "email": email,
+                "name": name,
+                "role": role,
+                "status": "active",
+                "created_at": datetime.now().isoformat(),
+                "total_spent": 0.0,
+                "total_sessions": 0
+            }
+            
+            data.setdefault("users", []).append(user)
+            self._save_data(self.users_file, data)
+            
+            self._log_action("CREATE_USER", f"Created user: {email} ({name}) - Role: {role}")
+            return {"success": True, "message": f"User {name} created successfully", "user": user}
     
-    def create_storage_bucket(self, bucket_name: str, purpose: str, size_gb: int):
-        """Create a new storage bucket"""
-        data = self._load_data(self.storage_file)
-        
-        # Check if bucket already exists
-        for bucket in data.get("buckets", []):
-            if bucket["name"] == bucket_name:
-                return {"success": False, "message": f"Bucket with name {bucket_name} already exists"}
+    @timed
+    def create_storage_bucket(self, bucket_name: str, purpose: str, size_gb: int,
+                              tier: str = "hot", path: Optional[str] = None):
+        """Create a new storage bucket; "archive" buckets hold compressed videos in path (any local directory)"""
+        if tier not in ("hot", "archive"):
+            return {"success": False, "message": f"Unknown storage tier: {tier}"}
         
-        bucket = {
-            "id": f"bucket_{len(data.get('buckets', [])) + 1}",
-            "name": bucket_name,
-            "purpose": purpose,
-            "size_gb": size_gb,
-            "used_gb": 0,
-            "status": "active",
-            "created_at": datetime.now().isoformat()
-        }
-        
-        data.setdefault("buckets", []).append(bucket)
-        self._save_data(self.storage_file, data)
-        
-        self._log_action("CREATE_BUCKET", f"Created bucket: {bucket_name} ({size_gb}GB)")
-        return {"success": True, "message": f"Storage bucket '{bucket_name}' created successfully", "bucket": bucket}
+        with file_lock(self.storage_file):
+            data = self._load_data(self.storage_file)
+            
+            # Check if bucket already exists
+            for bucket in data.get("buckets", []):
+                if bucket["name"] == bucket_name:
+                    return {"success": False, "message": f"Bucket with name {bucket_name} already exists"}
+            
+            bucket = {
+                "id": new_id("bucket"),
+                "name": bucket_name,
+                "purpose": purpose,
+                "size_gb": size_gb,
+                "used_gb": 0,
+                "used_bytes": 0,
+                "video_count": 0,
+                "tier": tier,
+                "path": path,
+                "status": "active",
+                "created_at": datetime.now().isoformat()
+            }
+            
+            data.setdefault("buckets", []).append(bucket)
+            self._save_data(self.storage_file, data)
+            
+            self._log_action("CREATE_BUCKET", f"Created bucket: {bucket_name} ({size_gb}GB)")
+            return {"success": True, "message": f"Storage bucket '{bucket_name}' created successfully", "bucket": bucket}
     
+    @timed
     def get_logs(self, days: int = 1):
         """Get logs for the specified number of days"""
         logs = []
@@ -194,6 +249,7 @@ class WebRootConsole:
         
         return logs
     
+    @timed
     def get_daily_report(self, date: str = None):
         """Get daily activity report"""
         if date is None:
@@ -226,23 +282,65 @@ class WebRootConsole:
             "recent_transactions": today_transactions[-5:]  # Last 5 transactions
         }
     
+    def get_slow_requests(self, limit: int = 20):
+        """Get the slowest profiled requests with their call-stack summaries"""
+        return self.profiler.get_slowest_requests(limit)
+    
+    @timed
     def get_coaches(self):
         """Get all coaches"""
         data = self._load_data(self.coaches_file)
         return data.get("coaches", [])
     
+    @timed
     def get_users(self):
         """Get all users"""
         data = self._load_data(self.users_file)
         return data.get("users", [])
     
+    @timed
     def get_storage(self):
         """Get all storage buckets"""
         data = self._load_data(self.storage_file)
         return data.get("buckets", [])
+    
+    @timed
+    def get_storage_usage(self):
+        """Bucket usage from the upload/delete counters"""
+        return self.video_permissions.quota.usage()
+    
+    @timed
+    def get_escalations(self, status: Optional[str] = None):
+        """Get requests escalated after missing their SLA, newest first"""
+        data = self._load_data(self.escalations_file)
+        escalations = data.get("escalations", [])
+        if status:
+            escalations = [e for e in escalations if e["status"] == status]
+        return list(reversed(escalations))
+    
+    @timed
+    def resolve_escalation(self, escalation_id: str, note: str = ""):
+        """Close an escalation once an admin has dealt with it"""
+        with file_lock(self.escalations_file):
+            data = self._load_data(self.escalations_file)
+            
+            for escalation in data.get("escalations", []):
+                if escalation["id"] == escalation_id:
+                    escalation["status"] = "resolved"
+                    escalation["resolved_at"] = datetime.now().isoformat()
+                    escalation["note"] = note
+                    self._save_data(self.escalations_file, data)
+                    
+                    self._log_action("RESOLVE_ESCALATION", f"Resolved escalation {escalation_id} for request {escalation['request_id']}")
+                    return {"success": True, "message": f"Escalation {escalation_id} resolved"}
+            
+            return {"success": False, "message": f"Escalation {escalation_id} not found"}
 
 # Initialize the console
 console = WebRootConsole()
+profiling_system.init_app(app, "root_console",
+                          is_admin=lambda: 'authenticated' in session,
+                          profiler=console.profiler)
 
 # Routes
 @app.route('/')
@@ -273,10 +371,11 @@ def logout():
 
 # API Routes
 @app.route('/api/coaches', methods=['GET', 'POST'])
+@conditional(console.coaches_file)
 def api_coaches():
     if request.method == 'GET':
         coaches = console.get_coaches()
-        return jsonify({"success": True, "coaches": coaches})
+        return jsonify({"success": True, "coaches": select_fields(coaches)})
     
     elif request.method == 'POST':
         data = request.json
@@ -294,7 +393,7 @@ def api_coach_action(action):
     email = data['email']
     
     if action == 'block':
-        result = console.block_coach(email)
+        result = console.block_coach(email, revoke_grants=bool(data.get('revoke_grants')))
     elif action == 'unblock':
         result = console.unblock_coach(email)
     else:
@@ -303,10 +402,11 @@ def api_coach_action(action):
     return jsonify(result)
 
 @app.route('/api/users', methods=['GET', 'POST'])
+@conditional(console.users_file)
 def api_users():
     if request.method == 'GET':
         users = console.get_users()
-        return jsonify({"success": True, "users": users})
+        return jsonify({"success": True, "users": select_fields(users)})
     
     elif request.method == 'POST':
         data = request.json
@@ -318,26 +418,90 @@ def api_users():
         return jsonify(result)
 
 @app.route('/api/storage', methods=['GET', 'POST'])
+@conditional(console.storage_file)
 def api_storage():
     if request.method == 'GET':
         buckets = console.get_storage()
-        return jsonify({"success": True, "buckets": buckets})
+        return jsonify({"success": True, "buckets": select_fields(buckets)})
     
     elif request.method == 'POST':
         data = request.json
         result = console.create_storage_bucket(
             data['name'],
             data['purpose'],
-            int(data['size_gb'])
+            int(data['size_gb']),
+            data.get('tier', 'hot'),
+            data.get('path') or None
         )
         return jsonify(result)
 
+@app.route('/api/storage/usage')
+@conditional(console.storage_file)
+def api_storage_usage():
+    return jsonify({"success": True, **console.get_storage_usage()})
+
+@app.route('/api/storage/archive', methods=['POST'])
+def api_storage_archive():
+    if 'authenticated' not in session:
+        return jsonify({"success": False, "message": "Not authenticated"}), 401
+    
+    result = console.tiering.archive_cold()
+    console._log_action("ARCHIVE_VIDEOS", f"Archived {result['archived']} idle videos")
+    return jsonify({"success": True, **result})
+
+@app.route('/api/storage/gc', methods=['POST'])
+def api_storage_gc():
+    if 'authenticated' not in session:
+        return jsonify({"success": False, "message": "Not authenticated"}), 401
+    
+    result = console.video_gc.collect()
+    console._log_action("VIDEO_GC", f"Purged {result['videos']} deleted videos ({result['bytes_freed']} bytes)")
+    return jsonify({"success": True, **result})
+
 @app.route('/api/logs')
 def api_logs():
     days = request.args.get('days', 1, type=int)
     logs = console.get_logs(days)
     return jsonify({"success": True, "logs": logs})
 
+@app.route('/api/profiles')
+def api_profiles():
+    limit = request.args.get('limit', 20, type=int)
+    profiles = console.get_slow_requests(limit)
+    return jsonify({"success": True, "profiles": profiles})
+
+@app.route('/api/escalations')
+@conditional(console.escalations_file)
+def api_escalations():
+    escalations = console.get_escalations(request.args.get('status'))
+    return jsonify({"success": True, "escalations": select_fields(escalations)})
+
+@app.route('/api/escalations/<escalation_id>/resolve', methods=['POST'])
+def api_resolve_escalation(escalation_id):
+    data = request.json or {}
+    result = console.resolve_escalation(escalation_id, data.get('note', ''))
+    return jsonify(result)
+
+@app.route('/api/permissions/grant-many', methods=['POST'])
+def api_grant_many():
+    if 'authenticated' not in session:
+        return jsonify({"success": False, "message": "Not authenticated"}), 401
+    
+    data = request.json or {}
+    result = console.video_permissions.grant_many(data.get('grants', []))
+    console._log_action("GRANT_MANY", f"Granted {result.get('granted', 0)} video permissions")
+    return jsonify(result)
+
+@app.route('/api/permissions/revoke-many', methods=['POST'])
+def api_revoke_many():
+    if 'authenticated' not in session:
+        return jsonify({"success": False, "message": "Not authenticated"}), 401
+    
+    data = request.json or {}
+    result = console.video_permissions.revoke_many(data.get('revocations', []))
+    console._log_action("REVOKE_MANY", f"Revoked {result.get('revoked', 0)} video permissions")
+    return jsonify(result)
+
 @app.route('/api/report')
 def api_report():
     date = request.args.get('date')
@@ -345,4 +509,8 @@ def api_report():
     return jsonify({"success": True, "report": report})
 
 if __name__ == '__main__':
+    # Deleted videos are collected and idle ones archived in the background;
+    # `python video_gc.py` and `python storage_tiering.py` run them on their own
+    console.video_gc.start()
+    console.tiering.start()
     app.run(debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file